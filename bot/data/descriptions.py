@@ -1,4 +1,6 @@
-DESCRIPTIONS = {
+from bot.utils.i18n import namespace
+
+DESCRIPTIONS = namespace("descriptions", {
     "ru": {
         # === Описания платежей ===
         "payment_rub_details": "💳 <b>Оплата в рублях</b>\n\nБанк: Тинькофф\nКарта: <code>5536...5678</code>\nПолучатель: Иванов И.И.",
@@ -234,4 +236,4 @@ DESCRIPTIONS = {
             "Your online session payment has been received. We'll contact you soon."
         )
     }
-}
\ No newline at end of file
+})
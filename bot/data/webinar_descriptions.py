@@ -1,4 +1,6 @@
-WEBINAR_DESCRIPTIONS = {
+from bot.utils.i18n import namespace
+
+WEBINAR_DESCRIPTIONS = namespace("webinar_descriptions", {
     "ru": {
         "webinar_femdom": (
             "<b>✨ Фемдом секстинг: красиво, дорого и не раздеваясь ✨</b>\n\n"
@@ -367,4 +369,4 @@ WEBINAR_DESCRIPTIONS = {
             "Продолжительность: ~2.5 часа"
         ),
     }
-}
\ No newline at end of file
+})
@@ -0,0 +1,217 @@
+# bot/database/entitlements.py
+"""
+Материализованное представление "активные продукты пользователя" (entitlements).
+
+- Вид пользователя строится один раз загрузчиком (Payments + Purchases, см.
+  notion_user_products) и дальше живёт в памяти — экран "Мои продукты" рисуется
+  без запросов в Notion.
+- Подтверждение оплаты сразу добавляет продукт (grant) и просит перестроить вид
+  в фоне (invalidate): пользователь видит покупку мгновенно, а вид сверяется с Notion.
+- Истечение — по min-куче (expires_at, telegram_id, page_id): run_expiry_loop()
+  спит ровно до ближайшего срока и удаляет истёкшие записи; peek()/get() на всякий
+  случай тоже сначала снимают всё просроченное.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+
+from bot.services.cache_registry import age_stats
+
+log = logging.getLogger(__name__)
+
+MAX_SLEEP_SEC = 3600.0
+
+
+@dataclass(frozen=True, slots=True)
+class Entitlement:
+    page_id: str                       # Payment или Purchase, из которой взят продукт
+    name: str
+    expires_at: Optional[datetime] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Формат list_user_products."""
+        return {"name": self.name, "expires_at": self.expires_at}
+
+
+Loader = Callable[[int], Awaitable[Iterable[Entitlement]]]
+
+
+def _utc(dt: Optional[datetime]) -> Optional[datetime]:
+    if dt is not None and dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+class EntitlementsStore:
+    def __init__(self, loader: Loader) -> None:
+        self._loader = loader
+        self._views: Dict[int, Dict[str, Entitlement]] = {}      # tg -> page_id -> запись
+        self._heap: List[Tuple[float, int, str]] = []
+        self._rebuilding: Dict[int, asyncio.Task] = {}
+        self._wake: Optional[asyncio.Event] = None
+        self._built_at: Dict[int, float] = {}
+        self._stats: Dict[str, Any] = {
+            "builds": 0, "hits": 0, "misses": 0, "grants": 0, "expired": 0,
+            "build_max_ms": 0.0, "build_total_ms": 0.0,
+        }
+
+    # ---------- чтение ----------
+    def peek(self, telegram_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Готовый вид пользователя или None, если он ещё не построен."""
+        self.expire_due()
+        view = self._views.get(int(telegram_id))
+        if view is None:
+            self._stats["misses"] += 1
+            return None
+        self._stats["hits"] += 1
+        items = sorted(view.values(), key=lambda e: e.name.lower())
+        return [e.as_dict() for e in items]
+
+    async def get(self, telegram_id: int) -> List[Dict[str, Any]]:
+        items = self.peek(telegram_id)
+        if items is not None:
+            return items
+        await self.build(telegram_id)
+        return self.peek(telegram_id) or []
+
+    # ---------- запись ----------
+    def _put(self, telegram_id: int, ent: Entitlement, now: datetime) -> bool:
+        ent = Entitlement(ent.page_id, ent.name, _utc(ent.expires_at))
+        if ent.expires_at is not None and ent.expires_at <= now:
+            return False
+        self._views.setdefault(telegram_id, {})[ent.page_id] = ent
+        if ent.expires_at is not None:
+            heapq.heappush(self._heap, (ent.expires_at.timestamp(), telegram_id, ent.page_id))
+            if self._heap[0][1:] == (telegram_id, ent.page_id) and self._wake is not None:
+                self._wake.set()   # новый ближайший срок — перепланировать сон
+        return True
+
+    def set_view(self, telegram_id: int, items: Iterable[Entitlement]) -> None:
+        tg = int(telegram_id)
+        now = datetime.now(timezone.utc)
+        self._views[tg] = {}
+        for ent in items:
+            self._put(tg, ent, now)
+        self._compact()
+
+    def _compact(self) -> None:
+        # в куче остаются записи заменённых видов (ленивое удаление) — периодически чистим
+        live = sum(len(v) for v in self._views.values())
+        if len(self._heap) > 4 * live + 64:
+            self._heap = [
+                (ent.expires_at.timestamp(), tg, pid)
+                for tg, view in self._views.items()
+                for pid, ent in view.items()
+                if ent.expires_at is not None
+            ]
+            heapq.heapify(self._heap)
+
+    async def build(self, telegram_id: int) -> None:
+        t0 = time.monotonic()
+        items = list(await self._loader(int(telegram_id)))
+        self.set_view(telegram_id, items)
+        ms = (time.monotonic() - t0) * 1000
+        self._built_at[int(telegram_id)] = time.time()
+        self._stats["builds"] += 1
+        self._stats["build_total_ms"] += ms
+        self._stats["build_max_ms"] = round(max(self._stats["build_max_ms"], ms), 1)
+
+    def grant(self, telegram_id: int, ent: Entitlement) -> None:
+        """Продукт выдан (подтверждение оплаты): добавить в вид сразу, если он построен."""
+        tg = int(telegram_id)
+        if tg in self._views:
+            self._put(tg, ent, datetime.now(timezone.utc))
+            self._stats["grants"] += 1
+
+    def invalidate(self, telegram_id: int) -> None:
+        """Перестроить вид пользователя в фоне (текущий вид остаётся доступен до замены)."""
+        tg = int(telegram_id)
+        if tg not in self._views:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.drop(tg)
+            return
+        if tg in self._rebuilding:
+            return
+        task = loop.create_task(self._rebuild(tg))
+        self._rebuilding[tg] = task
+
+    async def _rebuild(self, tg: int) -> None:
+        try:
+            await self.build(tg)
+        except Exception as e:
+            # старый вид оставляем; следующий invalidate попробует снова
+            log.warning("entitlements: rebuild for %s failed: %s", tg, e)
+        finally:
+            self._rebuilding.pop(tg, None)
+
+    def drop(self, telegram_id: int) -> None:
+        self._views.pop(int(telegram_id), None)
+        self._built_at.pop(int(telegram_id), None)
+
+    # ---------- истечение ----------
+    def expire_due(self, now: Optional[datetime] = None) -> int:
+        ts = (now or datetime.now(timezone.utc)).timestamp()
+        dropped = 0
+        while self._heap and self._heap[0][0] <= ts:
+            exp_ts, tg, page_id = heapq.heappop(self._heap)
+            view = self._views.get(tg)
+            ent = view.get(page_id) if view else None
+            # запись могла быть заменена (продлена) — удаляем только совпадающую по сроку
+            if ent is not None and ent.expires_at is not None and ent.expires_at.timestamp() == exp_ts:
+                del view[page_id]
+                dropped += 1
+        self._stats["expired"] += dropped
+        return dropped
+
+    def next_expiry(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    async def run_expiry_loop(self) -> None:
+        """Фоновая задача: спать до ближайшего expires_at и снимать истёкшее."""
+        self._wake = asyncio.Event()
+        while True:
+            nxt = self.next_expiry()
+            delay = MAX_SLEEP_SEC
+            if nxt is not None:
+                delay = max(0.0, min(MAX_SLEEP_SEC, nxt - datetime.now(timezone.utc).timestamp()))
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                n = self.expire_due()
+                if n:
+                    log.info("entitlements: %s items expired", n)
+            except Exception as e:
+                log.warning("entitlements: expiry failed: %s", e)
+
+    def info(self) -> Dict[str, Any]:
+        # поля — как в cache_registry.STANDARD_FIELDS; возраст — с последнего построения вида
+        now = time.time()
+        builds = self._stats["builds"]
+        items = sum(len(v) for v in self._views.values())
+        return {
+            **{k: v for k, v in self._stats.items() if k not in ("build_total_ms", "build_max_ms")},
+            "entries": items,
+            "evictions": self._stats["expired"],
+            "users": len(self._views),
+            "items": items,
+            "heap": len(self._heap),
+            "rebuilding": len(self._rebuilding),
+            **age_stats(now - ts for ts in self._built_at.values()),
+            "refresh_avg_ms": round(self._stats["build_total_ms"] / builds, 1) if builds else 0.0,
+            "refresh_max_ms": self._stats["build_max_ms"],
+        }
+
+    def root(self) -> Dict[int, Dict[str, Entitlement]]:
+        return self._views
@@ -0,0 +1,590 @@
+# bot/database/local_store.py
+"""
+Локальное хранилище страниц Notion (SQLite, WAL) — система записи бота.
+
+Users, Payments, Purchases и Products лежат здесь в формате страниц Notion
+(те же декодеры records.py), бот читает и пишет локально, а Notion догоняет:
+
+- pull: полный скан базы (pull_all) и дельты change-feed (put_page) зеркалируются
+  сюда; после рестарта индексы поднимаются с диска, а фид продолжает с watermark
+  хранилища — без полного скана Notion;
+- create_page(): страница создаётся локально с id "local-…" сразу, в очередь
+  репликации ставится pages.create; воркер создаёт страницу в Notion, запоминает
+  соответствие local -> notion id и сообщает слушателям (индексы переключаются на
+  настоящий id). Ссылки на ещё не созданные страницы в relation подменяются на
+  этапе отправки, порядок операций по странице сохраняется;
+- pages.create не идемпотентен, поэтому строка очереди помечается sent до отправки,
+  а в страницу пишется её local-id (свойство "Local ID", см. schema_registry.MIGRATIONS).
+  Для строки, которая уже была sent (сбой или рестарт между create и записью id_map),
+  страница сначала ищется в Notion по Local ID и создаётся заново, только если её там
+  нет; если у базы нет Local ID, проверить нельзя — строка уходит в dead letter, а не
+  в дубль. replicate() не выполняется параллельно сам с собой (воркер и shutdown);
+- page_keys — индекс страниц по значениям number и relation (Telegram ID, User,
+  Payment, …): pages_where()/find() отвечают по индексу SQLite, не разбирая всю базу;
+- update_page(): свойства сразу сливаются в локальную копию; патч страницы с
+  настоящим id уходит в notion_outbox (слияние, ретраи, dead letter — там), патч
+  локальной страницы ждёт её создания в очереди.
+
+Правки, ещё не доставленные в Notion, не затираются при pull: поверх пришедшей
+страницы накладываются ожидающие патчи outbox.
+
+Настройки (env):
+  LOCAL_STORE_PATH          — файл SQLite (по умолчанию local_store.sqlite3)
+  LOCAL_STORE_MAX_ATTEMPTS  — попыток pages.create до dead letter (по умолчанию 10)
+  LOCAL_STORE_POLL_SEC      — период проверки отложенных ретраев (по умолчанию 5)
+"""
+from __future__ import annotations
+
+import asyncio
+import copy
+import json
+import logging
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from bot.services import notion_gateway
+from bot.services.notion_outbox import outbox as notion_outbox
+from bot.services.notion_scheduler import Priority, not_applied
+from .schema_registry import is_schema_error, schema_registry
+
+log = logging.getLogger(__name__)
+
+LOCAL_PREFIX = "local-"
+LOCAL_ID_PROP = "Local ID"
+MAX_ATTEMPTS = int(os.getenv("LOCAL_STORE_MAX_ATTEMPTS", "10") or 10)
+POLL_SEC = float(os.getenv("LOCAL_STORE_POLL_SEC", "5") or 5)
+MAX_BACKOFF_SEC = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    page_id       TEXT PRIMARY KEY,
+    db_id         TEXT NOT NULL,
+    data          TEXT NOT NULL,
+    remote_edited TEXT,
+    stored_at     REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_db ON pages (db_id);
+CREATE TABLE IF NOT EXISTS page_keys (
+    page_id TEXT NOT NULL,
+    db_id   TEXT NOT NULL,
+    prop    TEXT NOT NULL,
+    value   TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS page_keys_lookup ON page_keys (db_id, prop, value);
+CREATE INDEX IF NOT EXISTS page_keys_page ON page_keys (page_id);
+CREATE INDEX IF NOT EXISTS page_keys_value ON page_keys (value);
+CREATE TABLE IF NOT EXISTS id_map (
+    local_id  TEXT PRIMARY KEY,
+    notion_id TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queue (
+    seq             INTEGER PRIMARY KEY AUTOINCREMENT,
+    op              TEXT NOT NULL,
+    page_id         TEXT NOT NULL,
+    db_id           TEXT NOT NULL,
+    properties      TEXT NOT NULL,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error      TEXT,
+    sent_at         REAL
+);
+CREATE TABLE IF NOT EXISTS dead (
+    op         TEXT NOT NULL,
+    page_id    TEXT NOT NULL,
+    db_id      TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    attempts   INTEGER NOT NULL,
+    failed_at  REAL NOT NULL,
+    last_error TEXT
+);
+CREATE TABLE IF NOT EXISTS synced (
+    db_id     TEXT PRIMARY KEY,
+    synced_at REAL NOT NULL
+);
+"""
+
+class UnknownOutcome(Exception):
+    """pages.create мог пройти, а проверить это по Local ID нельзя."""
+
+
+def new_page_id() -> str:
+    """id для create_page(page_id=...), который можно сохранить до создания страницы."""
+    return LOCAL_PREFIX + uuid.uuid4().hex
+
+
+def _key_value(value: Any) -> str:
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def _page_keys(page: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(свойство, значение) для индекса: числа и id связей."""
+    out: List[Tuple[str, str]] = []
+    for name, prop in (page.get("properties") or {}).items():
+        if not isinstance(prop, dict):
+            continue
+        if prop.get("number") is not None:
+            out.append((name, _key_value(prop["number"])))
+        for r in prop.get("relation") or ():
+            if r.get("id"):
+                out.append((name, r["id"]))
+    return out
+
+
+# слушатель замены id: (db_id, local_id, страница Notion)
+RemapListener = Callable[[str, str, Dict[str, Any]], None]
+
+
+def norm_db(db_id: str) -> str:
+    return (db_id or "").replace("-", "").lower()
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _relation_ids(properties: Dict[str, Any]) -> List[str]:
+    return [r.get("id") for p in properties.values() if isinstance(p, dict)
+            for r in p.get("relation") or () if r.get("id")]
+
+
+def _coerce(properties: Dict[str, Any], schema: Dict[str, str]) -> Dict[str, Any]:
+    """Подогнать патч под фактическую схему: select <-> rich_text, неизвестные свойства — убрать."""
+    out: Dict[str, Any] = {}
+    for name, value in properties.items():
+        kind = schema.get(name)
+        if kind is None:
+            log.warning("local_store: property %r is not in the schema, dropped", name)
+            continue
+        if kind == "select" and "rich_text" in value:
+            text = "".join((r.get("text") or {}).get("content", "") for r in value["rich_text"])
+            value = {"select": {"name": text}}
+        elif kind == "rich_text" and "select" in value:
+            value = {"rich_text": [{"text": {"content": (value["select"] or {}).get("name", "")}}]}
+        out[name] = value
+    return out
+
+
+class LocalStore:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._listeners: List[RemapListener] = []
+        self._replicate_lock = asyncio.Lock()
+        self._stats: Dict[str, int] = {
+            "created": 0, "updated": 0, "pulled": 0, "replicated": 0, "failed": 0, "dead": 0,
+        }
+
+    # ---------- хранилище ----------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            cols = {r[1] for r in self._conn.execute("PRAGMA table_info(queue)")}
+            if "sent_at" not in cols:               # файл от версии без пометки sent
+                self._conn.execute("ALTER TABLE queue ADD COLUMN sent_at REAL")
+            if self._conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+                self._reindex(self._conn)           # файл от версии без page_keys
+                self._conn.execute("PRAGMA user_version = 1")
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _write(self, db: sqlite3.Connection, page_id: str, db_id: str, page: Dict[str, Any], remote_edited: Optional[str]) -> None:
+        db.execute(
+            "INSERT OR REPLACE INTO pages (page_id, db_id, data, remote_edited, stored_at) VALUES (?, ?, ?, ?, ?)",
+            (page_id, db_id, json.dumps(page, ensure_ascii=False), remote_edited, time.time()),
+        )
+        self._index(db, page_id, db_id, page)
+
+    def _index(self, db: sqlite3.Connection, page_id: str, db_id: str, page: Dict[str, Any]) -> None:
+        db.execute("DELETE FROM page_keys WHERE page_id = ?", (page_id,))
+        keys = []
+        for prop, value in _page_keys(page):
+            if value.startswith(LOCAL_PREFIX):     # связь на уже созданную страницу — по настоящему id
+                row = db.execute("SELECT notion_id FROM id_map WHERE local_id = ?", (value,)).fetchone()
+                value = row[0] if row else value
+            keys.append((page_id, db_id, prop, value))
+        db.executemany("INSERT INTO page_keys (page_id, db_id, prop, value) VALUES (?, ?, ?, ?)", keys)
+
+    def _delete(self, db: sqlite3.Connection, page_id: str) -> None:
+        db.execute("DELETE FROM pages WHERE page_id = ?", (page_id,))
+        db.execute("DELETE FROM page_keys WHERE page_id = ?", (page_id,))
+
+    def _reindex(self, db: sqlite3.Connection) -> None:
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("DELETE FROM page_keys")
+            for page_id, db_id, data in db.execute("SELECT page_id, db_id, data FROM pages").fetchall():
+                self._index(db, page_id, db_id, json.loads(data))
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    def add_listener(self, fn: RemapListener) -> None:
+        self._listeners.append(fn)
+
+    # ---------- чтение ----------
+    def resolve_id(self, page_id: str) -> str:
+        """local-id, уже созданный в Notion, -> настоящий id; остальные — как есть."""
+        if not page_id or not page_id.startswith(LOCAL_PREFIX):
+            return page_id
+        row = self._db().execute("SELECT notion_id FROM id_map WHERE local_id = ?", (page_id,)).fetchone()
+        return row[0] if row else page_id
+
+    def is_pending(self, page_id: str) -> bool:
+        """Страница создана локально и ещё не существует в Notion."""
+        return bool(page_id) and self.resolve_id(page_id).startswith(LOCAL_PREFIX)
+
+    def get_page(self, page_id: str) -> Optional[Dict[str, Any]]:
+        if not page_id:
+            return None
+        row = self._db().execute("SELECT data FROM pages WHERE page_id = ?", (self.resolve_id(page_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def pages(self, db_id: str) -> List[Dict[str, Any]]:
+        rows = self._db().execute("SELECT data FROM pages WHERE db_id = ?", (norm_db(db_id),)).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def pages_where(self, db_id: str, prop: str, *values: Any) -> List[Dict[str, Any]]:
+        """Страницы базы, у которых number-свойство prop равно (relation содержит) одно из values."""
+        keys = sorted({_key_value(v) for v in values if v is not None})
+        if not keys:
+            return []
+        rows = self._db().execute(
+            "SELECT DISTINCT p.data FROM page_keys k JOIN pages p ON p.page_id = k.page_id "
+            f"WHERE k.db_id = ? AND k.prop = ? AND k.value IN ({', '.join('?' * len(keys))})",
+            (norm_db(db_id), prop, *keys),
+        ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def find(self, db_id: str, prop: str, related_id: str) -> List[Dict[str, Any]]:
+        """Страницы базы, у которых relation prop содержит related_id (или его notion-id)."""
+        return self.pages_where(db_id, prop, related_id, self.resolve_id(related_id))
+
+    def synced(self, db_id: str) -> bool:
+        """Полный скан базы хотя бы раз попал в хранилище."""
+        if not db_id:
+            return False
+        return self._db().execute("SELECT 1 FROM synced WHERE db_id = ?", (norm_db(db_id),)).fetchone() is not None
+
+    def watermark(self, db_id: str) -> Optional[str]:
+        """Самый свежий last_edited_time, полученный из Notion (локальные правки не считаются)."""
+        row = self._db().execute("SELECT MAX(remote_edited) FROM pages WHERE db_id = ?", (norm_db(db_id),)).fetchone()
+        return row[0] if row else None
+
+    async def retrieve(self, page_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
+        """Страница из хранилища, а если её нет — из Notion (и сохраняется)."""
+        page = self.get_page(page_id)
+        if page is not None:
+            return page
+        page = await notion_gateway.retrieve_page(self.resolve_id(page_id), priority=priority)
+        return self.put_page(page)
+
+    # ---------- pull ----------
+    def _store_remote(self, db: sqlite3.Connection, page: Dict[str, Any], db_id: Optional[str]) -> Dict[str, Any]:
+        page_id = page["id"]
+        db_id = norm_db(db_id or (page.get("parent") or {}).get("database_id") or "")
+        pending = notion_outbox.pending(page_id)
+        if pending:
+            page = copy.deepcopy(page)
+            page.setdefault("properties", {}).update(pending)
+        if page.get("archived") or page.get("in_trash"):
+            self._delete(db, page_id)
+            return page
+        self._write(db, page_id, db_id, page, page.get("last_edited_time"))
+        return page
+
+    def put_page(self, page: Dict[str, Any], db_id: Optional[str] = None) -> Dict[str, Any]:
+        """Страница пришла из Notion (дельта фида, retrieve, ответ API). Возвращает сохранённый вид."""
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            page = self._store_remote(db, page, db_id)
+        self._stats["pulled"] += 1
+        return page
+
+    async def pull_all(self, db_id: str, *, priority: Priority = Priority.BACKGROUND) -> int:
+        """Полный скан базы в хранилище; страницы, исчезнувшие из Notion, удаляются."""
+        if not db_id or not notion_gateway.is_configured():
+            return 0
+        started = time.time()
+        pages = [p async for p in notion_gateway.iter_query(db_id, priority=priority)]
+        seen = {p["id"] for p in pages}
+        key = norm_db(db_id)
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            for page in pages:
+                self._store_remote(db, page, key)
+            stale = [
+                r[0] for r in db.execute(
+                    "SELECT page_id FROM pages WHERE db_id = ? AND stored_at < ? AND page_id NOT LIKE ?",
+                    (key, started, LOCAL_PREFIX + "%"),
+                )
+                if r[0] not in seen
+            ]
+            for pid in stale:
+                self._delete(db, pid)
+            db.execute("INSERT OR REPLACE INTO synced (db_id, synced_at) VALUES (?, ?)", (key, started))
+        self._stats["pulled"] += len(pages)
+        return len(pages)
+
+    # ---------- запись ----------
+    def create_page(self, db_id: str, properties: Dict[str, Any], page_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Создать страницу локально (сразу) и поставить её создание в Notion в очередь.
+        page_id — заранее выданный new_page_id(): повторный вызов с ним вернёт уже
+        созданную страницу, а не создаст вторую.
+        """
+        if not db_id:
+            raise RuntimeError("database id is not set")
+        if page_id is not None:
+            existing = self.get_page(page_id)
+            if existing is not None:
+                return existing
+        page_id = page_id or new_page_id()
+        now = _now_iso()
+        page = {
+            "object": "page",
+            "id": page_id,
+            "parent": {"type": "database_id", "database_id": db_id},
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "properties": copy.deepcopy(properties),
+        }
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            self._write(db, page_id, norm_db(db_id), page, None)
+            self._enqueue(db, "create", page_id, db_id, properties)
+        self._stats["created"] += 1
+        self._notify()
+        return page
+
+    def update_page(self, page_id: str, properties: Dict[str, Any]) -> None:
+        """Изменить свойства локально; в Notion — через outbox или очередь (страница ещё не создана)."""
+        if not page_id or not properties:
+            return
+        target = self.resolve_id(page_id)
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT db_id, data FROM pages WHERE page_id = ?", (target,)).fetchone()
+            db_key = row[0] if row else ""
+            if row is not None:
+                data = json.loads(row[1])
+                data.setdefault("properties", {}).update(copy.deepcopy(properties))
+                db.execute("UPDATE pages SET data = ? WHERE page_id = ?", (json.dumps(data, ensure_ascii=False), target))
+                self._index(db, target, db_key, data)
+            waits = target.startswith(LOCAL_PREFIX) or any(self.is_pending(i) for i in _relation_ids(properties))
+            if waits:
+                self._enqueue(db, "update", target, db_key, properties)
+        if not waits:
+            notion_outbox.enqueue(target, self._remap(properties))
+        self._stats["updated"] += 1
+        self._notify()
+
+    def _enqueue(self, db: sqlite3.Connection, op: str, page_id: str, db_id: str, properties: Dict[str, Any]) -> None:
+        db.execute(
+            "INSERT INTO queue (op, page_id, db_id, properties, next_attempt_at) VALUES (?, ?, ?, ?, ?)",
+            (op, page_id, db_id, json.dumps(properties, ensure_ascii=False), time.time()),
+        )
+
+    # ---------- репликация в Notion ----------
+    def _remap(self, properties: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """local-id в relation -> notion id; None, если какая-то связь ещё не создана."""
+        out: Dict[str, Any] = {}
+        for name, value in properties.items():
+            if isinstance(value, dict) and "relation" in value:
+                rel = []
+                for r in value["relation"] or ():
+                    rid = self.resolve_id(r.get("id"))
+                    if rid and rid.startswith(LOCAL_PREFIX):
+                        return None
+                    rel.append({**r, "id": rid})
+                value = {**value, "relation": rel}
+            out[name] = value
+        return out
+
+    async def _find_remote(self, db_id: str, local_id: str) -> Optional[Dict[str, Any]]:
+        resp = await notion_gateway.query_database(
+            db_id,
+            filter={"property": LOCAL_ID_PROP, "rich_text": {"equals": local_id}},
+            page_size=1,
+            priority=Priority.BACKGROUND,
+        )
+        results = resp.get("results") or []
+        return results[0] if results else None
+
+    async def _create_once(self, seq: int, local_id: str, db_id: str, properties: Dict[str, Any], sent: bool) -> Dict[str, Any]:
+        """Создать страницу в Notion не более одного раза на строку очереди."""
+        schema = await schema_registry.get(db_id)
+        keyed = LOCAL_ID_PROP in schema
+        if sent:
+            if not keyed:
+                raise UnknownOutcome(f"{db_id} has no {LOCAL_ID_PROP!r} property to check a previous create")
+            page = await self._find_remote(db_id, local_id)
+            if page is not None:
+                return page
+        if keyed:
+            properties = {**properties, LOCAL_ID_PROP: {"rich_text": [{"text": {"content": local_id}}]}}
+        # пометка — до отправки: после падения процесса эта строка пойдёт через _find_remote
+        self._db().execute("UPDATE queue SET sent_at = ? WHERE seq = ?", (time.time(), seq))
+        try:
+            return await self._create_remote(db_id, properties)
+        except Exception as e:
+            if not_applied(e):
+                # запрос не ушёл или Notion его отклонил — страницы нет, ретрай обычный
+                self._db().execute("UPDATE queue SET sent_at = NULL WHERE seq = ?", (seq,))
+            raise
+
+    async def _create_remote(self, db_id: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+        parent = {"database_id": db_id}
+        try:
+            return await notion_gateway.create_page(parent=parent, properties=properties, priority=Priority.BACKGROUND)
+        except Exception as e:
+            if not is_schema_error(e):
+                raise
+            # схема поменялась в Notion (например, Type стал select) — перечитать и подогнать
+            schema_registry.invalidate(db_id)
+            schema = await schema_registry.get(db_id)
+            return await notion_gateway.create_page(
+                parent=parent, properties=_coerce(properties, schema), priority=Priority.BACKGROUND,
+            )
+
+    def _mapped(self, local_id: str, db_id: str, page: Dict[str, Any]) -> Dict[str, Any]:
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("INSERT OR REPLACE INTO id_map (local_id, notion_id) VALUES (?, ?)", (local_id, page["id"]))
+            db.execute("UPDATE page_keys SET value = ? WHERE value = ?", (page["id"], local_id))
+            row = db.execute("SELECT data FROM pages WHERE page_id = ?", (local_id,)).fetchone()
+            self._delete(db, local_id)
+            page = self._store_remote(db, page, db_id)
+            if row is not None:
+                # локальные правки, сделанные после постановки create, ещё в очереди — не теряем их в копии
+                local_props = json.loads(row[0]).get("properties") or {}
+                merged = {**page, "properties": {**(page.get("properties") or {}), **local_props}}
+                db.execute("UPDATE pages SET data = ? WHERE page_id = ?", (json.dumps(merged, ensure_ascii=False), page["id"]))
+                self._index(db, page["id"], norm_db(db_id), merged)
+                page = merged
+        for fn in self._listeners:
+            try:
+                fn(norm_db(db_id), local_id, page)
+            except Exception as e:
+                log.warning("local_store: remap listener failed: %s", e)
+        return page
+
+    def _failed(self, seq: int, op: str, page_id: str, db_id: str, raw: str, attempts: int, err: Exception) -> None:
+        attempts += 1
+        self._stats["failed"] += 1
+        db = self._db()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            if attempts >= MAX_ATTEMPTS or isinstance(err, UnknownOutcome):
+                db.execute(
+                    "INSERT INTO dead (op, page_id, db_id, properties, attempts, failed_at, last_error) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (op, page_id, db_id, raw, attempts, time.time(), str(err)),
+                )
+                db.execute("DELETE FROM queue WHERE seq = ?", (seq,))
+                self._stats["dead"] += 1
+                log.error("local_store: giving up on %s %s after %s attempts: %s", op, page_id, attempts, err)
+            else:
+                delay = min(MAX_BACKOFF_SEC, 2.0 ** attempts)
+                db.execute(
+                    "UPDATE queue SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE seq = ?",
+                    (attempts, time.time() + delay, str(err), seq),
+                )
+                log.warning("local_store: %s of %s failed (%s), retry in %.0fs", op, page_id, err, delay)
+
+    async def replicate(self) -> int:
+        """
+        Один проход очереди по порядку. Операции страницы, которая ждёт (ретрай, связь
+        ещё не создана), блокируют только её последующие операции, а не всю очередь.
+        """
+        if not notion_gateway.is_configured():
+            return 0
+        async with self._replicate_lock:
+            return await self._replicate()
+
+    async def _replicate(self) -> int:
+        rows = self._db().execute(
+            "SELECT seq, op, page_id, db_id, properties, attempts, next_attempt_at, sent_at FROM queue ORDER BY seq"
+        ).fetchall()
+        now = time.time()
+        blocked: Set[str] = set()
+        done = 0
+        for seq, op, page_id, db_id, raw, attempts, next_at, sent_at in rows:
+            target = self.resolve_id(page_id)
+            if page_id in blocked or target in blocked or next_at > now:
+                blocked.update((page_id, target))
+                continue
+            if op == "create" and target != page_id:
+                # id_map уже записан (сбой до удаления строки) — страница создана
+                self._db().execute("DELETE FROM queue WHERE seq = ?", (seq,))
+                continue
+            props = self._remap(json.loads(raw))
+            if props is None or (op == "update" and target.startswith(LOCAL_PREFIX)):
+                blocked.update((page_id, target))
+                continue
+            if op == "create":
+                try:
+                    page = await self._create_once(seq, page_id, db_id, props, sent=sent_at is not None)
+                except Exception as e:
+                    self._failed(seq, op, page_id, db_id, raw, attempts, e)
+                    blocked.add(page_id)
+                    continue
+                self._mapped(page_id, db_id, page)
+            else:
+                notion_outbox.enqueue(target, props)
+            self._db().execute("DELETE FROM queue WHERE seq = ?", (seq,))
+            self._stats["replicated"] += 1
+            done += 1
+        return done
+
+    async def run_worker(self) -> None:
+        """Фоновый воркер репликации: новые операции — сразу, отложенные ретраи — раз в POLL_SEC."""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.replicate()
+            except Exception as e:
+                log.warning("local_store: replication failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._db()
+        return {
+            **self._stats,
+            "pages": db.execute("SELECT COUNT(*) FROM pages").fetchone()[0],
+            "local_pages": db.execute(
+                "SELECT COUNT(*) FROM pages WHERE page_id LIKE ?", (LOCAL_PREFIX + "%",)
+            ).fetchone()[0],
+            "queued": db.execute("SELECT COUNT(*) FROM queue").fetchone()[0],
+            "dead_total": db.execute("SELECT COUNT(*) FROM dead").fetchone()[0],
+            "synced_dbs": db.execute("SELECT COUNT(*) FROM synced").fetchone()[0],
+        }
+
+
+local_store = LocalStore(os.getenv("LOCAL_STORE_PATH", "local_store.sqlite3"))
@@ -0,0 +1,127 @@
+# bot/database/notion_codec.py
+"""
+Декларативный разбор страниц Notion в компактные записи.
+
+Схема — список Field(attr, prop, kind): в какое поле записи положить значение какого
+свойства Notion и какого оно типа. compile_decoder() один раз превращает схему в
+план (кортеж экстракторов) и возвращает функцию page -> record, которая проходит
+по свойствам страницы за один проход без try/except-цепочек на каждое поле.
+
+Записи — dataclass(slots=True): ни __dict__, ни вложенных dict'ов Notion в кэшах.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple, Type, TypeVar
+
+R = TypeVar("R")
+Extractor = Callable[[Dict[str, Any]], Any]
+
+
+def plain_text(items) -> str:
+    parts = []
+    for r in items or ():
+        parts.append(r.get("plain_text") or (r.get("text") or {}).get("content", ""))
+    return "".join(parts).strip()
+
+
+def _title(p):
+    return plain_text(p.get("title"))
+
+
+def _rich_text(p):
+    return plain_text(p.get("rich_text"))
+
+
+def _text(p):
+    # email/phone/url или любой текстовый тип — что есть
+    for key in ("email", "url", "phone_number"):
+        if p.get(key):
+            return p[key]
+    return plain_text(p.get("rich_text") or p.get("title"))
+
+
+def _select(p):
+    return (p.get("select") or {}).get("name")
+
+
+def _select_or_text(p):
+    return _select(p) or plain_text(p.get("rich_text")) or None
+
+
+def _number(p):
+    return p.get("number")
+
+
+def _checkbox(p):
+    return p.get("checkbox")
+
+
+def _date(p):
+    return (p.get("date") or {}).get("start")
+
+
+def _relation(p):
+    rel = p.get("relation") or ()
+    return rel[0].get("id") if rel else None
+
+
+def _relations(p):
+    return tuple(r["id"] for r in p.get("relation") or () if r.get("id"))
+
+
+def _rollup_title(p):
+    for item in (p.get("rollup") or {}).get("array") or ():
+        if item.get("type") == "title":
+            return plain_text(item.get("title")) or None
+    return None
+
+
+EXTRACTORS: Dict[str, Extractor] = {
+    "title": _title,
+    "rich_text": _rich_text,
+    "text": _text,
+    "select": _select,
+    "select_or_text": _select_or_text,
+    "number": _number,
+    "checkbox": _checkbox,
+    "date": _date,
+    "relation": _relation,
+    "relations": _relations,
+    "rollup_title": _rollup_title,
+}
+
+
+@dataclass(frozen=True)
+class Field:
+    attr: str
+    prop: str
+    kind: str
+    convert: Optional[Callable[[Any], Any]] = None
+
+
+def compile_decoder(cls: Type[R], fields: Sequence[Field]) -> Callable[[Dict[str, Any]], R]:
+    """
+    Скомпилировать схему в функцию page -> cls(...).
+    cls должен принимать page_id и last_edited_time; пустые значения (None / "")
+    не передаются — остаются значения по умолчанию записи.
+    """
+    plan: Tuple[Tuple[str, str, Extractor, Optional[Callable[[Any], Any]]], ...] = tuple(
+        (f.attr, f.prop, EXTRACTORS[f.kind], f.convert) for f in fields
+    )
+
+    def decode(page: Dict[str, Any]) -> R:
+        props = page.get("properties") or {}
+        values: Dict[str, Any] = {"page_id": page["id"], "last_edited_time": page.get("last_edited_time")}
+        for attr, prop, extract, convert in plan:
+            p = props.get(prop)
+            if not p:
+                continue
+            v = extract(p)
+            if v is None or v == "":
+                continue
+            values[attr] = convert(v) if convert is not None else v
+        return cls(**values)
+
+    decode.__name__ = f"decode_{cls.__name__}"
+    return decode
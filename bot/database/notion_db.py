@@ -1,15 +1,14 @@
-from notion_client import Client
 from config import NOTION_TOKEN, NOTION_USERS_DB_ID
 import logging
 from bot.services.actions import log_action
+from bot.database.local_store import local_store
+from bot.database.users_index import users_index
 import notion_client.errors
 import os
 
 
 logger = logging.getLogger(__name__)
 
-notion = Client(auth=NOTION_TOKEN)
-
 def _env_clean(key: str):
     v = os.getenv(key)
     if not v:
@@ -37,9 +36,10 @@ async def add_user_to_notion(user_data: dict) -> str:
         if not all(k in user_data for k in required_fields):
             raise ValueError("Missing required fields")
 
-        response = notion.pages.create(
-            parent={"database_id": NOTION_USERS_DB_ID},
-            properties={
+        # Регистрация пишется локально и сразу видна боту; в Notion её доставит репликация local_store
+        response = local_store.create_page(
+            NOTION_USERS_DB_ID,
+            {
                 "Name": {"title": [{"text": {"content": user_data["name"]}}]},
                 "Telegram ID": {"number": user_data["telegram_id"]},
                 "Username": {"rich_text": [{"text": {"content": user_data["username"]}}]},
@@ -47,9 +47,11 @@ async def add_user_to_notion(user_data: dict) -> str:
                 "Email": {"email": user_data["email"]},
                 "Status": {"select": {"name": user_data["status"]}},
                 "Registration Date": {"date": {"start": user_data["reg_date"]}}
-            }
+            },
         )
 
+        users_index.upsert_page(response)
+
         log_action("notion_add_user_success", user_id, {
             "page_id": response['id']
         })
@@ -92,21 +94,15 @@ async def update_user_in_notion(page_id: str, update_data: dict) -> bool:
             logger.warning("update_user_in_notion called with empty properties payload")
             return False
 
-        # Синхронный вызов клиента допустим внутри async
-        response = notion.pages.update(
-            page_id=page_id,
-            properties=properties,
-        )
+        # Локально сразу; в Notion — через outbox/очередь local_store (переживёт сбой Notion и рестарт)
+        local_store.update_page(page_id, properties)
+        users_index.patch(page_id, **{k: update_data[k] for k in ("name", "email") if update_data.get(k) is not None})
         log_action("notion_update_user_success", update_data.get('telegram_id'), {
             "page_id": page_id,
             "props": list(properties.keys())
         })
         return True
 
-    except notion_client.errors.APIResponseError as e:
-        # Ошибки Notion SDK: выведем message и code
-        logger.error("Notion update failed: %s (code=%s)", getattr(e, "message", str(e)), getattr(e, "code", None))
-        return False
     except Exception as e:
         logger.error("Notion update failed: %s", e, exc_info=True)
         return False
@@ -116,43 +112,17 @@ async def get_user_data(telegram_id: int):
     log_action("notion_get_user_attempt", telegram_id)
 
     try:
-        response = notion.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={
-                "property": "Telegram ID",
-                "number": {"equals": telegram_id}
-            }
-        )
-
-        if not response["results"]:
+        # Локальный индекс Users; в Notion идём только пока он не загружен
+        record = await users_index.lookup(telegram_id)
+        if record is None:
             log_action("notion_user_not_found", telegram_id)
             return None
 
-        page = response["results"][0]
-        properties = page["properties"]
-
-        user_data = {
-            "name": _get_title(properties["Name"]),
-            "email": properties["Email"]["email"],
-            "status": properties["Status"]["select"]["name"],
-            "reg_date": properties["Registration Date"]["date"]["start"],
-            "username": _get_rich_text(properties["Username"]),
-            "language": properties["Language"]["select"]["name"]
-        }
-
         log_action("notion_get_user_success", telegram_id)
-        return user_data
+        return record.as_user_data()
     except Exception as e:
         log_action("notion_get_user_failed", telegram_id, {
             "error": str(e)
         })
         logger.error(f"Notion query error: {e}")
         return None
-
-
-def _get_title(title_property):
-    return title_property["title"][0]["text"]["content"] if title_property["title"] else ""
-
-
-def _get_rich_text(rich_text_property):
-    return rich_text_property["rich_text"][0]["text"]["content"] if rich_text_property["rich_text"] else ""
@@ -1,14 +1,12 @@
 
 import os
-import asyncio
 from typing import Any, Dict, List, Optional
 
-try:
-    from notion_client import Client
-except Exception:  # pragma: no cover
-    Client = None  # type: ignore
-
+from bot.services import notion_gateway
 from bot.services.cache import TTLCache
+from bot.services.cache_registry import cache_registry
+from bot.utils.screens import screens
+from .records import DescriptionRecord, decode_description
 
 # Notion property names
 PROP_SLUG = "Slug/Code"
@@ -17,92 +15,135 @@ PROP_STATUS = "Status"   # SELECT type
 PROP_SHORT = "Short"
 PROP_FULL = "Full"
 
-_cache = TTLCache(ttl_seconds=300)
+# Индекс "slug::language" -> запись. Обновляется дельтами change-feed (apply_page);
+# TTLCache в режиме stale-while-revalidate — страховка на случай, если фид отстал:
+# после мягкого TTL пользователь получает текущий индекс сразу, а полная перезагрузка
+# идёт в фоне. Ждать загрузки приходится только при пустом кэше или после жёсткого TTL.
+SOFT_TTL_SEC = int(os.getenv("DESCRIPTIONS_SOFT_TTL_SEC", "900") or 900)
+HARD_TTL_SEC = int(os.getenv("DESCRIPTIONS_HARD_TTL_SEC", "21600") or 21600)
+
+_cache = TTLCache(ttl_seconds=HARD_TTL_SEC, soft_ttl_seconds=SOFT_TTL_SEC)
 _all_cache_key = "descriptions:all"
 
-def _get_client() -> Client:
-    token = os.getenv("NOTION_TOKEN")
-    if not token:
-        raise RuntimeError("NOTION_TOKEN is not set")
-    return Client(auth=token)
-
-def _rich_text_to_str(rt: List[Dict[str, Any]]) -> str:
-    parts = []
-    for r in rt or []:
-        parts.append(r.get("plain_text") or "")
-    return "".join(parts).strip()
-
-def _page_to_item(page: Dict[str, Any]) -> Dict[str, Any]:
-    props = page.get("properties", {})
-    slug = _rich_text_to_str(props.get(PROP_SLUG, {}).get("rich_text", []))
-    lang = props.get(PROP_LANGUAGE, {}).get("select", {}).get("name") or ""
-    status_val = props.get(PROP_STATUS, {}).get("select", {}).get("name") or ""
-    short = _rich_text_to_str(props.get(PROP_SHORT, {}).get("rich_text", []))
-    full = _rich_text_to_str(props.get(PROP_FULL, {}).get("rich_text", []))
-    return {
-        "slug": slug,
-        "language": lang,
-        "status": status_val,
-        "short": short,
-        "full": full,
-        "id": page.get("id"),
-        "last_edited_time": page.get("last_edited_time"),
-    }
+# Промахи (несуществующий slug/language) не должны приводить к загрузке индекса:
+# - _known — множество известных ключей "slug::language", строится при загрузке индекса
+#   и дополняется change-feed; переживает жёсткий TTL индекса, поэтому неизвестный ключ
+#   отсекается без обращения к Notion;
+# - _negative — кэш отрицательных ответов со своим TTL (для ключей, которые прошли
+#   фильтр, но записи в индексе не оказалось).
+# Полная перезагрузка — только change-feed (reload источника) или /reload_descriptions.
+NEGATIVE_TTL_SEC = int(os.getenv("DESCRIPTIONS_NEGATIVE_TTL_SEC", "600") or 600)
 
-def _fetch_all_sync(db_id: str) -> List[Dict[str, Any]]:
-    client = _get_client()
-    results: List[Dict[str, Any]] = []
-    cursor = None
-    while True:
-        resp = client.databases.query(
-            database_id=db_id,
-            filter={
-                "and": [
-                    {
-                        "property": "Status",
-                        "select": {"equals": "Active"},
-                    }
-                ]
-            }
-        )
-        results.extend(resp.get("results", []))
-        if not resp.get("has_more"):
-            break
-        cursor = resp.get("next_cursor")
-    return [_page_to_item(p) for p in results]
+_negative = TTLCache(ttl_seconds=NEGATIVE_TTL_SEC)
+_known: Optional[frozenset] = None
+_miss_stats: Dict[str, int] = {"filtered": 0, "negative_hits": 0, "negative_stored": 0}
 
-async def preload_all(db_id: Optional[str] = None) -> int:
-    db_id = db_id or os.getenv("NOTION_DESCRIPTIONS_DB_ID", "")
+def _db_id() -> str:
+    return os.getenv("NOTION_DESCRIPTIONS_DB_ID", "")
+
+def _key(it: DescriptionRecord) -> str:
+    return f"{it.slug}::{it.language}"
+
+async def _fetch_all(db_id: str) -> List[DescriptionRecord]:
+    items: List[DescriptionRecord] = []
+    async for page in notion_gateway.iter_query(
+        db_id,
+        filter={
+            "and": [
+                {
+                    "property": "Status",
+                    "select": {"equals": "Active"},
+                }
+            ]
+        },
+    ):
+        items.append(decode_description(page))
+    return items
+
+async def _load_index(db_id: Optional[str] = None) -> Dict[str, DescriptionRecord]:
+    db_id = db_id or _db_id()
     if not db_id:
         raise RuntimeError("NOTION_DESCRIPTIONS_DB_ID is not set")
-    items = await asyncio.to_thread(_fetch_all_sync, db_id)
+    items = await _fetch_all(db_id)
     index = {}
     for it in items:
-        key = f"{it['slug']}::{it['language']}"
-        index[key] = it
+        index[_key(it)] = it
+    _set_known(index)
+    return index
+
+def _set_known(index: Dict[str, DescriptionRecord]) -> None:
+    global _known
+    _known = frozenset(index)
+    _negative.clear()
+    screens.invalidate("descriptions")   # источник текстов перезагружен — экраны собрать заново
+
+async def preload_all(db_id: Optional[str] = None) -> int:
+    index = await _load_index(db_id)
     _cache.set(_all_cache_key, index)
     return len(index)
 
-def _get_index() -> Dict[str, Dict[str, Any]]:
-    return _cache.get(_all_cache_key) or {}
+def apply_page(page: Dict[str, Any]) -> None:
+    """Изменение страницы из change-feed: обновить/убрать одну запись."""
+    it = decode_description(page)
+    if it.status == "Active":
+        _remember(_key(it))
+    screens.invalidate("descriptions")
+    index = _cache.get(_all_cache_key)
+    if index is None:
+        return
+    for key, old in list(index.items()):
+        if old.page_id == it.page_id:
+            index.pop(key, None)
+    if it.status == "Active":
+        index[_key(it)] = it
+
+def _remember(key: str) -> None:
+    # новый ключ должен пройти фильтр, даже если индекс сейчас не загружен;
+    # удалённые ключи в фильтре остаются (дадут промах в индексе -> negative cache)
+    global _known
+    if _known is not None and key not in _known:
+        _known = _known | {key}
+    _negative.delete(key)
+
+def is_loaded() -> bool:
+    return _cache.get(_all_cache_key) is not None
+
+async def _get_index() -> Dict[str, DescriptionRecord]:
+    return await _cache.get_or_load(_all_cache_key, _load_index)
 
 async def reload() -> int:
-    _cache.clear()
     return await preload_all()
 
+def _known_miss(key: str) -> bool:
+    if _known is not None and key not in _known:
+        _miss_stats["filtered"] += 1
+        return True
+    if _negative.get(key) is not None:
+        _miss_stats["negative_hits"] += 1
+        return True
+    return False
+
 async def get_text(slug: str, language: str, kind: str = "full") -> Optional[str]:
-    idx = _get_index()
     key = f"{slug}::{language}"
+    if _known_miss(key):
+        return None
+    idx = await _get_index()
     item = idx.get(key)
     if not item:
-        await preload_all()
-        idx = _get_index()
-        item = idx.get(key)
-        if not item:
-            return None
+        _negative.set(key, True)
+        _miss_stats["negative_stored"] += 1
+        return None
     if kind == "short":
-        return item.get("short") or None
-    return item.get("full") or None
+        return item.short or None
+    return item.full or None
 
 def cache_info() -> Dict[str, Any]:
-    return _cache.info()
+    return {
+        **_cache.info(),
+        "known_keys": len(_known) if _known is not None else None,
+        "negative_keys": _negative.info()["entries"],
+        **_miss_stats,
+    }
+
+cache_registry.register("descriptions", cache_info, root=_cache.root)
+cache_registry.register("descriptions_negative", _negative.info, root=_negative.root)
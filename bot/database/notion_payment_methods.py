@@ -1,14 +1,11 @@
 
 import os
-import asyncio
 from typing import Any, Dict, List, Optional
 
-try:
-    from notion_client import Client
-except Exception as e:  # pragma: no cover
-    Client = None  # type: ignore
-
+from bot.services import notion_gateway
 from bot.services.cache import TTLCache
+from bot.services.cache_registry import cache_registry
+from .records import PaymentMethodRecord, decode_payment_method
 
 # Notion property names
 PROP_CODE = "Code"
@@ -21,107 +18,82 @@ PROP_DETAILS_SLUG = "Details Slug"
 PROP_RATE_PER_EUR = "Rate per 1 EUR"
 PROP_ROUND_TO = "Round to"
 
-_cache = TTLCache(ttl_seconds=300)
-_all_cache_key = "payment_methods:all"
+# code -> метод; обновляется дельтами change-feed (apply_page), TTLCache — в режиме
+# stale-while-revalidate (после мягкого TTL перезагрузка идёт в фоне, см. notion_descriptions)
+SOFT_TTL_SEC = int(os.getenv("PAYMENT_METHODS_SOFT_TTL_SEC", "900") or 900)
+HARD_TTL_SEC = int(os.getenv("PAYMENT_METHODS_HARD_TTL_SEC", "21600") or 21600)
 
-def _get_client() -> Client:
-    token = os.getenv("NOTION_TOKEN")
-    if not token:
-        raise RuntimeError("NOTION_TOKEN is not set")
-    return Client(auth=token)
-
-def _rich_text_to_str(rt: List[Dict[str, Any]]) -> str:
-    parts = []
-    for r in rt or []:
-        t = r.get("plain_text") or ""
-        parts.append(t)
-    return "".join(parts).strip()
-
-def _page_to_item(page: Dict[str, Any]) -> Dict[str, Any]:
-    props = page.get("properties", {})
-    code = _rich_text_to_str(props.get(PROP_CODE, {}).get("rich_text", []))
-    active = props.get(PROP_ACTIVE, {}).get("checkbox", False)
-    order = props.get(PROP_ORDER, {}).get("number", 0) or 0
-    currency = props.get(PROP_CURRENCY, {}).get("select", {}).get("name") or ""
-    btn_ru = _rich_text_to_str(props.get(PROP_BTN_RU, {}).get("rich_text", []))
-    btn_en = _rich_text_to_str(props.get(PROP_BTN_EN, {}).get("rich_text", []))
-    details_slug = _rich_text_to_str(props.get(PROP_DETAILS_SLUG, {}).get("rich_text", []))
-    rate = props.get(PROP_RATE_PER_EUR, {}).get("number", None)
-    round_to = props.get(PROP_ROUND_TO, {}).get("number", None)
-
-    return {
-        "code": code,
-        "active": bool(active),
-        "order": order,
-        "currency": currency,
-        "button_ru": btn_ru,
-        "button_en": btn_en,
-        "details_slug": details_slug,
-        "rate_per_eur": float(rate) if rate is not None else None,
-        "round_to": float(round_to) if round_to is not None else None,
-        "id": page.get("id"),
-        "last_edited_time": page.get("last_edited_time"),
-    }
-
-def _fetch_all_sync(db_id: str) -> List[Dict[str, Any]]:
-    client = _get_client()
-    results: List[Dict[str, Any]] = []
-    cursor = None
-    while True:
-        resp = client.databases.query(
-            **({"database_id": db_id, "start_cursor": cursor} if cursor else {"database_id": db_id}),
-            filter={
-                "and": [
-                    {
-                        "property": PROP_ACTIVE,
-                        "checkbox": {"equals": True}
-                    }
-                ]
-            },
-            sorts=[{"property": PROP_ORDER, "direction": "ascending"}]
-        )
-        results.extend(resp.get("results", []))
-        if not resp.get("has_more"):
-            break
-        cursor = resp.get("next_cursor")
-    return [_page_to_item(p) for p in results]
+_cache = TTLCache(ttl_seconds=HARD_TTL_SEC, soft_ttl_seconds=SOFT_TTL_SEC)
+_all_cache_key = "payment_methods:all"
 
-async def preload_all(db_id: Optional[str] = None) -> int:
-    db_id = db_id or os.getenv("NOTION_PAYMENT_METHODS_DB_ID", "")
+def _db_id() -> str:
+    return os.getenv("NOTION_PAYMENT_METHODS_DB_ID", "")
+
+async def _fetch_all(db_id: str) -> List[PaymentMethodRecord]:
+    items: List[PaymentMethodRecord] = []
+    async for page in notion_gateway.iter_query(
+        db_id,
+        filter={
+            "and": [
+                {
+                    "property": PROP_ACTIVE,
+                    "checkbox": {"equals": True}
+                }
+            ]
+        },
+        sorts=[{"property": PROP_ORDER, "direction": "ascending"}],
+    ):
+        items.append(decode_payment_method(page))
+    return items
+
+async def _load_index(db_id: Optional[str] = None) -> Dict[str, PaymentMethodRecord]:
+    db_id = db_id or _db_id()
     if not db_id:
         raise RuntimeError("NOTION_PAYMENT_METHODS_DB_ID is not set")
-    items = await asyncio.to_thread(_fetch_all_sync, db_id)
-    index: Dict[str, Dict[str, Any]] = {}
+    items = await _fetch_all(db_id)
+    index: Dict[str, PaymentMethodRecord] = {}
     for it in items:
-        if not it.get("code"):
+        if not it.code:
             # skip invalid row
             continue
-        index[it["code"]] = it
+        index[it.code] = it
+    return index
+
+async def preload_all(db_id: Optional[str] = None) -> int:
+    index = await _load_index(db_id)
     _cache.set(_all_cache_key, index)
     return len(index)
 
-def _get_index() -> Dict[str, Dict[str, Any]]:
-    idx = _cache.get(_all_cache_key)
-    return idx or {}
+def apply_page(page: Dict[str, Any]) -> None:
+    """Изменение страницы из change-feed: обновить/убрать один метод."""
+    index = _cache.get(_all_cache_key)
+    if index is None:
+        return
+    it = decode_payment_method(page)
+    for code, old in list(index.items()):
+        if old.page_id == it.page_id:
+            index.pop(code, None)
+    if it.active and it.code:
+        index[it.code] = it
+
+def is_loaded() -> bool:
+    return _cache.get(_all_cache_key) is not None
+
+async def _get_index() -> Dict[str, PaymentMethodRecord]:
+    return await _cache.get_or_load(_all_cache_key, _load_index)
 
 async def reload() -> int:
-    _cache.clear()
     return await preload_all()
 
 async def get_all() -> List[Dict[str, Any]]:
-    idx = _get_index()
-    if not idx:
-        await preload_all()
-        idx = _get_index()
+    idx = await _get_index()
     # return as sorted list by 'order'
-    return sorted(idx.values(), key=lambda x: x.get("order", 0))
+    return [m.as_dict() for m in sorted(idx.values(), key=lambda x: x.order)]
 
 async def get(code: str) -> Optional[Dict[str, Any]]:
-    idx = _get_index()
-    if not idx:
-        await preload_all()
-        idx = _get_index()
-    return idx.get(code)
+    idx = await _get_index()
+    rec = idx.get(code)
+    return rec.as_dict() if rec else None
 
 def compute_amount_eur_to_method(price_eur: float, method: Dict[str, Any]) -> float:
     rate = method.get("rate_per_eur")
@@ -137,3 +109,5 @@ def compute_amount_eur_to_method(price_eur: float, method: Dict[str, Any]) -> fl
 
 def cache_info() -> Dict[str, Any]:
     return _cache.info()
+
+cache_registry.register("payment_methods", cache_info, root=_cache.root)
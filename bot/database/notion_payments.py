@@ -1,9 +1,8 @@
 # bot/database/notion_payments.py
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 
-from notion_client import Client
-from config import NOTION_TOKEN
 from config import (
     NOTION_USERS_DB_ID,
     NOTION_PRODUCTS_DB_ID,
@@ -11,17 +10,19 @@ from config import (
     NOTION_PURCHASES_DB_ID,
 )
 
-from bot.utils.product_codes import type_to_slug
-
-# Инвалидация кэша (если модуль установлен). Не критично.
-try:
-    from .user_products_cache import invalidate as invalidate_user_products_cache  # type: ignore
-except Exception:
-    def invalidate_user_products_cache(_uid: int):  # type: ignore
-        pass
+from bot.services import notion_gateway
+from bot.services.notion_scheduler import Priority
+from bot.services.saga import StepContext, sagas
+from .entitlements import Entitlement
+from .local_store import local_store, new_page_id
+from .notion_user_products import entitlements
+from .products_index import products_index, ProductRecord
+from .purchases_index import purchases_index
+from .records import decode_payment
+from .schema_registry import schema_registry
+from .users_index import get_user_page_id
 
 logger = logging.getLogger(__name__)
-_client = Client(auth=NOTION_TOKEN) if NOTION_TOKEN else None
 
 PRODUCT_NAME_PROP = "Product Name"
 EXPIRES_AT_PROP = "Expires at"
@@ -30,89 +31,70 @@ def _safe_id(v):
     return v if v and isinstance(v, str) else None
 
 def _db_ready():
-    return bool(NOTION_TOKEN and NOTION_PAYMENTS_DB_ID and _client is not None)
+    return bool(NOTION_PAYMENTS_DB_ID and notion_gateway.is_configured())
 
-def _get_product_page_by_slug(slug: str):
-    if not _safe_id(NOTION_PRODUCTS_DB_ID) or not slug or _client is None:
+async def _get_product_by_slug(slug: str, *, priority: Priority = Priority.INTERACTIVE) -> ProductRecord | None:
+    if not _safe_id(NOTION_PRODUCTS_DB_ID) or not slug:
         return None
     try:
-        r = _client.databases.query(
-            database_id=NOTION_PRODUCTS_DB_ID,
-            filter={"property": "Slug/Code", "rich_text": {"equals": slug}}
-        )
-        if r["results"]:
-            return r["results"][0]
+        return await products_index.lookup_slug(slug, priority=priority)
     except Exception as e:
-        logger.warning("Products query failed for slug %s: %s", slug, e)
+        logger.warning("Products lookup failed for slug %s: %s", slug, e)
     return None
 
-def _get_user_page_by_tg(telegram_id: int):
+async def _get_product_by_page(page_id: str) -> ProductRecord | None:
+    if not page_id:
+        return None
+    try:
+        return await products_index.lookup_page(page_id)
+    except Exception as e:
+        logger.warning("Products lookup failed for page %s: %s", page_id, e)
+    return None
+
+async def _get_user_page_by_tg(telegram_id: int):
     if not _safe_id(NOTION_USERS_DB_ID):
         return None
     try:
-        r = _client.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Telegram ID", "number": {"equals": int(telegram_id)}}
-        )
-        if r["results"]:
-            return r["results"][0]["id"]
+        return await get_user_page_id(telegram_id)
     except Exception as e:
         logger.warning("Users query by telegram id failed: %s", e)
     return None
 
-def _ensure_fast_fields_exist():
-    """Гарантирует наличие свойств PRODUCT_NAME_PROP (rich_text) и EXPIRES_AT_PROP (date) в БД Payments."""
+async def _ensure_fast_fields_exist():
+    """Гарантирует наличие свойств PRODUCT_NAME_PROP (rich_text) и EXPIRES_AT_PROP (date) в БД Payments.
+    Схема берётся из schema_registry, поэтому после первого вызова запросов в Notion нет."""
     try:
-        db = _client.databases.retrieve(NOTION_PAYMENTS_DB_ID)
-        props = db.get("properties", {}) or {}
-        need_update = {}
-        if PRODUCT_NAME_PROP not in props:
-            need_update[PRODUCT_NAME_PROP] = {"rich_text": {}}
-        if EXPIRES_AT_PROP not in props:
-            need_update[EXPIRES_AT_PROP] = {"date": {}}
-        if need_update:
-            _client.databases.update(NOTION_PAYMENTS_DB_ID, properties=need_update)
-            logger.info("Added missing properties to Payments DB: %s", ", ".join(need_update.keys()))
+        await schema_registry.ensure_properties(NOTION_PAYMENTS_DB_ID, {
+            PRODUCT_NAME_PROP: {"rich_text": {}},
+            EXPIRES_AT_PROP: {"date": {}},
+        })
     except Exception as e:
         logger.warning("Failed to ensure fast fields exist: %s", e)
 
-def _set_payment_products_relation(payment_page_id: str, product_page_id: str):
+async def _type_prop(canonical_type: str) -> dict:
+    """Type в Payments бывает select или rich_text — смотрим по закэшированной схеме."""
     try:
-        _client.pages.update(page_id=payment_page_id, properties={
-            "Products": {"relation": [{"id": product_page_id}]}
-        })
-        return True
-    except Exception as e:
-        logger.warning("Failed to set Products relation on Payment %s: %s", payment_page_id, e)
-        return False
+        type_kind = await schema_registry.prop_type(NOTION_PAYMENTS_DB_ID, "Type")
+    except Exception:
+        type_kind = None
+    if type_kind == "select":
+        return {"select": {"name": canonical_type}}
+    return {"rich_text": [{"text": {"content": canonical_type}}]}
 
-def _set_payment_fast_fields(payment_page_id: str, *, product_name: str|None, expires_at_iso: str|None):
-    """Заполняем быстрые поля на самой странице Payments."""
-    _ensure_fast_fields_exist()
+def _fast_fields_props(*, product_name: str|None, expires_at_iso: str|None) -> dict:
+    """Быстрые поля на самой странице Payments."""
     props = {}
     if product_name:
         props[PRODUCT_NAME_PROP] = {"rich_text": [{"text": {"content": product_name}}]}
     if expires_at_iso:
         props[EXPIRES_AT_PROP] = {"date": {"start": expires_at_iso}}
-    if not props:
-        return
-    try:
-        _client.pages.update(page_id=payment_page_id, properties=props)
-    except Exception as e:
-        logger.warning("Failed to set fast fields on Payment %s: %s", payment_page_id, e)
+    return props
 
-def _get_payment_type_value(payment_page: dict) -> str | None:
-    t = payment_page.get("properties", {}).get("Type")
-    if not isinstance(t, dict):
-        return None
-    if t.get("select"):
-        return t["select"].get("name")
-    if t.get("rich_text"):
-        parts = []
-        for s in t["rich_text"]:
-            parts.append(s.get("plain_text") or s.get("text", {}).get("content", ""))
-        return "".join(parts).strip() or None
-    return None
+async def _has_prop(db_id: str, name: str) -> bool:
+    try:
+        return await schema_registry.prop_type(db_id, name) is not None
+    except Exception:
+        return False
 
 async def create_payment_record(*, user_telegram_id: int, payment_type: str, proof_file_id: str, product_code: str|None=None, username: str|None=None, name: str|None=None) -> str|None:
     """Создаёт Payment c каноническим Type, Products и мгновенно записывает Product Name (если найден продукт)."""
@@ -120,26 +102,22 @@ async def create_payment_record(*, user_telegram_id: int, payment_type: str, pro
         return None
 
     # Гарантируем наличие быстрых полей на уровне БД
-    _ensure_fast_fields_exist()
+    await _ensure_fast_fields_exist()
 
     # Канонизируем тип до slug
-    slug = product_code or type_to_slug(payment_type)
+    slug = product_code or products_index.slug_for_type(payment_type)
     canonical_type = slug or payment_type
 
     # Relations
     product_relation = []
-    product_page = None
     product_name = None
     if slug:
-        product_page = _get_product_page_by_slug(slug)
-        if product_page:
-            product_relation = [{"id": product_page["id"]}]
-            try:
-                product_name = product_page["properties"]["Name"]["title"][0]["plain_text"]
-            except Exception:
-                product_name = None
+        product = await _get_product_by_slug(slug, priority=Priority.BACKGROUND)
+        if product:
+            product_relation = [{"id": product.page_id}]
+            product_name = product.name or None
 
-    user_page_id = _get_user_page_by_tg(user_telegram_id)
+    user_page_id = await _get_user_page_by_tg(user_telegram_id)
 
     # Properties
     props = {
@@ -149,16 +127,7 @@ async def create_payment_record(*, user_telegram_id: int, payment_type: str, pro
         "Status": {"select": {"name": "submitted"}},
     }
 
-    # Type kind
-    try:
-        db = _client.databases.retrieve(NOTION_PAYMENTS_DB_ID)
-        type_kind = db.get("properties", {}).get("Type", {}).get("type")
-    except Exception:
-        type_kind = None
-    if type_kind == "select":
-        props["Type"] = {"select": {"name": canonical_type}}
-    else:
-        props["Type"] = {"rich_text": [{"text": {"content": canonical_type}}]}
+    props["Type"] = await _type_prop(canonical_type)
 
     if user_page_id:
         props["User"] = {"relation": [{"id": user_page_id}]}
@@ -168,124 +137,168 @@ async def create_payment_record(*, user_telegram_id: int, payment_type: str, pro
         props[PRODUCT_NAME_PROP] = {"rich_text": [{"text": {"content": product_name}}]}
 
     try:
-        page = _client.pages.create(parent={"database_id": NOTION_PAYMENTS_DB_ID}, properties=props)
+        # Локально и сразу; pages.create в Notion делает репликация local_store
+        # (если Type сменил тип в Notion — она перечитает схему и подгонит свойства)
+        page = local_store.create_page(NOTION_PAYMENTS_DB_ID, props)
         return page["id"]
     except Exception as e:
         logger.error("Failed to create payment record: %s", e)
         return None
 
-async def approve_payment_and_issue_access(*, user_telegram_id: int, admin_telegram_id: int, payment_type: str, notion_payment_id: str|None=None, product_code: str|None=None):
-    """Mark payment paid, ensure Products relation, set fast fields (Product Name/Expires), invalidate cache, create Purchases."""
-    if not _db_ready() or notion_payment_id is None:
-        return
+# ---------- Подтверждение оплаты (сага, см. bot.services.saga) ----------
+# resolve -> [purchase | payment patch | grant] -> [Linked Purchase | entitlements].
+# Шаги одной группы друг от друга не зависят и идут параллельно. Журнал шагов — в SQLite:
+# повторное подтверждение того же платежа ничего не делает, прерванное — продолжается.
+APPROVAL_SAGA = "approve_payment"
 
-    # Обеспечим быстрые поля
-    _ensure_fast_fields_exist()
+async def _approval_resolve(ctx: StepContext) -> dict:
+    """Платёж, продукт и пользователь — параллельно; продукт из каталога products_index."""
+    st = ctx.state
+    slug = st.get("product_code") or products_index.slug_for_type(st.get("payment_type") or "")
 
-    # 1) Mark paid + processed at + admin
-    try:
-        props = {
-            "Status": {"select": {"name": "paid"}},
-            "Processed at": {"date": {"start": datetime.now(timezone.utc).isoformat()}},
-        }
+    async def _payment():
         try:
-            props["Admin"] = {"rich_text": [{"text": {"content": str(admin_telegram_id)}}]}
-        except Exception:
-            pass
-        _client.pages.update(page_id=notion_payment_id, properties=props)
-    except Exception as e:
-        logger.error("Failed to update payment status: %s", e)
-
-    # 2) Retrieve payment page
-    try:
-        payment_page = _client.pages.retrieve(notion_payment_id)
-    except Exception as e:
-        logger.warning("Failed to retrieve payment page: %s", e)
-        payment_page = None
-
-    # 3) Resolve product_page
-    product_page = None
-    slug = product_code or type_to_slug(payment_type)
-    if not product_page and slug:
-        product_page = _get_product_page_by_slug(slug)
-    if not product_page and payment_page:
+            return decode_payment(await local_store.retrieve(ctx.key))
+        except Exception as e:
+            logger.warning("Failed to retrieve payment page: %s", e)
+            return None
+
+    async def _product():
+        return await _get_product_by_slug(slug) if slug else None
+
+    payment, product, user_page_id, _ = await asyncio.gather(
+        _payment(), _product(), _get_user_page_by_tg(st["user_telegram_id"]), _ensure_fast_fields_exist(),
+    )
+    if not product and payment:
         # из relation
-        try:
-            rel = payment_page.get("properties", {}).get("Products", {}).get("relation", [])
-            if rel:
-                rid = rel[0].get("id")
-                if rid:
-                    product_page = _client.pages.retrieve(rid)
-        except Exception:
-            pass
-    if not product_page and payment_page:
+        if payment.products:
+            product = await _get_product_by_page(payment.products[0])
+    if not product and payment:
         # из Type
-        try:
-            tslug = type_to_slug(_get_payment_type_value(payment_page) or "")
-            if tslug:
-                product_page = _get_product_page_by_slug(tslug)
-        except Exception:
-            pass
+        tslug = products_index.slug_for_type(payment.type or "")
+        if tslug and tslug != slug:
+            product = await _get_product_by_slug(tslug)
+
+    expires_at = None
+    if product and product.access_days:
+        paid_at = datetime.fromisoformat(st["paid_at"])
+        expires_at = (paid_at + timedelta(days=int(product.access_days))).isoformat()
+    return {
+        "product_page_id": product.page_id if product else None,
+        "product_name": (product.name or None) if product else None,
+        "expires_at": expires_at,
+        "user_page_id": user_page_id,
+        # платёж уже связан с покупкой (например, подтверждён до появления журнала)
+        "purchase_id": payment.linked_purchase_id if payment else None,
+    }
 
-    # 4) Ensure Products relation and fast fields
-    product_name = None
-    expires_iso = None
-    if product_page:
-        _set_payment_products_relation(notion_payment_id, product_page["id"])
-        try:
-            product_name = product_page["properties"]["Name"]["title"][0]["plain_text"]
-        except Exception:
-            product_name = None
+async def _find_purchase_for_payment(payment_id: str) -> str|None:
+    if not await _has_prop(NOTION_PURCHASES_DB_ID, "Payment"):
+        return None
+    # сначала локально: Purchase, созданная этим шагом, лежит в local_store, даже если ещё не в Notion
+    for page in local_store.find(NOTION_PURCHASES_DB_ID, "Payment", payment_id):
+        return page["id"]
+    if local_store.is_pending(payment_id):
+        return None
+    async for row in notion_gateway.iter_query(
+        NOTION_PURCHASES_DB_ID,
+        filter={"property": "Payment", "relation": {"contains": local_store.resolve_id(payment_id)}},
+        limit=1,
+    ):
+        return row["id"]
+    return None
 
-        paid_at = datetime.now(timezone.utc)
-        access_days = product_page["properties"].get("Access days", {}).get("number")
-        if access_days:
-            expires_iso = (paid_at + timedelta(days=int(access_days))).isoformat()
-    _set_payment_fast_fields(notion_payment_id, product_name=product_name, expires_at_iso=expires_iso)
+async def _approval_purchase(ctx: StepContext) -> dict|None:
+    """Ровно одна Purchase на Payment."""
+    st = ctx.state
+    if st.get("purchase_id") or not st.get("product_page_id") or not _safe_id(NOTION_PURCHASES_DB_ID):
+        return None
+    if ctx.resumed and not st.get("purchase_local_id"):
+        # шаг прервался в журнале без purchase_local_id: Purchase могла успеть создаться — ищем её
+        found = await _find_purchase_for_payment(ctx.key)
+        if found:
+            return {"purchase_id": found}
+
+    purchase_props = {
+        "Name": {"title": [{"text": {"content": f"Purchase {(st.get('product_name') or 'product')} {st['user_telegram_id']}"}}]},
+        "Status": {"select": {"name": "paid"}},
+        "Paid at": {"date": {"start": st["paid_at"]}},
+        "Product": {"relation": [{"id": st["product_page_id"]}]},
+    }
+    if st.get("user_page_id"):
+        purchase_props["User"] = {"relation": [{"id": st["user_page_id"]}]}
+    if st.get("expires_at"):
+        purchase_props["Expires at"] = {"date": {"start": st["expires_at"]}}
+    # Свяжем оба конца, если свойства есть в схемах
+    if await _has_prop(NOTION_PURCHASES_DB_ID, "Payment"):
+        purchase_props["Payment"] = {"relation": [{"id": ctx.key}]}
+
+    # id покупки — в журнал до создания: продолженный шаг вернёт ту же страницу, даже если
+    # у Purchases нет relation Payment, по которому её можно найти
+    if not st.get("purchase_local_id"):
+        ctx.checkpoint(purchase_local_id=new_page_id())
+    purchase_page = local_store.create_page(NOTION_PURCHASES_DB_ID, purchase_props, page_id=st["purchase_local_id"])
+    purchases_index.upsert_page(purchase_page)
+    return {"purchase_id": purchase_page["id"]}
+
+async def _approval_payment(ctx: StepContext) -> None:
+    """Изменения Payment одним патчем: локально сразу, в Notion — через outbox (переживёт рестарт).
+    Linked Purchase ставит _approval_link: покупка создаётся параллельно с этим шагом."""
+    st = ctx.state
+    patch = {
+        "Status": {"select": {"name": "paid"}},
+        "Processed at": {"date": {"start": st["paid_at"]}},
+    }
+    if st.get("admin_telegram_id") is not None:
+        patch["Admin"] = {"rich_text": [{"text": {"content": str(st["admin_telegram_id"])}}]}
+    if st.get("product_page_id"):
+        patch["Products"] = {"relation": [{"id": st["product_page_id"]}]}
+        patch.update(_fast_fields_props(product_name=st.get("product_name"), expires_at_iso=st.get("expires_at")))
+    local_store.update_page(ctx.key, patch)
+
+async def _approval_link(ctx: StepContext) -> None:
+    """Payment -> Purchase; в outbox сливается с патчем _approval_payment, если тот ещё не ушёл."""
+    st = ctx.state
+    if st.get("purchase_id") and await _has_prop(NOTION_PAYMENTS_DB_ID, "Linked Purchase"):
+        local_store.update_page(ctx.key, {"Linked Purchase": {"relation": [{"id": st["purchase_id"]}]}})
+
+async def _approval_grant(ctx: StepContext) -> None:
+    # so user sees product instantly: продукт сразу в виде entitlements, до записи Payment/Purchase
+    st = ctx.state
+    try:
+        if st.get("product_name"):
+            expires_at = datetime.fromisoformat(st["expires_at"]) if st.get("expires_at") else None
+            entitlements.grant(st["user_telegram_id"], Entitlement(ctx.key, st["product_name"], expires_at))
+    except Exception as e:
+        logger.warning("Entitlements grant failed: %s", e)
 
-    # 5) Invalidate cache (so user sees product instantly)
+async def _approval_entitlements(ctx: StepContext) -> None:
+    # фоновая сверка вида с хранилищем — после патча Payment, чтобы пересборка читала уже оплаченный платёж
     try:
-        invalidate_user_products_cache(user_telegram_id)
-    except Exception:
-        pass
+        entitlements.invalidate(ctx.state["user_telegram_id"])
+    except Exception as e:
+        logger.warning("Entitlements update failed: %s", e)
 
-    # 6) Create Purchase (optional, if Purchases DB configured and product resolved)
-    if not _safe_id(NOTION_PURCHASES_DB_ID) or not product_page:
-        return
+sagas.register(APPROVAL_SAGA, [
+    ("resolve", _approval_resolve),
+    [("purchase", _approval_purchase), ("payment", _approval_payment), ("grant", _approval_grant)],
+    [("link", _approval_link), ("entitlements", _approval_entitlements)],
+])
 
+async def approve_payment_and_issue_access(*, user_telegram_id: int, admin_telegram_id: int|None=None, payment_type: str|None=None, notion_payment_id: str|None=None, product_code: str|None=None):
+    """Mark payment paid, ensure Products relation, set fast fields (Product Name/Expires), invalidate cache, create Purchases.
+    Идемпотентно: повторный вызов для того же платежа возвращает сохранённый результат."""
+    if not _db_ready() or notion_payment_id is None:
+        return None
     try:
-        user_page_id = _get_user_page_by_tg(user_telegram_id)
-
-        paid_at = datetime.now(timezone.utc)
-        access_days = product_page["properties"].get("Access days", {}).get("number")
-        expires_at = (paid_at + timedelta(days=int(access_days))) if access_days else None
-
-        purchase_props = {
-            "Name": {"title": [{"text": {"content": f"Purchase {(product_name or 'product')} {user_telegram_id}"}}]},
-            "Status": {"select": {"name": "paid"}},
-            "Paid at": {"date": {"start": paid_at.isoformat()}},
-            "Product": {"relation": [{"id": product_page["id"]}]},
-        }
-        if user_page_id:
-            purchase_props["User"] = {"relation": [{"id": user_page_id}]}
-        if expires_at:
-            purchase_props["Expires at"] = {"date": {"start": expires_at.isoformat()}}
-
-        purchase_page = _client.pages.create(parent={"database_id": NOTION_PURCHASES_DB_ID}, properties=purchase_props)
-
-        # Свяжем оба конца, если свойства есть
-        try:
-            _client.pages.update(page_id=notion_payment_id, properties={
-                "Linked Purchase": {"relation": [{"id": purchase_page["id"]}]}
-            })
-        except Exception:
-            pass
-        try:
-            _client.pages.update(page_id=purchase_page["id"], properties={
-                "Payment": {"relation": [{"id": notion_payment_id}]}
-            })
-        except Exception:
-            pass
-
+        return await sagas.run(APPROVAL_SAGA, notion_payment_id, {
+            "user_telegram_id": int(user_telegram_id),
+            "admin_telegram_id": admin_telegram_id,
+            "payment_type": payment_type,
+            "product_code": product_code,
+            "paid_at": datetime.now(timezone.utc).isoformat(),
+        })
     except Exception as e:
-        logger.error("Failed to create Purchase and link: %s", e)
+        # журнал сохранён — сага будет продолжена фоновым sagas.run_resume_loop()
+        logger.error("Payment approval %s interrupted: %s", notion_payment_id, e)
+        return None
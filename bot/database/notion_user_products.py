@@ -1,26 +1,29 @@
 import logging
-from datetime import datetime, timezone
+from datetime import datetime
 from typing import List, Dict, Any
 
-from notion_client import Client
 from config import (
-    NOTION_TOKEN,
     NOTION_USERS_DB_ID,
     NOTION_PURCHASES_DB_ID,
     NOTION_PRODUCTS_DB_ID,
     NOTION_PAYMENTS_DB_ID,
 )
 
-from .user_products_cache import get_cached, set_cached
+from bot.services import notion_gateway
+from bot.services.cache_registry import cache_registry
+from .entitlements import Entitlement, EntitlementsStore
+from .local_store import local_store
+from .purchases_index import purchases_index
+from .records import decode_payment, decode_purchase
+from .users_index import get_user_page_id
 
 logger = logging.getLogger(__name__)
-client = Client(auth=NOTION_TOKEN) if NOTION_TOKEN else None
 
 def _clean_id(v):
     return v if v and isinstance(v, str) else None
 
 def _ready() -> bool:
-    return bool(NOTION_TOKEN and client is not None and (_clean_id(NOTION_PAYMENTS_DB_ID) or _clean_id(NOTION_PURCHASES_DB_ID)))
+    return bool(notion_gateway.is_configured() and (_clean_id(NOTION_PAYMENTS_DB_ID) or _clean_id(NOTION_PURCHASES_DB_ID)))
 
 def _iso_to_dt(s: str):
     if not s:
@@ -32,74 +35,70 @@ def _iso_to_dt(s: str):
     except Exception:
         return None
 
-def _get_user_page(telegram_id: int) -> str | None:
+async def _get_user_page(telegram_id: int) -> str | None:
     if not _clean_id(NOTION_USERS_DB_ID):
         return None
     try:
-        u = client.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Telegram ID", "number": {"equals": int(telegram_id)}}
-        )
-        if u["results"]:
-            return u["results"][0]["id"]
+        return await get_user_page_id(telegram_id)
     except Exception as e:
         logger.warning("Users lookup failed: %s", e)
     return None
 
-def _read_payment_fast(row: Dict[str, Any]) -> Dict[str, Any] | None:
+def _read_payment_fast(row: Dict[str, Any]) -> Entitlement | None:
     """
     Быстрый путь: читаем из Payments предзаполненные поля 'Product Name' и 'Expires at'.
     Никаких дополнительных запросов к Notion.
     """
-    props = row.get("properties", {})
-    name = None
-    try:
-        rt = props.get("Product Name", {}).get("rich_text", [])
-        if rt:
-            name = "".join([(s.get("plain_text") or s.get("text", {}).get("content", "")) for s in rt]).strip()
-    except Exception:
-        pass
-    if not name:
-        # fallback: попробуем через Title Name, если вы его стали дублировать
-        try:
-            name = props.get("Name", {}).get("title", [{}])[0].get("plain_text")
-        except Exception:
-            name = None
-
-    expires = None
-    try:
-        dt = props.get("Expires at", {}).get("date", {}).get("start")
-        expires = _iso_to_dt(dt)
-    except Exception:
-        pass
-
+    rec = decode_payment(row)
+    # fallback: Title Name, если вы его стали дублировать
+    name = rec.product_name or rec.title
     if name:
-        return {"name": name, "expires_at": expires}
+        return Entitlement(rec.page_id, name, _iso_to_dt(rec.expires_at))
     return None
 
-async def list_user_products(user_telegram_id: int):
+def _read_purchase(rec) -> Entitlement | None:
+    # ожидаем, что тут тоже есть предрасчитанная дата (Expires at) и rollup имени продукта;
+    # fallback: возьмём просто текст названия покупки
+    name = rec.product_name or rec.title
+    if not name:
+        return None
+    return Entitlement(rec.page_id, name, _iso_to_dt(rec.expires_at))
+
+async def _load_entitlements(user_telegram_id: int) -> List[Entitlement]:
     """
-    Возвращает список активных продуктов пользователя.
-    Приоритет: быстрый путь по Payments -> (опционально) Purchases как fallback.
+    Загрузчик вида entitlements: активные продукты пользователя из Notion.
+    Приоритет: быстрый путь по Payments -> Purchases как fallback.
+    Истёкшие отбрасывает сам EntitlementsStore.
     """
-    # 0) Кэш
-    cached = get_cached(user_telegram_id)
-    if cached is not None:
-        return cached
-
     if not _ready():
         return []
 
-    user_page_id = _get_user_page(user_telegram_id)
-
-    items: List[Dict[str, Any]] = []
-    now = datetime.now(timezone.utc)
+    user_page_id = await _get_user_page(user_telegram_id)
+    items: List[Entitlement] = []
 
     # 1) FAST PATH: Payments с уже записанными 'Product Name' и 'Expires at'
+    #    из local_store (там и ещё не доставленные в Notion платежи); в Notion — только пока
+    #    база Payments не зеркалирована локально. Строки пользователя берутся по индексу
+    #    page_keys (Telegram ID / User), а не перебором всех платежей
+    seen = set()
     if _clean_id(NOTION_PAYMENTS_DB_ID):
         try:
-            or_conditions = [{"property": "Telegram ID", "number": {"equals": int(user_telegram_id)}}]
+            rows = local_store.pages_where(NOTION_PAYMENTS_DB_ID, "Telegram ID", int(user_telegram_id))
             if user_page_id:
+                rows += local_store.find(NOTION_PAYMENTS_DB_ID, "User", user_page_id)
+            for row in rows:
+                if row.get("id") in seen or decode_payment(row).status != "paid":
+                    continue
+                seen.add(row.get("id"))
+                it = _read_payment_fast(row)
+                if it:
+                    items.append(it)
+        except Exception as e:
+            logger.error("Payments local read failed: %s", e)
+    if _clean_id(NOTION_PAYMENTS_DB_ID) and not local_store.synced(NOTION_PAYMENTS_DB_ID):
+        try:
+            or_conditions = [{"property": "Telegram ID", "number": {"equals": int(user_telegram_id)}}]
+            if user_page_id and not local_store.is_pending(user_page_id):
                 or_conditions.append({"property": "User", "relation": {"contains": user_page_id}})
             payments_filter = {
                 "and": [
@@ -107,66 +106,49 @@ async def list_user_products(user_telegram_id: int):
                     {"or": or_conditions},
                 ]
             }
-            res = client.databases.query(database_id=NOTION_PAYMENTS_DB_ID, filter=payments_filter)
-            for row in res["results"]:
-                it = _read_payment_fast(row)
-                if not it:
+            async for row in notion_gateway.iter_query(NOTION_PAYMENTS_DB_ID, filter=payments_filter):
+                if row.get("id") in seen:
                     continue
-                exp = it["expires_at"]
-                if exp and exp.tzinfo is None:
-                    exp = exp.replace(tzinfo=timezone.utc)
-                if exp and exp < now:
-                    continue
-                items.append({"name": it["name"], "expires_at": exp})
+                it = _read_payment_fast(row)
+                if it:
+                    items.append(it)
         except Exception as e:
             logger.error("Payments fast-path failed: %s", e)
 
-    # 2) (Опционально) fallback на Purchases, если ничего не нашли в Payments
+    # 2) fallback на Purchases, если ничего не нашли в Payments (из purchases_index, если он загружен)
     if not items and _clean_id(NOTION_PURCHASES_DB_ID):
         try:
-            pr = client.databases.query(
-                database_id=NOTION_PURCHASES_DB_ID,
-                filter={
-                    "and": [
-                        {"property": "Status", "select": {"equals": "paid"}},
-                        *([{"property": "User", "relation": {"contains": user_page_id}}] if user_page_id else [])
-                    ]
-                }
-            )
-            for row in pr["results"]:
-                props = row.get("properties", {})
-                # ожидаем, что тут тоже есть предрасчитанная дата (Expires at) и rollup имени продукта
-                name = None
-                try:
-                    roll = props.get("Product Name", {}).get("rollup", {}).get("array", [])
-                    if roll and roll[0].get("type") == "title":
-                        name = roll[0]["title"][0]["plain_text"]
-                except Exception:
-                    pass
-                if not name:
-                    # fallback: возьмём просто текст названия покупки
-                    try:
-                        name = props.get("Name", {}).get("title", [{}])[0].get("plain_text")
-                    except Exception:
-                        name = None
-
-                exp = None
-                try:
-                    dt = props.get("Expires at", {}).get("date", {}).get("start")
-                    exp = _iso_to_dt(dt)
-                except Exception:
-                    pass
-
-                if name:
-                    if exp and exp.tzinfo is None:
-                        exp = exp.replace(tzinfo=timezone.utc)
-                    if exp and exp < now:
-                        continue
-                    items.append({"name": name, "expires_at": exp})
+            if purchases_index.ready and user_page_id:
+                records = [r for r in purchases_index.for_user(user_page_id) if r.status == "paid"]
+            elif user_page_id and local_store.is_pending(user_page_id):
+                records = []   # пользователь ещё не создан в Notion — покупок там быть не может
+            else:
+                records = []
+                async for row in notion_gateway.iter_query(
+                    NOTION_PURCHASES_DB_ID,
+                    filter={
+                        "and": [
+                            {"property": "Status", "select": {"equals": "paid"}},
+                            *([{"property": "User", "relation": {"contains": user_page_id}}] if user_page_id else [])
+                        ]
+                    },
+                ):
+                    records.append(decode_purchase(row))
+            for rec in records:
+                it = _read_purchase(rec)
+                if it:
+                    items.append(it)
         except Exception as e:
             logger.error("Purchases fallback failed: %s", e)
 
-    # 3) сортировка и кэширование
-    items.sort(key=lambda x: x["name"].lower())
-    set_cached(user_telegram_id, items)
     return items
+
+# Материализованный вид: строится один раз на пользователя, дальше — из памяти
+entitlements = EntitlementsStore(_load_entitlements)
+cache_registry.register("entitlements", entitlements.info, root=entitlements.root)
+
+async def list_user_products(user_telegram_id: int):
+    """
+    Возвращает список активных продуктов пользователя ({"name", "expires_at"}, по имени).
+    """
+    return await entitlements.get(user_telegram_id)
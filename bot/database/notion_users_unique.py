@@ -1,12 +1,12 @@
 import logging
-from notion_client import Client
-from config import NOTION_TOKEN, NOTION_USERS_DB_ID
+from config import NOTION_USERS_DB_ID
+from bot.services import notion_gateway
+from .users_index import users_index
 
 logger = logging.getLogger(__name__)
-_client = Client(auth=NOTION_TOKEN) if NOTION_TOKEN else None
 
 def _ready():
-    return bool(NOTION_TOKEN and NOTION_USERS_DB_ID and _client is not None)
+    return bool(NOTION_USERS_DB_ID and notion_gateway.is_configured())
 
 def normalize_email(email: str) -> str:
     # базовая нормализация: трим и нижний регистр
@@ -19,19 +19,19 @@ async def find_user_by_email(email: str):
     e = normalize_email(email)
     try:
         # Пытаемся искать как email-property
-        res = _client.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Email", "email": {"equals": e}}
-        )
-        if res["results"]:
-            return res["results"][0]
+        async for page in notion_gateway.iter_query(
+            NOTION_USERS_DB_ID,
+            filter={"property": "Email", "email": {"equals": e}},
+            limit=1,
+        ):
+            return page
         # Фолбэк: если тип Email вдруг rich_text
-        res = _client.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Email", "rich_text": {"equals": e}}
-        )
-        if res["results"]:
-            return res["results"][0]
+        async for page in notion_gateway.iter_query(
+            NOTION_USERS_DB_ID,
+            filter={"property": "Email", "rich_text": {"equals": e}},
+            limit=1,
+        ):
+            return page
     except Exception as ex:
         logger.error("find_user_by_email failed: %s", ex)
     return None
@@ -42,16 +42,21 @@ def _get_prop_number(page: dict, prop: str):
     except Exception:
         return None
 
+async def _telegram_id_by_email(email: str):
+    """(найден ли пользователь, его Telegram ID) — из индекса Users, если он загружен."""
+    if users_index.ready:
+        rec = users_index.get_by_email(email)
+        return (rec is not None), (rec.telegram_id if rec else None)
+    page = await find_user_by_email(email)
+    return (page is not None), (_get_prop_number(page, "Telegram ID") if page else None)
+
 async def email_is_free(email: str, current_telegram_id: int) -> bool:
     """Проверяет, свободен ли email. Свободен, если нет записи ИЛИ запись привязана к текущему TG ID."""
-    page = await find_user_by_email(email)
-    if not page:
+    found, tg_in_db = await _telegram_id_by_email(email)
+    if not found:
         return True
-    tg_in_db = _get_prop_number(page, "Telegram ID")
     return tg_in_db in (None, int(current_telegram_id))
 
 async def get_existing_user_telegram_id(email: str):
-    page = await find_user_by_email(email)
-    if not page:
-        return None
-    return _get_prop_number(page, "Telegram ID")
+    _, tg_in_db = await _telegram_id_by_email(email)
+    return tg_in_db
@@ -0,0 +1,105 @@
+# bot/database/payment_view.py
+"""
+Платёж вместе со связанными страницами (User, Product/Products) — одним объектом.
+
+load_payment_view(): сначала страница платежа (из неё берутся id связей), затем все
+связи разрешаются параллельно. Пользователи и продукты берутся из локальных индексов
+(users_index / products_index); в Notion уходят только промахи, и те — одновременно.
+Итого два последовательных шага вместо трёх и больше.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+from bot.services.notion_scheduler import Priority
+from .local_store import local_store
+from .products_index import products_index
+from .records import PaymentRecord, ProductRecord, UserRecord, decode_payment
+from .users_index import users_index
+
+log = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PaymentView:
+    payment: PaymentRecord
+    user: Optional[UserRecord] = None
+    product: Optional[ProductRecord] = None          # relation "Product" или первый из "Products"
+    products: Tuple[ProductRecord, ...] = ()         # relation "Products"
+
+    def user_brief(self) -> Dict[str, Any]:
+        page_id = self.payment.user_page_id
+        if not page_id:
+            return {}
+        if self.user is None:
+            return {"page_id": page_id, "telegram_id": None, "username": ""}
+        return {"page_id": page_id, "telegram_id": self.user.telegram_id, "username": self.user.username}
+
+    def product_brief(self) -> Dict[str, Any]:
+        rec = self.product
+        if rec is None:
+            return {}
+        return {
+            "page_id": rec.page_id,
+            "name": rec.name,
+            "slug": rec.slug or None,
+            "access_mode": rec.access_mode or None,
+            "access_days": rec.access_days,
+            "resource_ref": rec.resource_ref,
+        }
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Формат payments_repo.get_payment."""
+        return {
+            "id": self.payment.page_id,
+            "status": self.payment.status,
+            "idempotency": self.payment.idempotency,
+            "user": self.user_brief(),
+            "product": self.product_brief(),
+        }
+
+
+async def _safe(coro: Awaitable[Any], what: str) -> Any:
+    # связь, которую не удалось прочитать, не должна ронять весь экран
+    try:
+        return await coro
+    except Exception as e:
+        log.warning("Failed to resolve %s: %s", what, e)
+        return None
+
+
+async def resolve_relations(pay: PaymentRecord, *, priority: Priority = Priority.INTERACTIVE) -> PaymentView:
+    """Разрешить все связи платежа параллельно."""
+    product_ids: List[str] = []
+    for pid in ((pay.product_page_id,) if pay.product_page_id else ()) + pay.products:
+        if pid not in product_ids:
+            product_ids.append(pid)
+
+    user_task = (
+        _safe(users_index.lookup_page(pay.user_page_id, priority=priority), f"user {pay.user_page_id}")
+        if pay.user_page_id else asyncio.sleep(0)
+    )
+    results = await asyncio.gather(
+        user_task,
+        *(_safe(products_index.lookup_page(pid, priority=priority), f"product {pid}") for pid in product_ids),
+    )
+    user, by_id = results[0], dict(zip(product_ids, results[1:]))
+
+    products = tuple(by_id[pid] for pid in pay.products if by_id.get(pid) is not None)
+    main_id = pay.product_page_id or (pay.products[0] if pay.products else None)
+    return PaymentView(
+        payment=pay,
+        user=user,
+        product=by_id.get(main_id) if main_id else None,
+        products=products,
+    )
+
+
+async def load_payment_view(payment_page_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Optional[PaymentView]:
+    if not payment_page_id:
+        return None
+    page = await local_store.retrieve(payment_page_id, priority=priority)
+    return await resolve_relations(decode_payment(page), priority=priority)
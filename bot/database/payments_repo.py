@@ -2,8 +2,11 @@ import logging
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any, List
 
-from notion_client import Client
-from config import NOTION_TOKEN
+from bot.database.local_store import local_store
+from bot.database.products_index import products_index
+from bot.database.purchases_index import purchases_index
+from bot.database.payment_view import load_payment_view
+from bot.database.users_index import users_index, get_user_page_id
 
 # New DBs that must be defined in config/.env
 try:
@@ -15,108 +18,27 @@ except Exception:
     NOTION_PURCHASES_DB_ID = None
 
 logger = logging.getLogger(__name__)
-notion = Client(auth=NOTION_TOKEN)
 
 
 # ---------- USERS ----------
 async def get_user_page_id_by_telegram(telegram_id: int) -> Optional[str]:
     """Return Notion page id for user by Telegram ID."""
-    if not telegram_id:
-        return None
-    resp = notion.databases.query(
-        database_id=getattr(__import__('config'), 'NOTION_USERS_DB_ID'),
-        filter={
-            "property": "Telegram ID",
-            "number": {"equals": int(telegram_id)}
-        },
-        page_size=1
-    )
-    results = resp.get("results", [])
-    return results[0]["id"] if results else None
+    return await get_user_page_id(telegram_id)
 
 
 async def get_user_brief_by_page_id(page_id: str) -> Dict[str, Any]:
-    pg = notion.pages.retrieve(page_id=page_id)
-    props = pg.get("properties", {})
-    username = ""
-    try:
-        rt = props["Username"]["rich_text"]
-        if rt:
-            username = rt[0]["plain_text"]
-    except Exception:
-        pass
-    tid = None
-    try:
-        tid = props["Telegram ID"]["number"]
-    except Exception:
-        pass
-    return {"page_id": page_id, "telegram_id": tid, "username": username}
+    rec = await users_index.lookup_page(page_id)
+    if rec is None:
+        return {"page_id": page_id, "telegram_id": None, "username": ""}
+    return {"page_id": page_id, "telegram_id": rec.telegram_id, "username": rec.username}
 
 
 # ---------- PRODUCTS ----------
-def _str(p): return str(p) if p is not None else ""
-
 async def get_product_by_slug(slug: str) -> Optional[Dict[str, Any]]:
     if not NOTION_PRODUCTS_DB_ID:
         raise RuntimeError("NOTION_PRODUCTS_DB_ID is not configured")
-    resp = notion.databases.query(
-        database_id=NOTION_PRODUCTS_DB_ID,
-        filter={
-            "property": "Slug/Code",
-            "rich_text": {"equals": slug}
-        },
-        page_size=1
-    )
-    results = resp.get("results", [])
-    if not results:
-        return None
-    page = results[0]
-    props = page["properties"]
-    def _get_select_name(key):
-        try:
-            return props[key]["select"]["name"]
-        except Exception:
-            return None
-
-    access_mode = (_get_select_name("Access mode") or "").lower()
-    access_days = None
-    try:
-        access_days = props["Access days"]["number"]
-    except Exception:
-        pass
-
-    resource_ref = None
-    try:
-        rt = props["Resource ref"]["rich_text"]
-        if rt:
-            resource_ref = rt[0]["plain_text"]
-    except Exception:
-        pass
-
-    name = ""
-    try:
-        t = props["Name"]["title"]
-        if t:
-            name = t[0]["plain_text"]
-    except Exception:
-        pass
-
-    active = True
-    try:
-        active = props["Active"]["checkbox"]
-    except Exception:
-        pass
-
-    return {
-        "id": page["id"],
-        "page_id": page["id"],
-        "slug": slug,
-        "name": name,
-        "access_mode": access_mode,
-        "access_days": access_days,
-        "resource_ref": resource_ref,
-        "active": active
-    }
+    rec = await products_index.lookup_slug(slug)
+    return rec.as_dict() if rec else None
 
 
 # ---------- PAYMENTS ----------
@@ -151,97 +73,14 @@ async def create_payment(
     if product_page_id:
         props["Product"] = {"relation": [{"id": product_page_id}]}
 
-    page = notion.pages.create(parent={"database_id": NOTION_PAYMENTS_DB_ID}, properties=props)
+    page = local_store.create_page(NOTION_PAYMENTS_DB_ID, props)
     return {"id": page["id"]}
 
 
 async def get_payment(payment_page_id: str) -> Optional[Dict[str, Any]]:
-    if not payment_page_id:
-        return None
-    page = notion.pages.retrieve(page_id=payment_page_id)
-    props = page["properties"]
-
-    # Parse
-    status = None
-    try:
-        status = props["Status"]["select"]["name"]
-    except Exception:
-        pass
-    idempotency = None
-    try:
-        rt = props["Idempotency"]["rich_text"]
-        if rt:
-            idempotency = rt[0]["plain_text"]
-    except Exception:
-        pass
-
-    # Get user brief
-    user_page_id = None
-    try:
-        rel = props["User"]["relation"]
-        if rel:
-            user_page_id = rel[0]["id"]
-    except Exception:
-        pass
-    user = await get_user_brief_by_page_id(user_page_id) if user_page_id else {}
-
-    # Get product brief
-    product = {}
-    try:
-        rel = props["Product"]["relation"]
-        product_page_id = rel[0]["id"] if rel else None
-        if product_page_id:
-            product_page = notion.pages.retrieve(page_id=product_page_id)
-            p_props = product_page["properties"]
-            name = ""
-            try:
-                t = p_props["Name"]["title"]
-                if t:
-                    name = t[0]["plain_text"]
-            except Exception:
-                pass
-            slug = None
-            try:
-                r = p_props["Slug/Code"]["rich_text"]
-                if r:
-                    slug = r[0]["plain_text"]
-            except Exception:
-                pass
-            access_mode = None
-            try:
-                access_mode = p_props["Access mode"]["select"]["name"]
-            except Exception:
-                pass
-            access_days = None
-            try:
-                access_days = p_props["Access days"]["number"]
-            except Exception:
-                pass
-            resource_ref = None
-            try:
-                r = p_props["Resource ref"]["rich_text"]
-                if r:
-                    resource_ref = r[0]["plain_text"]
-            except Exception:
-                pass
-            product = {
-                "page_id": product_page_id,
-                "name": name,
-                "slug": slug,
-                "access_mode": access_mode,
-                "access_days": access_days,
-                "resource_ref": resource_ref,
-            }
-    except Exception:
-        pass
-
-    return {
-        "id": page["id"],
-        "status": status,
-        "idempotency": idempotency,
-        "user": user,
-        "product": product,
-    }
+    # платёж + пользователь + продукт: связи разрешаются параллельно (см. payment_view)
+    view = await load_payment_view(payment_page_id)
+    return view.as_dict() if view else None
 
 
 async def set_payment_status(payment_page_id: str, status: str, admin: Optional[str], processed_at: Optional[datetime], linked_purchase_id: Optional[str]):
@@ -252,7 +91,7 @@ async def set_payment_status(payment_page_id: str, status: str, admin: Optional[
         props["Processed at"] = {"date": {"start": processed_at.isoformat()}}
     if linked_purchase_id:
         props["Linked Purchase"] = {"relation": [{"id": linked_purchase_id}]}
-    notion.pages.update(page_id=payment_page_id, properties=props)
+    local_store.update_page(payment_page_id, props)
 
 
 # ---------- PURCHASES ----------
@@ -264,22 +103,8 @@ async def create_or_update_purchase(
 ) -> Dict[str, Any]:
     if not NOTION_PURCHASES_DB_ID:
         raise RuntimeError("NOTION_PURCHASES_DB_ID is not configured")
-    # Try to find active existing purchase
-    existing = None
-    q = notion.databases.query(
-        database_id=NOTION_PURCHASES_DB_ID,
-        filter={
-            "and": [
-                {"property": "User", "relation": {"contains": user_page_id}},
-                {"property": "Product", "relation": {"contains": product_page_id}},
-                {"property": "Status", "select": {"equals": "paid"}},
-            ]
-        },
-        page_size=1
-    )
-    results = q.get("results", [])
-    if results:
-        existing = results[0]
+    # Оплаченная покупка (user, product) — из локального индекса, без запроса в Purchases
+    existing = await purchases_index.lookup_paid(user_page_id, product_page_id)
 
     now = datetime.utcnow()
     expires_at = None
@@ -287,15 +112,13 @@ async def create_or_update_purchase(
         expires_at = (now + timedelta(days=int(access_days))).isoformat()
 
     if existing:
-        # Optionally extend expiration if set
-        props = {}
+        # ensure status paid + optionally extend expiration (one coalesced update via local_store/outbox)
+        props = {"Status": {"select": {"name": "paid"}}}
         if expires_at:
             props["Expires at"] = {"date": {"start": expires_at}}
-        page_id = existing["id"]
-        if props:
-            notion.pages.update(page_id=page_id, properties=props)
-        # ensure status paid
-        notion.pages.update(page_id=page_id, properties={"Status": {"select": {"name": "paid"}}})
+        page_id = existing.page_id
+        local_store.update_page(page_id, props)
+        purchases_index.patch(page_id, status="paid", expires_at=expires_at or existing.expires_at)
         return {"id": page_id, "license_token": None}
 
     # else create new
@@ -309,5 +132,6 @@ async def create_or_update_purchase(
         props["Expires at"] = {"date": {"start": expires_at}}
     if payment_page_id:
         props["Payment"] = {"relation": [{"id": payment_page_id}]}
-    pg = notion.pages.create(parent={"database_id": NOTION_PURCHASES_DB_ID}, properties=props)
+    pg = local_store.create_page(NOTION_PURCHASES_DB_ID, props)
+    purchases_index.upsert_page(pg)
     return {"id": pg["id"], "license_token": None}
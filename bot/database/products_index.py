@@ -0,0 +1,182 @@
+# bot/database/products_index.py
+"""
+Локальный каталог БД Products, индексированный по slug, page_id и payment type.
+
+Каталог крошечный и меняется редко, поэтому грузится целиком при старте, а дальше
+получает изменения из общего change-feed (apply_page). Каждая перезагрузка или
+дельта, изменившая содержимое, увеличивает version. Создание и подтверждение
+платежа берут продукт отсюда и в БД Products не ходят.
+
+Пока каталог не загружен, lookup_slug()/lookup_page() делают точечный запрос в Notion.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from bot.services import notion_gateway
+from bot.services.cache_registry import cache_registry
+from bot.services.notion_scheduler import Priority
+from .local_store import local_store
+from bot.utils.product_codes import type_to_slug
+from .records import ProductRecord, decode_product
+
+log = logging.getLogger(__name__)
+
+
+def _products_db_id() -> Optional[str]:
+    v = (os.getenv("NOTION_PRODUCTS_DB_ID") or "").strip().strip('"').strip("'")
+    return v if v and v.lower() not in ("none", "null") else None
+
+
+class ProductsIndex:
+    def __init__(self) -> None:
+        self._by_slug: Dict[str, ProductRecord] = {}
+        self._by_page: Dict[str, ProductRecord] = {}
+        self._by_type: Dict[str, Optional[str]] = {}  # payment type -> slug (мемо type_to_slug)
+        self._loaded_at: Optional[float] = None
+        self.version = 0
+        self._lock = asyncio.Lock()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    # ---------- состояние ----------
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._by_page)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "products": len(self._by_page),
+            "ready": self.ready,
+            "version": self.version,
+            "loaded_age_sec": (time.time() - self._loaded_at) if self._loaded_at else None,
+            "entries": len(self._by_page),
+            **self._stats,
+        }
+
+    def root(self) -> Dict[str, Any]:
+        return self._by_page
+
+    # ---------- чтение ----------
+    def get(self, slug: str) -> Optional[ProductRecord]:
+        rec = self._by_slug.get(slug) if slug else None
+        self._stats["hits" if rec is not None else "misses"] += 1
+        return rec
+
+    def get_by_page(self, page_id: str) -> Optional[ProductRecord]:
+        return self._by_page.get(page_id) if page_id else None
+
+    def slug_for_type(self, payment_type: str) -> Optional[str]:
+        if not payment_type:
+            return None
+        if payment_type not in self._by_type:
+            self._by_type[payment_type] = type_to_slug(payment_type)
+        return self._by_type[payment_type]
+
+    def get_by_type(self, payment_type: str) -> Optional[ProductRecord]:
+        return self.get(self.slug_for_type(payment_type) or "")
+
+    # ---------- запись ----------
+    def _put(self, rec: ProductRecord) -> None:
+        old = self._by_page.get(rec.page_id)
+        if old is not None and old.slug and self._by_slug.get(old.slug) is old:
+            self._by_slug.pop(old.slug, None)
+        self._by_page[rec.page_id] = rec
+        if rec.slug:
+            self._by_slug[rec.slug] = rec
+
+    def discard(self, page_id: str) -> None:
+        old = self._by_page.pop(page_id, None)
+        if old is not None and old.slug and self._by_slug.get(old.slug) is old:
+            self._by_slug.pop(old.slug, None)
+
+    def upsert_page(self, page: Dict[str, Any]) -> Optional[ProductRecord]:
+        try:
+            rec = decode_product(page)
+        except Exception as e:
+            log.warning("products_index: cannot parse page %s: %s", page.get("id"), e)
+            return None
+        self._put(rec)
+        return rec
+
+    def apply_page(self, page: Dict[str, Any]) -> Optional[ProductRecord]:
+        """Изменение из change-feed: upsert + новая version, если запись поменялась."""
+        old = self.get_by_page(page.get("id") or "")
+        rec = self.upsert_page(page)
+        if rec is not None and rec != old:
+            self.version += 1
+        return rec
+
+    # ---------- синхронизация ----------
+    async def load_all(self) -> int:
+        """Полная перезагрузка каталога; индексы подменяются атомарно."""
+        db_id = _products_db_id()
+        if not db_id or not notion_gateway.is_configured():
+            return 0
+        async with self._lock:
+            fresh = ProductsIndex()
+            async for page in notion_gateway.iter_query(db_id, priority=Priority.BACKGROUND):
+                fresh.upsert_page(page)
+            if fresh._by_page != self._by_page or not self.ready:
+                self.version += 1
+            self._by_slug, self._by_page = fresh._by_slug, fresh._by_page
+            self._loaded_at = time.time()
+        log.info("products_index: loaded %s products (v%s)", len(self), self.version)
+        return len(self)
+
+    def load_pages(self, pages: Iterable[Dict[str, Any]]) -> int:
+        """Загрузка из локального хранилища (bot.database.local_store) — без запросов в Notion."""
+        fresh = ProductsIndex()
+        for page in pages:
+            fresh.upsert_page(page)
+        if fresh._by_page != self._by_page or not self.ready:
+            self.version += 1
+        self._by_slug, self._by_page = fresh._by_slug, fresh._by_page
+        self._loaded_at = time.time()
+        return len(self)
+
+    async def lookup_slug(self, slug: str, *, priority: Priority = Priority.INTERACTIVE) -> Optional[ProductRecord]:
+        """Продукт по slug: из каталога, а до его загрузки — точечным запросом в Notion."""
+        rec = self.get(slug)
+        if rec is not None or self.ready or not slug:
+            return rec
+        db_id = _products_db_id()
+        if not db_id or not notion_gateway.is_configured():
+            return None
+        async for page in notion_gateway.iter_query(
+            db_id,
+            filter={"property": "Slug/Code", "rich_text": {"equals": slug}},
+            limit=1,
+            priority=priority,
+        ):
+            return self.upsert_page(page)
+        return None
+
+    async def lookup_page(self, page_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Optional[ProductRecord]:
+        """Продукт по page_id; неизвестную страницу (создана после загрузки) дочитываем из Notion."""
+        rec = self.get_by_page(page_id)
+        if rec is not None or not page_id or not notion_gateway.is_configured():
+            return rec
+        page = await local_store.retrieve(page_id, priority=priority)
+        return self.upsert_page(page)
+
+    async def resolve(
+        self,
+        *,
+        product_code: Optional[str] = None,
+        payment_type: Optional[str] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Optional[ProductRecord]:
+        """product_code, иначе slug из payment type."""
+        slug = product_code or self.slug_for_type(payment_type or "")
+        return await self.lookup_slug(slug, priority=priority) if slug else None
+
+
+products_index = ProductsIndex()
+cache_registry.register("products_index", products_index.info, root=products_index.root)
@@ -0,0 +1,163 @@
+# bot/database/purchases_index.py
+"""
+Локальное зеркало БД Purchases, индексированное по (user_page_id, product_page_id).
+
+- При старте: из зеркала Purchases в local_store (load_pages), без запросов в Notion.
+- Дальше: дельты по last_edited_time из общего change-feed (upsert_page) и
+  write-through наших собственных созданий/изменений (upsert_page / patch).
+- Вторичные индексы: page_id и покупки пользователя.
+
+create_or_update_purchase проверяет существование оплаченной покупки по ключу без
+запроса в Notion; пока индекс не загружен, lookup_paid() делает точечный запрос.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bot.services import notion_gateway
+from bot.services.cache_registry import cache_registry
+from bot.services.notion_scheduler import Priority
+from .records import PurchaseRecord, decode_purchase
+
+log = logging.getLogger(__name__)
+
+PAID = "paid"
+
+Key = Tuple[str, str]
+
+
+def _purchases_db_id() -> Optional[str]:
+    v = (os.getenv("NOTION_PURCHASES_DB_ID") or "").strip().strip('"').strip("'")
+    return v if v and v.lower() not in ("none", "null") else None
+
+
+class PurchasesIndex:
+    def __init__(self) -> None:
+        self._by_page: Dict[str, PurchaseRecord] = {}
+        self._paid: Dict[Key, PurchaseRecord] = {}       # (user, product) -> оплаченная покупка
+        self._by_user: Dict[str, Set[str]] = {}          # user_page_id -> page_id покупок
+        self._watermark: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    # ---------- состояние ----------
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._by_page)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "purchases": len(self._by_page),
+            "paid_keys": len(self._paid),
+            "ready": self.ready,
+            "watermark": self._watermark,
+            "loaded_age_sec": (time.time() - self._loaded_at) if self._loaded_at else None,
+            "entries": len(self._by_page),
+            **self._stats,
+        }
+
+    def root(self) -> Dict[str, Any]:
+        return self._by_page
+
+    # ---------- чтение ----------
+    def get_by_page(self, page_id: str) -> Optional[PurchaseRecord]:
+        return self._by_page.get(page_id) if page_id else None
+
+    def get_paid(self, user_page_id: str, product_page_id: str) -> Optional[PurchaseRecord]:
+        rec = self._paid.get((user_page_id, product_page_id))
+        self._stats["hits" if rec is not None else "misses"] += 1
+        return rec
+
+    def for_user(self, user_page_id: str) -> List[PurchaseRecord]:
+        return [self._by_page[pid] for pid in self._by_user.get(user_page_id, ()) if pid in self._by_page]
+
+    # ---------- запись ----------
+    def _drop(self, rec: PurchaseRecord) -> None:
+        key = (rec.user_page_id or "", rec.product_page_id or "")
+        if self._paid.get(key) is rec:
+            self._paid.pop(key, None)
+        if rec.user_page_id:
+            self._by_user.get(rec.user_page_id, set()).discard(rec.page_id)
+
+    def _put(self, rec: PurchaseRecord) -> None:
+        old = self._by_page.get(rec.page_id)
+        if old is not None:
+            self._drop(old)
+        self._by_page[rec.page_id] = rec
+        if rec.user_page_id:
+            self._by_user.setdefault(rec.user_page_id, set()).add(rec.page_id)
+            if rec.product_page_id and rec.status == PAID:
+                self._paid[(rec.user_page_id, rec.product_page_id)] = rec
+        if rec.last_edited_time and (self._watermark is None or rec.last_edited_time > self._watermark):
+            self._watermark = rec.last_edited_time
+
+    def discard(self, page_id: str) -> None:
+        old = self._by_page.pop(page_id, None)
+        if old is not None:
+            self._drop(old)
+
+    def upsert_page(self, page: Dict[str, Any]) -> Optional[PurchaseRecord]:
+        try:
+            rec = decode_purchase(page)
+        except Exception as e:
+            log.warning("purchases_index: cannot parse page %s: %s", page.get("id"), e)
+            return None
+        self._put(rec)
+        return rec
+
+    def patch(self, page_id: str, **fields: Any) -> Optional[PurchaseRecord]:
+        """Write-through собственных изменений (status / expires_at ...)."""
+        old = self._by_page.get(page_id)
+        if old is None:
+            return None
+        data = {k: getattr(old, k) for k in PurchaseRecord.__slots__}
+        data.update({k: v for k, v in fields.items() if k in data})
+        rec = PurchaseRecord(**data)
+        self._put(rec)
+        return rec
+
+    # ---------- синхронизация ----------
+    def load_pages(self, pages: Iterable[Dict[str, Any]]) -> int:
+        """Загрузка из локального хранилища (bot.database.local_store) — без запросов в Notion."""
+        fresh = PurchasesIndex()
+        for page in pages:
+            fresh.upsert_page(page)
+        self._by_page, self._paid, self._by_user = fresh._by_page, fresh._paid, fresh._by_user
+        self._watermark = fresh._watermark
+        self._loaded_at = time.time()
+        return len(self)
+
+    async def lookup_paid(
+        self, user_page_id: str, product_page_id: str, *, priority: Priority = Priority.INTERACTIVE
+    ) -> Optional[PurchaseRecord]:
+        """Оплаченная покупка (user, product): из индекса, а до его загрузки — запросом в Notion."""
+        rec = self.get_paid(user_page_id, product_page_id)
+        if rec is not None or self.ready or not user_page_id or not product_page_id:
+            return rec
+        db_id = _purchases_db_id()
+        if not db_id or not notion_gateway.is_configured():
+            return None
+        async for page in notion_gateway.iter_query(
+            db_id,
+            filter={
+                "and": [
+                    {"property": "User", "relation": {"contains": user_page_id}},
+                    {"property": "Product", "relation": {"contains": product_page_id}},
+                    {"property": "Status", "select": {"equals": PAID}},
+                ]
+            },
+            limit=1,
+            priority=priority,
+        ):
+            return self.upsert_page(page)
+        return None
+
+
+purchases_index = PurchasesIndex()
+cache_registry.register("purchases_index", purchases_index.info, root=purchases_index.root)
@@ -0,0 +1,221 @@
+# bot/database/records.py
+"""
+Записи баз Notion и их схемы (см. notion_codec).
+
+Имена свойств — те же, что исторически использовались в репозиториях bot/database/*.
+decode_* — скомпилированные декодеры page -> record.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .notion_codec import Field, compile_decoder
+
+
+def normalize_email(email: str) -> str:
+    return (email or "").strip().lower()
+
+
+def _lower(v: str) -> str:
+    return v.lower()
+
+
+# ---------- Users ----------
+@dataclass(slots=True)
+class UserRecord:
+    page_id: str
+    telegram_id: Optional[int] = None
+    name: str = ""
+    email: str = ""
+    status: str = ""
+    language: str = ""
+    username: str = ""
+    reg_date: Optional[str] = None
+    last_edited_time: Optional[str] = None
+
+    def as_user_data(self) -> Dict[str, Any]:
+        """Формат, который исторически возвращает notion_db.get_user_data."""
+        return {
+            "name": self.name,
+            "email": self.email,
+            "status": self.status,
+            "reg_date": self.reg_date,
+            "username": self.username,
+            "language": self.language,
+        }
+
+
+decode_user = compile_decoder(UserRecord, [
+    Field("telegram_id", "Telegram ID", "number", int),
+    Field("name", "Name", "title"),
+    Field("email", "Email", "text", normalize_email),
+    Field("status", "Status", "select"),
+    Field("language", "Language", "select"),
+    Field("username", "Username", "rich_text"),
+    Field("reg_date", "Registration Date", "date"),
+])
+
+
+# ---------- Products ----------
+@dataclass(slots=True)
+class ProductRecord:
+    page_id: str
+    slug: str = ""
+    name: str = ""
+    access_mode: str = ""
+    access_days: Optional[int] = None
+    resource_ref: Optional[str] = None
+    active: bool = True
+    last_edited_time: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Формат payments_repo.get_product_by_slug."""
+        return {
+            "id": self.page_id,
+            "page_id": self.page_id,
+            "slug": self.slug,
+            "name": self.name,
+            "access_mode": self.access_mode,
+            "access_days": self.access_days,
+            "resource_ref": self.resource_ref,
+            "active": self.active,
+        }
+
+
+decode_product = compile_decoder(ProductRecord, [
+    Field("slug", "Slug/Code", "rich_text"),
+    Field("name", "Name", "title"),
+    Field("access_mode", "Access mode", "select", _lower),
+    Field("access_days", "Access days", "number", int),
+    Field("resource_ref", "Resource ref", "rich_text"),
+    Field("active", "Active", "checkbox", bool),
+])
+
+
+# ---------- Payments ----------
+@dataclass(slots=True)
+class PaymentRecord:
+    page_id: str
+    title: str = ""
+    telegram_id: Optional[int] = None
+    status: Optional[str] = None
+    type: Optional[str] = None
+    idempotency: Optional[str] = None
+    user_page_id: Optional[str] = None
+    product_page_id: Optional[str] = None      # relation "Product" (payments_repo)
+    products: Tuple[str, ...] = ()             # relation "Products" (notion_payments)
+    linked_purchase_id: Optional[str] = None
+    product_name: Optional[str] = None
+    expires_at: Optional[str] = None
+    processed_at: Optional[str] = None
+    last_edited_time: Optional[str] = None
+
+
+decode_payment = compile_decoder(PaymentRecord, [
+    Field("title", "Name", "title"),
+    Field("telegram_id", "Telegram ID", "number", int),
+    Field("status", "Status", "select"),
+    Field("type", "Type", "select_or_text"),
+    Field("idempotency", "Idempotency", "rich_text"),
+    Field("user_page_id", "User", "relation"),
+    Field("product_page_id", "Product", "relation"),
+    Field("products", "Products", "relations"),
+    Field("linked_purchase_id", "Linked Purchase", "relation"),
+    Field("product_name", "Product Name", "rich_text"),
+    Field("expires_at", "Expires at", "date"),
+    Field("processed_at", "Processed at", "date"),
+])
+
+
+# ---------- Purchases ----------
+@dataclass(slots=True)
+class PurchaseRecord:
+    page_id: str
+    title: str = ""
+    status: Optional[str] = None
+    product_name: Optional[str] = None         # rollup имени продукта
+    user_page_id: Optional[str] = None
+    product_page_id: Optional[str] = None
+    payment_page_id: Optional[str] = None
+    paid_at: Optional[str] = None
+    expires_at: Optional[str] = None
+    last_edited_time: Optional[str] = None
+
+
+decode_purchase = compile_decoder(PurchaseRecord, [
+    Field("title", "Name", "title"),
+    Field("status", "Status", "select"),
+    Field("product_name", "Product Name", "rollup_title"),
+    Field("user_page_id", "User", "relation"),
+    Field("product_page_id", "Product", "relation"),
+    Field("payment_page_id", "Payment", "relation"),
+    Field("paid_at", "Paid at", "date"),
+    Field("expires_at", "Expires at", "date"),
+])
+
+
+# ---------- Descriptions ----------
+@dataclass(slots=True)
+class DescriptionRecord:
+    page_id: str
+    slug: str = ""
+    language: str = ""
+    status: str = ""
+    short: str = ""
+    full: str = ""
+    last_edited_time: Optional[str] = None
+
+
+decode_description = compile_decoder(DescriptionRecord, [
+    Field("slug", "Slug/Code", "rich_text"),
+    Field("language", "Language", "select"),
+    Field("status", "Status", "select"),
+    Field("short", "Short", "rich_text"),
+    Field("full", "Full", "rich_text"),
+])
+
+
+# ---------- Payment methods ----------
+@dataclass(slots=True)
+class PaymentMethodRecord:
+    page_id: str
+    code: str = ""
+    active: bool = False
+    order: float = 0
+    currency: str = ""
+    button_ru: str = ""
+    button_en: str = ""
+    details_slug: str = ""
+    rate_per_eur: Optional[float] = None
+    round_to: Optional[float] = None
+    last_edited_time: Optional[str] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Формат notion_payment_methods.get()/get_all()."""
+        return {
+            "code": self.code,
+            "active": self.active,
+            "order": self.order,
+            "currency": self.currency,
+            "button_ru": self.button_ru,
+            "button_en": self.button_en,
+            "details_slug": self.details_slug,
+            "rate_per_eur": self.rate_per_eur,
+            "round_to": self.round_to,
+            "id": self.page_id,
+            "last_edited_time": self.last_edited_time,
+        }
+
+
+decode_payment_method = compile_decoder(PaymentMethodRecord, [
+    Field("code", "Code", "rich_text"),
+    Field("active", "Active", "checkbox", bool),
+    Field("order", "Order", "number"),
+    Field("currency", "Currency", "select"),
+    Field("button_ru", "Button RU", "rich_text"),
+    Field("button_en", "Button EN", "rich_text"),
+    Field("details_slug", "Details Slug", "rich_text"),
+    Field("rate_per_eur", "Rate per 1 EUR", "number", float),
+    Field("round_to", "Round to", "number", float),
+])
@@ -0,0 +1,157 @@
+# bot/database/schema_registry.py
+"""
+Кэш схем баз Notion (имя свойства -> тип).
+
+- При старте load_all() читает схемы всех настроенных БД, проверяет ожидаемые
+  свойства (только предупреждение в лог) и один раз выполняет миграции
+  (добавление недостающих свойств, например быстрых полей Payments).
+- Дальше prop_type()/ensure_properties() отвечают из памяти, без databases.retrieve.
+- Схема перечитывается только после того, как запись упала с validation_error
+  (кто-то поменял БД руками): см. is_schema_error() и invalidate().
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Optional
+
+from notion_client.errors import APIResponseError
+
+from bot.services import notion_gateway
+from bot.services.notion_scheduler import Priority
+
+log = logging.getLogger(__name__)
+
+# Свойства, без которых код бота работать не будет. Ключ — имя env-переменной с ID БД.
+EXPECTED_PROPERTIES: Dict[str, Dict[str, str]] = {
+    "NOTION_USERS_DB_ID": {
+        "Name": "title",
+        "Telegram ID": "number",
+        "Email": "email",
+        "Status": "select",
+    },
+    "NOTION_PRODUCTS_DB_ID": {
+        "Name": "title",
+        "Slug/Code": "rich_text",
+        "Access days": "number",
+    },
+    "NOTION_PAYMENTS_DB_ID": {
+        "Name": "title",
+        "Telegram ID": "number",
+        "Status": "select",
+        "Proof TG file_id": "rich_text",
+    },
+    "NOTION_PURCHASES_DB_ID": {
+        "Name": "title",
+        "Status": "select",
+        "Product": "relation",
+    },
+}
+
+# Одноразовые миграции: свойства, которые бот сам добавляет, если их нет.
+# "Local ID" — id страницы в local_store: по нему репликация находит страницу, чьё
+# создание могло пройти до сбоя (см. bot.database.local_store).
+MIGRATIONS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    "NOTION_USERS_DB_ID": {
+        "Local ID": {"rich_text": {}},
+    },
+    "NOTION_PAYMENTS_DB_ID": {
+        "Product Name": {"rich_text": {}},
+        "Expires at": {"date": {}},
+        "Local ID": {"rich_text": {}},
+    },
+    "NOTION_PURCHASES_DB_ID": {
+        "Local ID": {"rich_text": {}},
+    },
+}
+
+
+def _db_id(env_key: str) -> Optional[str]:
+    v = (os.getenv(env_key) or "").strip().strip('"').strip("'")
+    return v if v and v.lower() not in ("none", "null") else None
+
+
+def is_schema_error(err: BaseException) -> bool:
+    """Ошибка записи из-за несовпадения схемы (свойство удалено/переименовано/сменило тип)."""
+    return isinstance(err, APIResponseError) and getattr(err, "code", None) == "validation_error"
+
+
+class SchemaRegistry:
+    def __init__(self) -> None:
+        self._schemas: Dict[str, Dict[str, str]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _lock(self, db_id: str) -> asyncio.Lock:
+        lock = self._locks.get(db_id)
+        if lock is None:
+            lock = self._locks[db_id] = asyncio.Lock()
+        return lock
+
+    def cached(self, db_id: str) -> Optional[Dict[str, str]]:
+        return self._schemas.get(db_id)
+
+    def invalidate(self, db_id: str) -> None:
+        if self._schemas.pop(db_id, None) is not None:
+            log.info("schema_registry: schema of %s invalidated", db_id)
+
+    async def get(self, db_id: str, *, priority: Priority = Priority.BACKGROUND) -> Dict[str, str]:
+        """Типы свойств БД; databases.retrieve — только при пустом кэше."""
+        schema = self._schemas.get(db_id)
+        if schema is not None:
+            return schema
+        async with self._lock(db_id):
+            schema = self._schemas.get(db_id)
+            if schema is None:
+                db = await notion_gateway.retrieve_database(db_id, priority=priority)
+                schema = {name: (p or {}).get("type", "") for name, p in (db.get("properties") or {}).items()}
+                self._schemas[db_id] = schema
+        return schema
+
+    async def prop_type(self, db_id: str, name: str, *, priority: Priority = Priority.BACKGROUND) -> Optional[str]:
+        return (await self.get(db_id, priority=priority)).get(name)
+
+    async def ensure_properties(
+        self,
+        db_id: str,
+        required: Dict[str, Dict[str, Any]],
+        *,
+        priority: Priority = Priority.BACKGROUND,
+    ) -> None:
+        """Добавить в БД недостающие свойства (required: имя -> схема для databases.update)."""
+        schema = await self.get(db_id, priority=priority)
+        missing = {k: v for k, v in required.items() if k not in schema}
+        if not missing:
+            return
+        await notion_gateway.update_database(db_id, properties=missing, priority=priority)
+        for name, spec in missing.items():
+            schema[name] = next(iter(spec), "")
+        log.info("Added missing properties to %s: %s", db_id, ", ".join(missing))
+
+    async def load_all(self) -> int:
+        """Прочитать схемы всех настроенных БД, проверить и мигрировать. Возвращает число БД."""
+        if not notion_gateway.is_configured():
+            return 0
+        loaded = 0
+        for env_key, expected in EXPECTED_PROPERTIES.items():
+            db_id = _db_id(env_key)
+            if not db_id:
+                continue
+            try:
+                self.invalidate(db_id)
+                schema = await self.get(db_id)
+                for name, kind in expected.items():
+                    actual = schema.get(name)
+                    if actual is None:
+                        log.warning("schema_registry: %s has no property %r", env_key, name)
+                    elif actual != kind:
+                        log.warning("schema_registry: %s.%s is %s, expected %s", env_key, name, actual, kind)
+                if env_key in MIGRATIONS:
+                    await self.ensure_properties(db_id, MIGRATIONS[env_key])
+                loaded += 1
+            except Exception as e:
+                log.warning("schema_registry: cannot load %s: %s", env_key, e)
+        return loaded
+
+
+schema_registry = SchemaRegistry()
@@ -0,0 +1,170 @@
+# bot/database/users_index.py
+"""
+Локальное зеркало БД Users, индексированное по Telegram ID.
+
+- При старте: из зеркала Users в local_store (load_pages), без запросов в Notion.
+- Дальше: дельты по last_edited_time из общего change-feed (bot.services.change_feed
+  -> upsert_page) и write-through наших собственных изменений (upsert_page / patch).
+- Вторичные индексы: page_id и нормализованный email.
+
+Пока индекс не загружен, lookup() ходит в Notion точечно; после загрузки проверка
+регистрации и поиск page_id не делают ни одного сетевого запроса.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import time
+from typing import Any, Dict, Iterable, Optional
+
+from bot.services import notion_gateway
+from bot.services.cache_registry import cache_registry
+from bot.services.notion_scheduler import Priority
+from .local_store import local_store
+from .records import UserRecord, decode_user, normalize_email
+
+log = logging.getLogger(__name__)
+
+
+def _users_db_id() -> Optional[str]:
+    v = (os.getenv("NOTION_USERS_DB_ID") or "").strip().strip('"').strip("'")
+    return v if v and v.lower() not in ("none", "null") else None
+
+
+class UsersIndex:
+    def __init__(self) -> None:
+        self._by_tg: Dict[int, UserRecord] = {}
+        self._by_page: Dict[str, UserRecord] = {}
+        self._by_email: Dict[str, UserRecord] = {}
+        self._watermark: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0}
+
+    # ---------- состояние ----------
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None
+
+    def __len__(self) -> int:
+        return len(self._by_page)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._by_page),
+            "ready": self.ready,
+            "watermark": self._watermark,
+            "loaded_age_sec": (time.time() - self._loaded_at) if self._loaded_at else None,
+            "entries": len(self._by_page),
+            **self._stats,
+        }
+
+    def root(self) -> Dict[str, Any]:
+        return self._by_page
+
+    # ---------- чтение ----------
+    def get(self, telegram_id: int) -> Optional[UserRecord]:
+        rec = self._by_tg.get(int(telegram_id))
+        self._stats["hits" if rec is not None else "misses"] += 1
+        return rec
+
+    def get_by_page(self, page_id: str) -> Optional[UserRecord]:
+        return self._by_page.get(page_id)
+
+    def get_by_email(self, email: str) -> Optional[UserRecord]:
+        return self._by_email.get(normalize_email(email))
+
+    # ---------- запись ----------
+    def _put(self, rec: UserRecord) -> None:
+        old = self._by_page.get(rec.page_id)
+        if old is not None:
+            if old.telegram_id is not None and self._by_tg.get(old.telegram_id) is old:
+                self._by_tg.pop(old.telegram_id, None)
+            if old.email and self._by_email.get(old.email) is old:
+                self._by_email.pop(old.email, None)
+        self._by_page[rec.page_id] = rec
+        if rec.telegram_id is not None:
+            self._by_tg[rec.telegram_id] = rec
+        if rec.email:
+            self._by_email[rec.email] = rec
+        if rec.last_edited_time and (self._watermark is None or rec.last_edited_time > self._watermark):
+            self._watermark = rec.last_edited_time
+
+    def upsert_page(self, page: Dict[str, Any]) -> Optional[UserRecord]:
+        try:
+            rec = decode_user(page)
+        except Exception as e:
+            log.warning("users_index: cannot parse page %s: %s", page.get("id"), e)
+            return None
+        if rec is not None:
+            self._put(rec)
+        return rec
+
+    def upsert(self, rec: UserRecord) -> None:
+        self._put(rec)
+
+    def discard(self, page_id: str) -> None:
+        old = self._by_page.pop(page_id, None)
+        if old is None:
+            return
+        if old.telegram_id is not None and self._by_tg.get(old.telegram_id) is old:
+            self._by_tg.pop(old.telegram_id, None)
+        if old.email and self._by_email.get(old.email) is old:
+            self._by_email.pop(old.email, None)
+
+    def patch(self, page_id: str, **fields: Any) -> Optional[UserRecord]:
+        """Write-through собственных изменений (name/email/language/status)."""
+        old = self._by_page.get(page_id)
+        if old is None:
+            return None
+        data = {k: getattr(old, k) for k in UserRecord.__slots__}
+        data.update({k: v for k, v in fields.items() if k in data})
+        data["email"] = normalize_email(data["email"])
+        rec = UserRecord(**data)
+        self._put(rec)
+        return rec
+
+    # ---------- синхронизация ----------
+    def load_pages(self, pages: Iterable[Dict[str, Any]]) -> int:
+        """Загрузка из локального хранилища (bot.database.local_store) — без запросов в Notion."""
+        fresh = UsersIndex()
+        for page in pages:
+            fresh.upsert_page(page)
+        self._by_tg, self._by_page, self._by_email = fresh._by_tg, fresh._by_page, fresh._by_email
+        self._watermark = fresh._watermark
+        self._loaded_at = time.time()
+        return len(self)
+
+    async def lookup(self, telegram_id: int) -> Optional[UserRecord]:
+        """Запись пользователя: из индекса, а до его загрузки — точечным запросом в Notion."""
+        rec = self.get(telegram_id)
+        if rec is not None or self.ready:
+            return rec
+        db_id = _users_db_id()
+        if not db_id or not notion_gateway.is_configured():
+            return None
+        async for page in notion_gateway.iter_query(
+            db_id,
+            filter={"property": "Telegram ID", "number": {"equals": int(telegram_id)}},
+            limit=1,
+        ):
+            return self.upsert_page(page)
+        return None
+
+    async def lookup_page(self, page_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Optional[UserRecord]:
+        """Пользователь по page_id; страницу, которой нет в индексе, дочитываем из Notion."""
+        rec = self.get_by_page(page_id)
+        if rec is not None or not page_id or not notion_gateway.is_configured():
+            return rec
+        page = await local_store.retrieve(page_id, priority=priority)
+        return self.upsert_page(page)
+
+
+users_index = UsersIndex()
+cache_registry.register("users_index", users_index.info, root=users_index.root)
+
+
+async def get_user_page_id(telegram_id: int) -> Optional[str]:
+    if not telegram_id:
+        return None
+    rec = await users_index.lookup(int(telegram_id))
+    return rec.page_id if rec else None
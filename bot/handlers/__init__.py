@@ -1,24 +1,41 @@
 
 # bot/handlers/__init__.py — реестр хендлеров (быстрые ПЕРВЫМИ)
+import logging
+
 from telegram.ext import MessageHandler, filters
 from telegram import Update
 from telegram.ext import ContextTypes
 
+from bot.utils.callback_router import CallbackRouter, unrouted
+
 # Импорт быстрых хендлеров
-from .payments_fast_ack import handlers as fast_ack_handlers
+from .payments_fast_ack import handlers as fast_ack_handlers, routes as fast_ack_routes
 
 # Остальные модули проекта
-from .cabinet_products import handlers as cabinet_products_handlers
-from .menu import (handlers as menu_handlers, show_main_menu, show_products_menu, show_consultations_menu,
+from .cabinet_products import routes as cabinet_products_routes
+from .menu import (routes as menu_routes, show_main_menu, show_products_menu, show_consultations_menu,
                    show_mentoring_menu, show_page_audit_menu, show_session_menu)
 from .shared import update_menu_message
 from .start import handler as start_handler
-from .callback import handlers as callback_handlers
+from .callback import handlers as callback_handlers, routes as callback_routes
 from .view_data import view_data_handler
 from .registration import register_conversation_handler
-from .payments import handlers as payments_handlers, handle_document
-from .admin_payments import handlers as admin_payments_handlers
-from .webinars import handlers as webinars_handlers, show_webinars_menu
+from .payments import routes as payments_routes, handle_document
+from .admin_payments import routes as admin_payments_routes
+from .webinars import routes as webinars_routes, show_webinars_menu
+
+log = logging.getLogger(__name__)
+
+# Все callback-кнопки — через один роутер (dict + prefix-trie) вместо цепочки regex-хендлеров
+callback_router = CallbackRouter([
+    *fast_ack_routes,
+    *cabinet_products_routes,
+    *callback_routes,
+    *admin_payments_routes,
+    *menu_routes,
+    *webinars_routes,
+    *payments_routes,
+])
 
 async def block_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     text = update.message.text if update.message else ''
@@ -43,22 +60,26 @@ async def block_text_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         pass
 
 def get_handlers():
-    return [
+    handlers = [
         # ВАЖНО: быстрые — первыми, чтобы стопорить цепочку
         *fast_ack_handlers,
 
-        *cabinet_products_handlers,
         start_handler,
         view_data_handler,
+        # диалоги с callback-входом — до роутера (иначе их перехватит prefix personal_*)
         *callback_handlers,
-        *admin_payments_handlers,
-        *menu_handlers,
-        *webinars_handlers,
-        *payments_handlers,
+        callback_router,
         register_conversation_handler,
         MessageHandler(filters.TEXT & ~filters.COMMAND, block_text_input),
         # Fallback обработчик документов — в самом конце
         MessageHandler(filters.Document.ALL | filters.PHOTO, handle_document),
     ]
+    try:
+        missing = unrouted(callback_router, handlers)
+        if missing:
+            log.warning("callback_data without route: %s", ", ".join(missing))
+    except Exception as e:
+        log.warning("callback route check failed: %s", e)
+    return handlers
 
 handlers = get_handlers()
@@ -9,6 +9,7 @@ from bot.utils.admins import is_admin
 from bot.database import notion_descriptions as desc_repo
 from bot.database import notion_payment_methods as pay_repo
 from bot.services.actions import log_action
+from bot.services.cache_registry import cache_registry
 
 async def _ensure_admin(update: Update) -> bool:
     uid = update.effective_user.id if update.effective_user else None
@@ -23,7 +24,11 @@ async def diag_descriptions(update: Update, context: ContextTypes.DEFAULT_TYPE)
     info = desc_repo.cache_info()
     log_action("admin_diag_descriptions", user_id=update.effective_user.id, cache_info=info)
     await update.effective_chat.send_message(
-        f"🧠 Descriptions cache: keys={info.get('keys')} age_min={info.get('min_age_sec'):.1f}s age_max={info.get('max_age_sec'):.1f}s"
+        f"🧠 Descriptions cache: keys={info.get('entries')} age_min={info.get('age_min_sec')}s age_max={info.get('age_max_sec')}s\n"
+        f"hits={info.get('hits')} stale={info.get('stale_hits')} misses={info.get('misses')} "
+        f"refreshes={info.get('refreshes')} errors={info.get('refresh_errors')} avg={info.get('refresh_avg_ms')}ms\n"
+        f"known={info.get('known_keys')} filtered={info.get('filtered')} "
+        f"negative={info.get('negative_keys')} negative_hits={info.get('negative_hits')}"
     )
 
 async def reload_descriptions(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -42,7 +47,10 @@ async def diag_payments(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
     info = pay_repo.cache_info()
     methods = await pay_repo.get_all()
     log_action("admin_diag_payments", user_id=update.effective_user.id, methods=len(methods), cache_info=info)
-    lines = [f"🧠 Payment methods cache: keys={info.get('keys')}"]
+    lines = [
+        f"🧠 Payment methods cache: keys={info.get('entries')} age_max={info.get('age_max_sec')}s "
+        f"stale={info.get('stale_hits')} refreshes={info.get('refreshes')} avg={info.get('refresh_avg_ms')}ms"
+    ]
     for m in methods[:25]:
         lines.append(f"• {m.get('code')} [{m.get('currency')}], rate={m.get('rate_per_eur')}, round_to={m.get('round_to')}")
     if len(methods) > 25:
@@ -59,6 +67,13 @@ async def reload_payments(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         log_action("admin_reload_payments_error", user_id=update.effective_user.id, error=str(e))
         await update.effective_chat.send_message(f"❌ Reload failed: {e}")
 
+# -------- DIAG FOR ALL CACHES --------
+async def diag_cache(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    if not await _ensure_admin(update): return
+    snap = cache_registry.snapshot()
+    log_action("admin_diag_cache", user_id=update.effective_user.id, caches=snap)
+    await update.effective_chat.send_message(cache_registry.format_text(snap))
+
 # -------- RESTART --------
 async def restart_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     if not await _ensure_admin(update): return
@@ -134,6 +149,7 @@ handlers: List = [
     CommandHandler("reload_descriptions", reload_descriptions),
     CommandHandler("diag_payments", diag_payments),
     CommandHandler("reload_payments", reload_payments),
+    CommandHandler("diag_cache", diag_cache),
     CommandHandler("restart", restart_cmd),
     CallbackQueryHandler(restart_cb, pattern=r"^adm:restart:(yes|no)$"),
 ]
@@ -8,9 +8,10 @@ import logging
 from datetime import datetime
 
 from telegram import Update
-from telegram.ext import CallbackQueryHandler, ContextTypes
+from telegram.ext import ContextTypes
 
 from bot.utils.admin_keyboards import get_admin_payment_actions_kb, get_admin_confirm_kb
+from bot.utils.callback_router import prefix
 
 logger = logging.getLogger(__name__)
 
@@ -124,15 +125,8 @@ async def _approve(update: Update, context: ContextTypes.DEFAULT_TYPE, pid: str)
     except Exception as e:
         logger.error("Failed to delete admin message: %s", e)
 
-async def handle_admin_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_admin_payment_callback(update: Update, context: ContextTypes.DEFAULT_TYPE, action: str, pid: str):
     query = update.callback_query
-    data = (query.data or "")
-    try:
-        _, action, pid = data.split(":", 2)
-    except ValueError:
-        await query.answer()
-        return
-
     if action == "confirm":
         return await _open_confirm(update, context, pid)
     if action == "no":
@@ -142,6 +136,6 @@ async def handle_admin_payment_callback(update: Update, context: ContextTypes.DE
 
     await query.answer()
 
-handlers = [
-    CallbackQueryHandler(handle_admin_payment_callback, pattern=r"^adm_pay:"),
+routes = [
+    prefix("adm_pay:", handle_admin_payment_callback, str, str),
 ]
@@ -3,15 +3,16 @@ import logging
 from datetime import timezone
 from telegram import Update
 from telegram.error import BadRequest
-from telegram.ext import CallbackQueryHandler, ContextTypes
+from telegram.ext import ContextTypes
 
-from bot.database.notion_user_products import list_user_products
+from bot.database.notion_user_products import entitlements, list_user_products
 from bot.utils.user_keyboards import get_only_back_kb
 
 # Мы не вызываем show_personal_account, чтобы оно случайно не отправило новое сообщение.
 # Рисуем ЛК сами через get_personal_account_keyboard.
 from bot.utils.keyboards import get_personal_account_keyboard
 from bot.utils.languages import LANGUAGES
+from bot.utils.callback_router import exact
 
 log = logging.getLogger(__name__)
 
@@ -23,29 +24,35 @@ def _fmt_expiry(dt):
     except Exception:
         return "до " + str(dt)
 
+def _format_products(items) -> str:
+    if not items:
+        return "У вас пока нет активных продуктов."
+    lines = [f"{idx}. {p['name']} ({_fmt_expiry(p['expires_at'])})" for idx, p in enumerate(items, start=1)]
+    return "Мои продукты:\n\n" + "\n".join(lines)
+
 async def _render_products_text(user_id: int) -> str:
     try:
         items = await list_user_products(user_id)
     except Exception as e:
         log.error("list_user_products failed: %s", e)
         items = []
-
-    if not items:
-        return "У вас пока нет активных продуктов."
-    lines = [f"{idx}. {p['name']} ({_fmt_expiry(p['expires_at'])})" for idx, p in enumerate(items, start=1)]
-    return "Мои продукты:\n\n" + "\n".join(lines)
+    return _format_products(items)
 
 async def open_personal_purchases(update: Update, context: ContextTypes.DEFAULT_TYPE):
     q = update.callback_query
     await q.answer()
 
-    # Быстрый "загрузка..." (мгновенная реакция)
-    try:
-        await q.edit_message_text("⏳ Загружаю продукты...", reply_markup=get_only_back_kb(), disable_web_page_preview=True)
-    except BadRequest:
-        pass
-
-    text = await _render_products_text(q.from_user.id)
+    # Вид entitlements уже в памяти — рисуем сразу, без промежуточного "загрузка..."
+    items = entitlements.peek(q.from_user.id)
+    if items is not None:
+        text = _format_products(items)
+    else:
+        # Быстрый "загрузка..." (мгновенная реакция) — только при первом построении вида
+        try:
+            await q.edit_message_text("⏳ Загружаю продукты...", reply_markup=get_only_back_kb(), disable_web_page_preview=True)
+        except BadRequest:
+            pass
+        text = await _render_products_text(q.from_user.id)
     kb = get_only_back_kb()
 
     # Обновляем тем же сообщением на финальный контент
@@ -102,7 +109,8 @@ async def go_back(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except Exception as e:
         log.error("go_back: failed to send personal account: %s", e)
 
-handlers = [
-    CallbackQueryHandler(open_personal_purchases, pattern=r"^(cab:products|personal_purchases)$"),
-    CallbackQueryHandler(go_back, pattern=r"^cab:back$"),
+routes = [
+    exact("cab:products", open_personal_purchases),
+    exact("personal_purchases", open_personal_purchases),
+    exact("cab:back", go_back),
 ]
@@ -15,8 +15,10 @@ from bot.utils.keyboards import get_welcome_keyboard, get_main_menu_keyboard, ge
 from bot.utils.languages import LANGUAGES
 from bot.services.actions import log_action
 from bot.handlers import update_menu_message
-from bot.database.notion_db import update_user_in_notion, get_user_data, notion
-from config import NOTION_USERS_DB_ID
+from bot.database.notion_db import update_user_in_notion, get_user_data
+from bot.database.users_index import users_index, get_user_page_id
+from bot.database.local_store import local_store
+from bot.utils.callback_router import exact, one_of, prefix
 
 logger = logging.getLogger(__name__)
 
@@ -143,16 +145,12 @@ async def handle_new_name(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(f"{LANGUAGES[lang]['name_generic']}\n{LANGUAGES[lang]['enter_name_again']}")
         return EDIT_NAME_STATE
 
-    # Найдём страницу в Notion по Telegram ID
+    # Найдём страницу пользователя по Telegram ID (локальный индекс Users)
     try:
-        resp = notion.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Telegram ID", "number": {"equals": user_id}},
-        )
-        if not resp.get("results"):
+        page_id = await get_user_page_id(user_id)
+        if not page_id:
             await update.message.reply_text(LANGUAGES[lang]["registration_required"])
             return ConversationHandler.END
-        page_id = resp["results"][0]["id"]
     except Exception:
         await update.message.reply_text(LANGUAGES[lang]["registration_failed"])
         return ConversationHandler.END
@@ -248,16 +246,12 @@ async def handle_new_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
         return EDIT_EMAIL_STATE
 
-    # Найдём страницу в Notion по Telegram ID
+    # Найдём страницу пользователя по Telegram ID (локальный индекс Users)
     try:
-        resp = notion.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Telegram ID", "number": {"equals": user_id}},
-        )
-        if not resp.get("results"):
+        page_id = await get_user_page_id(user_id)
+        if not page_id:
             await update.message.reply_text(LANGUAGES[lang]["registration_required"])
             return ConversationHandler.END
-        page_id = resp["results"][0]["id"]
     except Exception:
         await update.message.reply_text(LANGUAGES[lang]["registration_failed"])
         return ConversationHandler.END
@@ -318,12 +312,11 @@ async def handle_new_email(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 # ---------- ПРОЧИЕ ТВОИ ОБРАБОТЧИКИ ----------
-async def language_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def language_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, lang: str):
     user_id = update.effective_user.id
     query = update.callback_query
     await query.answer()
 
-    lang = query.data.split("_")[-1]
     log_action("language_selected", user_id, {"language": lang})
 
     context.user_data["lang"] = lang
@@ -392,21 +385,17 @@ async def handle_change_language(update: Update, context: ContextTypes.DEFAULT_T
     await show_personal_account(update, context)
     log_action("language_changed_ui", user_id, {"new_language": new_lang})
 
-    # Затем запускаем фоновую задачу для Notion
+    # Затем ставим изменение в outbox (фоновый воркер доставит его в Notion)
     context.application.create_task(_update_language_in_notion(user_id, new_lang))
 
 
 async def _update_language_in_notion(user_id: int, new_lang: str):
-    """Фоновая задача для обновления языка в Notion."""
+    """Фоновая задача: резолв page_id и постановка смены языка в outbox."""
     try:
-        response = notion.databases.query(
-            database_id=NOTION_USERS_DB_ID,
-            filter={"property": "Telegram ID", "number": {"equals": user_id}},
-        )
-
-        if response["results"]:
-            page_id = response["results"][0]["id"]
-            notion.pages.update(page_id=page_id, properties={"Language": {"select": {"name": new_lang}}})
+        page_id = await get_user_page_id(user_id)
+        if page_id:
+            local_store.update_page(page_id, {"Language": {"select": {"name": new_lang}}})
+            users_index.patch(page_id, language=new_lang)
             log_action("notion_language_updated", user_id, {"new_language": new_lang})
     except Exception as e:
         logger.error("Background Notion update failed: %s", e, exc_info=True)
@@ -414,27 +403,36 @@ async def _update_language_in_notion(user_id: int, new_lang: str):
 
 
 # ---------- РЕГИСТРАЦИЯ ХЕНДЛЕРОВ ----------
-handlers = [
-    CallbackQueryHandler(language_selection, pattern="^set_lang_"),
-    CallbackQueryHandler(main_menu, pattern="^main_menu$"),
-    CallbackQueryHandler(handle_personal_account, pattern="^menu_personal_account$"),
-    CallbackQueryHandler(handle_change_language, pattern="^personal_change_lang$"),
+routes = [
+    prefix("set_lang_", language_selection, one_of(*LANGUAGES)),
+    exact("main_menu", main_menu),
+    exact("menu_personal_account", handle_personal_account),
+    exact("personal_change_lang", handle_change_language),
+
+    # Меню «Изменить личные данные»
+    exact("personal_edit", show_edit_profile_menu),
 
-    # Меню «Изменить личные данные» и его ветки
-    CallbackQueryHandler(show_edit_profile_menu, pattern="^personal_edit$"),
+    # Общий ловец остальных personal_* (оставлен как был)
+    prefix("personal_", handle_personal_account),
+]
+
+# Диалоги редактирования — отдельными хендлерами перед роутером:
+# их entry_points должны срабатывать раньше ловца personal_*
+handlers = [
     ConversationHandler(
         entry_points=[CallbackQueryHandler(start_edit_name, pattern="^personal_edit_name$")],
         states={EDIT_NAME_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_name)]},
         fallbacks=[],
         per_message=False,
+        name="edit_name",
+        persistent=True,
     ),
     ConversationHandler(
         entry_points=[CallbackQueryHandler(start_edit_email, pattern="^personal_edit_email$")],
         states={EDIT_EMAIL_STATE: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_new_email)]},
         fallbacks=[],
         per_message=False,
+        name="edit_email",
+        persistent=True,
     ),
-
-    # Общий ловец остальных personal_* (оставлен как был)
-    CallbackQueryHandler(handle_personal_account, pattern="^personal_"),
 ]
@@ -1,6 +1,6 @@
 import logging
 from telegram import Update
-from telegram.ext import ContextTypes, CallbackQueryHandler
+from telegram.ext import ContextTypes
 from bot.database.notion_db import get_user_data
 from bot.handlers.shared import update_menu_message
 from bot.utils.languages import LANGUAGES
@@ -8,24 +8,19 @@ from bot.data.descriptions import DESCRIPTIONS
 from bot.utils.keyboards import (
     get_upload_instructions_keyboard,
     get_donate_details_keyboard,
-    get_back_to_donate_currency_keyboard, get_donate_currency_keyboard,
-    get_main_menu_keyboard,
-    get_products_menu_keyboard,
-    get_consultations_menu_keyboard,
-    get_mentoring_menu_keyboard,
-    get_page_audit_menu_keyboard,
-    get_private_channel_menu_keyboard,
-    get_welcome_keyboard,
+    get_back_to_donate_currency_keyboard,
     get_cooperation_keyboard,
     get_back_to_menu_keyboard,
     get_personal_consultation_keyboard,
     get_company_consultation_keyboard,
-    get_consultation_payment_keyboard, get_mentoring_keyboard, get_mentoring_thanks_keyboard, get_audit_thanks_keyboard,
-    get_audit_keyboard, get_buy_ads_thanks_keyboard, get_buy_ads_keyboard, get_offline_session_thanks_keyboard,
-    get_session_menu_keyboard, get_offline_session_keyboard, get_online_session_keyboard,
-    get_online_session_payment_keyboard, get_personal_account_keyboard
+    get_mentoring_keyboard, get_mentoring_thanks_keyboard, get_audit_thanks_keyboard,
+    get_audit_keyboard, get_buy_ads_thanks_keyboard, get_offline_session_thanks_keyboard,
+    get_offline_session_keyboard, get_online_session_keyboard,
+    get_online_session_payment_keyboard
 )
 from bot.services.actions import log_action
+from bot.utils.callback_router import exact, one_of, prefix
+from bot.utils import menu_screens
 from config import ADMIN_CHAT_ID
 from datetime import datetime
 
@@ -81,21 +76,23 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE, cle
 
         # Отображаем главное меню
         if is_registered:
+            screen = menu_screens.main_menu(lang)
             await update_menu_message(
                 update=update,
                 context=context,
-                text=LANGUAGES[lang]["main_menu"],
-                reply_markup=get_main_menu_keyboard(lang),
+                text=screen.text,
+                reply_markup=screen.reply_markup,
                 is_query=bool(query),
                 menu_type='main'
             )
             log_action("main_menu_shown", user_id)
         else:
+            screen = menu_screens.registration_required(lang)
             await update_menu_message(
                 update=update,
                 context=context,
-                text=LANGUAGES[lang]["registration_required"],
-                reply_markup=get_welcome_keyboard(lang),
+                text=screen.text,
+                reply_markup=screen.reply_markup,
                 is_query=bool(query),
                 menu_type='main'
             )
@@ -124,11 +121,12 @@ async def show_products_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.products_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=LANGUAGES[lang]["products"],
-            reply_markup=get_products_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='products'  # Добавлено
@@ -167,11 +165,12 @@ async def show_consultations_menu(update: Update, context: ContextTypes.DEFAULT_
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.consultations_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=DESCRIPTIONS[lang]["consultations"],
-            reply_markup=get_consultations_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='consultations'  # Добавлено
@@ -190,11 +189,12 @@ async def show_mentoring_menu(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.mentoring_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=DESCRIPTIONS[lang]["mentoring"],
-            reply_markup=get_mentoring_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='mentoring'  # Добавлено
@@ -213,11 +213,12 @@ async def show_page_audit_menu(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.page_audit_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=DESCRIPTIONS[lang]["page_audit"],
-            reply_markup=get_page_audit_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='page_audit'  # Добавлено
@@ -236,11 +237,12 @@ async def show_private_channel_menu(update: Update, context: ContextTypes.DEFAUL
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.private_channel_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=DESCRIPTIONS[lang]["private_channel"],
-            reply_markup=get_private_channel_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='private_channel'  # Добавлено
@@ -301,7 +303,7 @@ async def show_personal_consultation_menu(update: Update, context: ContextTypes.
         log_action("personal_consultation_error", user_id, {"error": str(e)})
         logger.error(f"Error in show_personal_consultation_menu: {e}")
 
-async def handle_consultation_type_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_consultation_type_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, consultation_type: str):
     user_id = update.effective_user.id
     log_action("consultation_type_selected", user_id)
 
@@ -310,17 +312,12 @@ async def handle_consultation_type_selection(update: Update, context: ContextTyp
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
-        consultation_type = query.data.split(":")[1]
         context.user_data['current_consultation'] = consultation_type
 
-        description = DESCRIPTIONS[lang].get(
-            f"consultation_{consultation_type}_desc",
-            LANGUAGES[lang].get("default_description", "")
-        )
-
+        screen = menu_screens.consultation_type(lang, consultation_type)
         await query.edit_message_text(
-            text=f"{description}\n\n{LANGUAGES[lang]['choose_payment']}",
-            reply_markup=get_consultation_payment_keyboard(lang, consultation_type),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             parse_mode='HTML'
         )
     except Exception as e:
@@ -345,12 +342,10 @@ async def show_company_consultation_menu(update: Update, context: ContextTypes.D
         log_action("company_consultation_error", user_id, {"error": str(e)})
         logger.error(f"Error in show_company_consultation_menu: {e}")
 
-async def back_to_consultation_type(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def back_to_consultation_type(update: Update, context: ContextTypes.DEFAULT_TYPE, consultation_type: str):
     try:
         query = update.callback_query
         await query.answer()
-        lang = context.user_data.get('lang', 'ru')
-        consultation_type = query.data.split(":")[1]
 
         if consultation_type in ["love", "work"]:
             await show_personal_consultation_menu(update, context)
@@ -452,18 +447,10 @@ async def show_personal_audit(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
-        message_text = (
-            "🔍 <b>{}</b>\n\n{}\n\n{}".format(
-                LANGUAGES[lang]["audit_personal"],
-                LANGUAGES[lang]["audit_personal_desc"],
-                "После заполнения формы мы свяжемся с вами для уточнения деталей." if lang == "ru" else
-                "After submitting the form, we'll contact you to discuss details."
-            )
-        )
-
+        screen = menu_screens.personal_audit(lang)
         await query.edit_message_text(
-            text=message_text,
-            reply_markup=get_audit_keyboard(lang, "personal"),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             parse_mode='HTML'
         )
     except Exception as e:
@@ -489,13 +476,12 @@ async def show_company_audit(update: Update, context: ContextTypes.DEFAULT_TYPE)
         logger.error(f"Error in show_company_audit: {e}")
 
 
-async def handle_audit_filled(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_audit_filled(update: Update, context: ContextTypes.DEFAULT_TYPE, audit_type: str):
     try:
         query = update.callback_query
         await query.answer()
         user = update.effective_user
         lang = context.user_data.get('lang', 'ru')
-        audit_type = query.data.split('_')[-1]  # Получаем тип аудита (personal/company)
 
         # Отправка уведомления админу
         user_info = f"@{user.username}" if user.username else f"ID: {user.id}"
@@ -540,19 +526,10 @@ async def show_buy_ads(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
-        message_text = (
-            f"{LANGUAGES[lang]['buy_ads_title']}\n\n"
-            f"{LANGUAGES[lang]['buy_ads_desc']}\n\n"
-            "После заполнения формы мы свяжемся с вами для уточнения деталей."
-            if lang == "ru" else
-            f"{LANGUAGES[lang]['buy_ads_title']}\n\n"
-            f"{LANGUAGES[lang]['buy_ads_desc']}\n\n"
-            "After submitting the form, we'll contact you to discuss details."
-        )
-
+        screen = menu_screens.buy_ads(lang)
         await query.edit_message_text(
-            text=message_text,
-            reply_markup=get_buy_ads_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             parse_mode='HTML'
         )
     except Exception as e:
@@ -603,11 +580,12 @@ async def show_session_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.session_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=LANGUAGES[lang]["book_session"],
-            reply_markup=get_session_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='session'  # Добавлено
@@ -713,11 +691,12 @@ async def show_personal_account(update: Update, context: ContextTypes.DEFAULT_TY
     lang = context.user_data.get('lang', 'ru')
 
     try:
+        screen = menu_screens.personal_account(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=LANGUAGES[lang]["personal_account"],
-            reply_markup=get_personal_account_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='personal_account'
@@ -733,11 +712,12 @@ async def show_donate_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = update.effective_user.id
     lang = context.user_data.get('lang', 'ru')
     try:
+        screen = menu_screens.donate_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=LANGUAGES[lang]["donate"],
-            reply_markup=get_donate_currency_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='donate_menu'
@@ -750,36 +730,23 @@ async def show_donate_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 
-async def handle_donate_currency(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обработчик выбора валюты для доната"""
+async def handle_donate_currency(update: Update, context: ContextTypes.DEFAULT_TYPE, currency: str):
+    """Обработчик выбора валюты для доната (donate_<rub|crypto|eur>)"""
     user_id = update.effective_user.id
     query = update.callback_query
     await query.answer()
     lang = context.user_data.get('lang', 'ru')
 
-    data = query.data
-    if data == "donate_rub":
-        details = DESCRIPTIONS[lang]["payment_rub_details"]
-        ckey = "rub"
-    elif data == "donate_crypto":
-        details = DESCRIPTIONS[lang]["payment_crypto_details"]
-        ckey = "crypto"
-    elif data == "donate_eur":
-        details = DESCRIPTIONS[lang]["payment_eur_details"]
-        ckey = "eur"
-    else:
-        return
-
     await query.edit_message_text(
-        text=details,
-        reply_markup=get_donate_details_keyboard(lang, ckey),
+        text=DESCRIPTIONS[lang][f"payment_{currency}_details"],
+        reply_markup=get_donate_details_keyboard(lang, currency),
         parse_mode='HTML'
     )
-    log_action("donate_currency_shown", user_id, {"currency": ckey})
+    log_action("donate_currency_shown", user_id, {"currency": currency})
 
 
 
-async def handle_donate_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_donate_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE, currency_key: str):
     """
     Включает режим ожидания скриншота для доната.
     Колбэк: donate_upload_screenshot:<rub|crypto|eur>
@@ -788,8 +755,6 @@ async def handle_donate_upload_screenshot(update: Update, context: ContextTypes.
     await query.answer()
     lang = context.user_data.get('lang', 'ru')
     try:
-        currency_key = query.data.split(":")[1]
-
         context.user_data['awaiting_screenshot'] = True
         context.user_data['current_payment_type'] = f"donate_{currency_key}"
         context.user_data['last_back_pattern'] = "menu_donate"
@@ -802,34 +767,34 @@ async def handle_donate_upload_screenshot(update: Update, context: ContextTypes.
         context.user_data['last_instructions_message_id'] = message.message_id
     except Exception as e:
         await query.answer("⚠️ Ошибка, попробуйте ещё раз", show_alert=True)
-handlers = [
-# Main menus
-    #CallbackQueryHandler(show_main_menu, pattern="^main_menu$"),
-    CallbackQueryHandler(show_products_menu, pattern="^menu_products$"),
-    CallbackQueryHandler(show_offer_cooperation_menu, pattern="^menu_offer_cooperation$"),
-    CallbackQueryHandler(handle_cooperation_filled, pattern="^cooperation_filled$"),
-    CallbackQueryHandler(show_consultations_menu, pattern="^menu_consultations$"),
-    CallbackQueryHandler(show_mentoring_menu, pattern="^menu_mentoring$"),
-    CallbackQueryHandler(show_page_audit_menu, pattern="^menu_page_audit$"),
-    CallbackQueryHandler(show_private_channel_menu, pattern="^menu_private_channel$"),
-    CallbackQueryHandler(show_personal_consultation_menu, pattern="^consultation_personal$"),
-    CallbackQueryHandler(show_company_consultation_menu, pattern="^consultation_company$"),
-    CallbackQueryHandler(handle_consultation_type_selection, pattern="^consultation_type:"),
-    CallbackQueryHandler(back_to_consultation_type, pattern="^consultation_back:"),
-    CallbackQueryHandler(show_personal_mentoring, pattern="^mentoring_personal$"),
-    CallbackQueryHandler(show_company_mentoring, pattern="^mentoring_company$"),
-    CallbackQueryHandler(handle_mentoring_filled, pattern="^mentoring_filled_"),
-    CallbackQueryHandler(show_personal_audit, pattern="^audit_personal$"),
-    CallbackQueryHandler(show_company_audit, pattern="^audit_company$"),
-    CallbackQueryHandler(handle_audit_filled, pattern="^audit_filled_"),
-    CallbackQueryHandler(show_buy_ads, pattern="^menu_buy_ads$"),
-    CallbackQueryHandler(handle_buy_ads_filled, pattern="^buy_ads_filled$"),
-    CallbackQueryHandler(show_session_menu, pattern="^menu_book_session$"),
-    CallbackQueryHandler(show_offline_session, pattern="^offline_session$"),
-    CallbackQueryHandler(show_online_session, pattern="^online_session$"),
-    # CallbackQueryHandler(show_online_session_payment_options, pattern="^online_session_payment$"),
-    CallbackQueryHandler(handle_offline_session_filled, pattern="^offline_session_filled$"),
-    CallbackQueryHandler(show_donate_menu, pattern="^menu_donate$"),
-    CallbackQueryHandler(handle_donate_currency, pattern="^donate_(rub|crypto|eur)$"),
-    CallbackQueryHandler(handle_donate_upload_screenshot, pattern="^donate_upload_screenshot:(rub|crypto|eur)$"),
-]
\ No newline at end of file
+CURRENCIES = one_of("rub", "crypto", "eur")
+
+routes = [
+    # Main menus
+    exact("menu_products", show_products_menu),
+    exact("menu_offer_cooperation", show_offer_cooperation_menu),
+    exact("cooperation_filled", handle_cooperation_filled),
+    exact("menu_consultations", show_consultations_menu),
+    exact("menu_mentoring", show_mentoring_menu),
+    exact("menu_page_audit", show_page_audit_menu),
+    exact("menu_private_channel", show_private_channel_menu),
+    exact("consultation_personal", show_personal_consultation_menu),
+    exact("consultation_company", show_company_consultation_menu),
+    prefix("consultation_type:", handle_consultation_type_selection, str),
+    prefix("consultation_back:", back_to_consultation_type, str),
+    exact("mentoring_personal", show_personal_mentoring),
+    exact("mentoring_company", show_company_mentoring),
+    prefix("mentoring_filled_", handle_mentoring_filled),
+    exact("audit_personal", show_personal_audit),
+    exact("audit_company", show_company_audit),
+    prefix("audit_filled_", handle_audit_filled, one_of("personal", "company")),
+    exact("menu_buy_ads", show_buy_ads),
+    exact("buy_ads_filled", handle_buy_ads_filled),
+    exact("menu_book_session", show_session_menu),
+    exact("offline_session", show_offline_session),
+    exact("online_session", show_online_session),
+    exact("offline_session_filled", handle_offline_session_filled),
+    exact("menu_donate", show_donate_menu),
+    prefix("donate_", handle_donate_currency, CURRENCIES),
+    prefix("donate_upload_screenshot:", handle_donate_upload_screenshot, CURRENCIES),
+]
@@ -2,7 +2,7 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from telegram import Update
-from telegram.ext import ContextTypes, CallbackQueryHandler
+from telegram.ext import ContextTypes
 
 from bot.data.webinar_descriptions import WEBINAR_DESCRIPTIONS
 from bot.handlers.shared import update_menu_message
@@ -20,6 +20,7 @@ from bot.utils.keyboards import (
     get_upload_instructions_keyboard, get_success_upload_keyboard, get_invalid_file_keyboard,
 )
 from bot.services.actions import log_action
+from bot.utils.callback_router import exact, one_of, prefix
 from config import ADMIN_CHAT_ID
 from bot.utils.admin_keyboards import get_admin_payment_actions_kb
 from bot.handlers.admin_payments import remember_pending_payment
@@ -55,7 +56,7 @@ def is_file_allowed(file_name: str, mime_type: str = None) -> bool:
     return file_ext in ALLOWED_EXTENSIONS
 
 # Общие обработчики платежей
-async def show_payment_methods(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_payment_methods(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     user_id = update.effective_user.id
     log_action("payment_methods_open", user_id)
 
@@ -63,7 +64,6 @@ async def show_payment_methods(update: Update, context: ContextTypes.DEFAULT_TYP
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        webinar_id = query.data.replace("payment_methods_", "")
 
         context.user_data['current_webinar'] = webinar_id
 
@@ -81,7 +81,7 @@ async def show_payment_methods(update: Update, context: ContextTypes.DEFAULT_TYP
         log_action("payment_methods_error", user_id, {"webinar_id": webinar_id, "error": str(e)})
         raise
 
-async def show_consultation_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_consultation_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, currency: str, consultation_type: str):
     user_id = update.effective_user.id
     log_action("consultation_payment_open", user_id)
 
@@ -89,7 +89,6 @@ async def show_consultation_payment(update: Update, context: ContextTypes.DEFAUL
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, currency, consultation_type = query.data.split(":")
 
         description = DESCRIPTIONS[lang][f"consultation_{consultation_type}_desc"]
         payment_details = {
@@ -107,7 +106,7 @@ async def show_consultation_payment(update: Update, context: ContextTypes.DEFAUL
         log_action("consultation_payment_error", user_id, {"error": str(e)})
         logger.error(f"Error in show_consultation_payment: {e}")
 
-async def show_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     user_id = update.effective_user.id
     log_action("rub_payment_open", user_id)
 
@@ -115,7 +114,6 @@ async def show_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        webinar_id = query.data.replace("pay_rub_", "")
 
         context.user_data['current_webinar'] = webinar_id
 
@@ -130,7 +128,7 @@ async def show_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.error(f"Error in show_rub_payment: {e}", exc_info=True)
         raise
 
-async def show_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     user_id = update.effective_user.id
     log_action("crypto_payment_open", user_id)
 
@@ -138,7 +136,6 @@ async def show_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        webinar_id = query.data.replace("pay_crypto_", "")
 
         context.user_data['current_webinar'] = webinar_id
 
@@ -153,7 +150,7 @@ async def show_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE
         logger.error(f"Error in show_crypto_payment: {e}", exc_info=True)
         raise
 
-async def show_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     user_id = update.effective_user.id
     log_action("eur_payment_open", user_id)
 
@@ -161,7 +158,6 @@ async def show_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        webinar_id = query.data.replace("pay_eur_", "")
 
         context.user_data['current_webinar'] = webinar_id
 
@@ -177,7 +173,7 @@ async def show_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
         raise
 
 # Hypno payment handlers
-async def show_hypno_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_hypno_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("hypno_rub_payment_open", user_id)
 
@@ -185,7 +181,6 @@ async def show_hypno_rub_payment(update: Update, context: ContextTypes.DEFAULT_T
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_hypno_part'] = part
 
         payment_text = (
@@ -204,7 +199,7 @@ async def show_hypno_rub_payment(update: Update, context: ContextTypes.DEFAULT_T
         logger.error(f"Error in show_hypno_rub_payment: {e}", exc_info=True)
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def show_hypno_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_hypno_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("hypno_crypto_payment_open", user_id)
 
@@ -212,7 +207,6 @@ async def show_hypno_crypto_payment(update: Update, context: ContextTypes.DEFAUL
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_hypno_part'] = part
 
         payment_text = (
@@ -229,7 +223,7 @@ async def show_hypno_crypto_payment(update: Update, context: ContextTypes.DEFAUL
         logger.error(f"Error in show_hypno_crypto_payment: {e}")
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def show_hypno_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_hypno_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("hypno_eur_payment_open", user_id)
 
@@ -237,7 +231,6 @@ async def show_hypno_eur_payment(update: Update, context: ContextTypes.DEFAULT_T
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_hypno_part'] = part
 
         payment_text = (
@@ -254,12 +247,11 @@ async def show_hypno_eur_payment(update: Update, context: ContextTypes.DEFAULT_T
         logger.error(f"Error in show_hypno_eur_payment: {e}")
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def back_to_hypno_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def back_to_hypno_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.replace("hypno_back_to_payment_", "")
 
         description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
             f"webinar_hypno_part_{part}",
@@ -282,14 +274,13 @@ async def back_to_hypno_payment(update: Update, context: ContextTypes.DEFAULT_TY
         await query.answer("⚠️ Ошибка при возврате")
 
 # Femdom payment handlers
-async def show_femdom_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_femdom_rub_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("femdom_rub_payment_open", user_id)
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_femdom_part'] = part
 
         payment_text = (
@@ -306,14 +297,13 @@ async def show_femdom_rub_payment(update: Update, context: ContextTypes.DEFAULT_
         log_action("femdom_rub_payment_error", user_id, {"error": str(e)})
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def show_femdom_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_femdom_crypto_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("femdom_crypto_payment_open", user_id)
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_femdom_part'] = part
 
         payment_text = (
@@ -330,14 +320,13 @@ async def show_femdom_crypto_payment(update: Update, context: ContextTypes.DEFAU
         logger.error(f"Error in show_femdom_crypto_payment: {e}")
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def show_femdom_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_femdom_eur_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     user_id = update.effective_user.id
     log_action("femdom_eur_payment_open", user_id)
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        _, _, part = query.data.split(":")
         context.user_data['current_femdom_part'] = part
 
         payment_text = (
@@ -354,12 +343,11 @@ async def show_femdom_eur_payment(update: Update, context: ContextTypes.DEFAULT_
         logger.error(f"Error in show_femdom_eur_payment: {e}")
         await query.answer("⚠️ Ошибка при загрузке реквизитов")
 
-async def back_to_femdom_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def back_to_femdom_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.replace("femdom_back_to_payment_", "")
 
         description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
             f"webinar_femdom_part_{part}",
@@ -400,12 +388,11 @@ async def show_online_session_payment(update: Update, context: ContextTypes.DEFA
         logger.error(f"Error in show_online_session_payment: {e}")
 
 
-async def handle_online_session_payment(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_online_session_payment(update: Update, context: ContextTypes.DEFAULT_TYPE, currency: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        currency = query.data.split(":")[1]  # rub/crypto/eur
 
         payment_details = {
             "rub": DESCRIPTIONS[lang]["payment_rub_details"],
@@ -439,12 +426,11 @@ async def back_to_currency_selection(update: Update, context: ContextTypes.DEFAU
         await query.answer("⚠️ Ошибка при возврате")
 
 
-async def handle_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        webinar_id = query.data.split(":")[1]
 
         context.user_data['awaiting_screenshot'] = True
         context.user_data['current_payment_type'] = f"webinar_{webinar_id}"
@@ -462,12 +448,11 @@ async def handle_upload_screenshot(update: Update, context: ContextTypes.DEFAULT
         logger.error(f"Error in handle_upload_screenshot: {e}")
 
 
-async def handle_hypno_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_hypno_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.split(":")[1]
 
         context.user_data['awaiting_screenshot'] = True
         context.user_data['current_payment_type'] = f"hypno_part_{part}"
@@ -482,12 +467,11 @@ async def handle_hypno_upload_screenshot(update: Update, context: ContextTypes.D
         logger.error(f"Error in handle_hypno_upload_screenshot: {e}")
 
 
-async def handle_femdom_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_femdom_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.split(":")[1]
 
         context.user_data['awaiting_screenshot'] = True
         context.user_data['current_payment_type'] = f"femdom_part_{part}"
@@ -502,12 +486,11 @@ async def handle_femdom_upload_screenshot(update: Update, context: ContextTypes.
         logger.error(f"Error in handle_femdom_upload_screenshot: {e}")
 
 
-async def handle_consultation_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_consultation_upload_screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE, consultation_type: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        consultation_type = query.data.split(":")[1]
 
         context.user_data['awaiting_screenshot'] = True
         context.user_data['current_payment_type'] = f"consultation_{consultation_type}"
@@ -722,36 +705,36 @@ async def handle_document(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
-handlers = [
+CURRENCIES = one_of("rub", "crypto", "eur")
+
+routes = [
     # Common payments
-    CallbackQueryHandler(show_payment_methods, pattern="^payment_methods_"),
-    CallbackQueryHandler(show_rub_payment, pattern="^pay_rub_"),
-    CallbackQueryHandler(show_crypto_payment, pattern="^pay_crypto_"),
-    CallbackQueryHandler(show_eur_payment, pattern="^pay_eur_"),
-    CallbackQueryHandler(show_consultation_payment, pattern="^consultation_pay:"),
+    prefix("payment_methods_", show_payment_methods, str),
+    prefix("pay_rub_", show_rub_payment, str),
+    prefix("pay_crypto_", show_crypto_payment, str),
+    prefix("pay_eur_", show_eur_payment, str),
+    prefix("consultation_pay:", show_consultation_payment, CURRENCIES, str),
 
     # Hypno payments
-    CallbackQueryHandler(show_hypno_rub_payment, pattern="^hypno_pay:rub:"),
-    CallbackQueryHandler(show_hypno_crypto_payment, pattern="^hypno_pay:crypto:"),
-    CallbackQueryHandler(show_hypno_eur_payment, pattern="^hypno_pay:eur:"),
-    CallbackQueryHandler(back_to_hypno_payment, pattern="^hypno_back_to_payment_"),
+    prefix("hypno_pay:rub:", show_hypno_rub_payment, str),
+    prefix("hypno_pay:crypto:", show_hypno_crypto_payment, str),
+    prefix("hypno_pay:eur:", show_hypno_eur_payment, str),
+    prefix("hypno_back_to_payment_", back_to_hypno_payment, str),
 
     # Femdom payments
-    CallbackQueryHandler(show_femdom_rub_payment, pattern="^femdom_pay:rub:"),
-    CallbackQueryHandler(show_femdom_crypto_payment, pattern="^femdom_pay:crypto:"),
-    CallbackQueryHandler(show_femdom_eur_payment, pattern="^femdom_pay:eur:"),
-    CallbackQueryHandler(back_to_femdom_payment, pattern="^femdom_back_to_payment_"),
+    prefix("femdom_pay:rub:", show_femdom_rub_payment, str),
+    prefix("femdom_pay:crypto:", show_femdom_crypto_payment, str),
+    prefix("femdom_pay:eur:", show_femdom_eur_payment, str),
+    prefix("femdom_back_to_payment_", back_to_femdom_payment, str),
 
     # Session payments
-    CallbackQueryHandler(handle_online_session_payment, pattern="^online_session_payment:rub$"),
-    CallbackQueryHandler(handle_online_session_payment, pattern="^online_session_payment:crypto$"),
-    CallbackQueryHandler(handle_online_session_payment, pattern="^online_session_payment:eur$"),
-    CallbackQueryHandler(back_to_currency_selection, pattern="^online_session_payment$"),
+    prefix("online_session_payment:", handle_online_session_payment, CURRENCIES),
+    exact("online_session_payment", back_to_currency_selection),
 
     # Новые обработчики для загрузки скриншотов
-    CallbackQueryHandler(handle_upload_screenshot, pattern="^upload_screenshot:"),
-    CallbackQueryHandler(handle_hypno_upload_screenshot, pattern="^hypno_upload_screenshot:"),
-    CallbackQueryHandler(handle_femdom_upload_screenshot, pattern="^femdom_upload_screenshot:"),
-    CallbackQueryHandler(handle_consultation_upload_screenshot, pattern="^consultation_upload_screenshot:"),
-    CallbackQueryHandler(handle_online_session_upload_screenshot, pattern="^online_session_upload_screenshot$"),
-]
\ No newline at end of file
+    prefix("upload_screenshot:", handle_upload_screenshot, str),
+    prefix("hypno_upload_screenshot:", handle_hypno_upload_screenshot, str),
+    prefix("femdom_upload_screenshot:", handle_femdom_upload_screenshot, str),
+    prefix("consultation_upload_screenshot:", handle_consultation_upload_screenshot, str),
+    exact("online_session_upload_screenshot", handle_online_session_upload_screenshot),
+]
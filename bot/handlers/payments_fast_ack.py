@@ -20,11 +20,12 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
 from telegram.ext import (
     ContextTypes,
     MessageHandler,
-    CallbackQueryHandler,
     filters,
     ApplicationHandlerStop,
 )
 
+from bot.utils.callback_router import exact
+
 # --- Конфиг/утилиты ---
 try:
     from config import ADMIN_IDS
@@ -299,7 +300,7 @@ async def on_return_to_main(update: Update, context: ContextTypes.DEFAULT_TYPE)
     except Exception:
         pass
 
-    # СТОП — чтобы другие CallbackQueryHandler не перехватывали этот клик
+    # СТОП — чтобы хендлеры других групп не перехватывали этот клик
     raise ApplicationHandlerStop()
 
 # Экспорт хендлеров — БЕЗ block=False (по умолчанию block=True)
@@ -307,9 +308,5 @@ ack_message_handler = MessageHandler(
     (filters.ChatType.PRIVATE & (filters.PHOTO | filters.Document.ALL)),
     handle_fast_payment_ack,
 )
-back_button_handler = CallbackQueryHandler(
-    on_return_to_main,
-    pattern=r"^" + BACK_CB + r"$",
-)
-
-handlers = [ack_message_handler, back_button_handler]
+handlers = [ack_message_handler]
+routes = [exact(BACK_CB, on_return_to_main)]
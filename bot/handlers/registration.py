@@ -227,5 +227,7 @@ register_conversation_handler = ConversationHandler(
         EMAIL: [MessageHandler(filters.TEXT & ~filters.COMMAND, get_email)]
     },
     fallbacks=[],
-    per_message=False
+    per_message=False,
+    name="registration",
+    persistent=True,
 )
\ No newline at end of file
@@ -1,22 +1,21 @@
 import logging
 from telegram import Update
-from telegram.ext import ContextTypes, CallbackQueryHandler
+from telegram.ext import ContextTypes
 
 from bot.handlers.shared import update_menu_message
 from bot.utils.languages import LANGUAGES
 from bot.data.webinar_descriptions import WEBINAR_DESCRIPTIONS
 from bot.data.descriptions import DESCRIPTIONS
 from bot.utils.keyboards import (
-    get_webinars_menu_keyboard,
     get_webinar_details_keyboard,
     get_hypno_webinar_keyboard,
-    get_hypno_payment_keyboard,
     get_back_to_hypno_payment_keyboard,
     get_femdom_webinar_keyboard,
-    get_femdom_payment_keyboard,
     get_back_to_femdom_payment_keyboard
 )
 from bot.services.actions import log_action
+from bot.utils.callback_router import exact, one_of, prefix
+from bot.utils import menu_screens
 
 logger = logging.getLogger(__name__)
 
@@ -30,11 +29,12 @@ async def show_webinars_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
+        screen = menu_screens.webinars_menu(lang)
         await update_menu_message(
             update=update,
             context=context,
-            text=LANGUAGES[lang]["webinars_title"],
-            reply_markup=get_webinars_menu_keyboard(lang),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             is_query=True,
             parse_mode='HTML',
             menu_type='webinars'  # Добавлено
@@ -46,7 +46,7 @@ async def show_webinars_menu(update: Update, context: ContextTypes.DEFAULT_TYPE)
         raise
 
 
-async def show_webinar_details(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def show_webinar_details(update: Update, context: ContextTypes.DEFAULT_TYPE, webinar_id: str):
     user_id = update.effective_user.id
     log_action("webinar_details_open", user_id)
 
@@ -55,7 +55,6 @@ async def show_webinar_details(update: Update, context: ContextTypes.DEFAULT_TYP
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
 
-        webinar_id = query.data.replace("webinar_details_", "").replace("webinar_", "")
         full_webinar_id = f"webinar_{webinar_id}"
 
         description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
@@ -109,28 +108,16 @@ async def show_hypno_webinar(update: Update, context: ContextTypes.DEFAULT_TYPE)
         await query.answer("⚠️ Ошибка при обновлении")
 
 
-async def handle_hypno_part_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_hypno_part_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.split(":")[1]  # "1", "2" или "both"
-
-        description_key = f"webinar_hypno_part_{part}"
-        description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
-            description_key,
-            f"Описание части {part} не найдено"
-        )
-
-        message_text = (
-            f"💰 <b>Оплата {LANGUAGES[lang][f'part_{part}']}</b>\n\n"
-            f"{description}\n\n"
-            "Выберите способ оплаты:"
-        )
 
+        screen = menu_screens.webinar_part_payment(lang, "hypno", part)
         await query.edit_message_text(
-            text=message_text,
-            reply_markup=get_hypno_payment_keyboard(lang, part),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             parse_mode='HTML'
         )
     except Exception as e:
@@ -171,28 +158,16 @@ async def show_femdom_webinar(update: Update, context: ContextTypes.DEFAULT_TYPE
         await query.answer("⚠️ Ошибка при обновлении")
 
 
-async def handle_femdom_part_selection(update: Update, context: ContextTypes.DEFAULT_TYPE):
+async def handle_femdom_part_selection(update: Update, context: ContextTypes.DEFAULT_TYPE, part: str):
     try:
         query = update.callback_query
         await query.answer()
         lang = context.user_data.get('lang', 'ru')
-        part = query.data.split(":")[1]
-
-        description_key = f"webinar_femdom_part_{part}"
-        description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
-            description_key,
-            f"Описание части {part} не найдено"
-        )
-
-        message_text = (
-            f"💰 <b>Оплата {LANGUAGES[lang][f'part_{part}']}</b>\n\n"
-            f"{description}\n\n"
-            "Выберите способ оплаты:"
-        )
 
+        screen = menu_screens.webinar_part_payment(lang, "femdom", part)
         await query.edit_message_text(
-            text=message_text,
-            reply_markup=get_femdom_payment_keyboard(lang, part),
+            text=screen.text,
+            reply_markup=screen.reply_markup,
             parse_mode='HTML'
         )
     except Exception as e:
@@ -204,20 +179,27 @@ async def back_to_femdom_parts(update: Update, context: ContextTypes.DEFAULT_TYP
     await show_femdom_webinar(update, context)
 
 
-handlers = [
+PARTS = one_of("1", "2", "both")
+
+
+def _webinar_id(value: str) -> str:
+    """Id вебинара без "webinar_": Back с экрана оплаты шлёт webinar_details_webinar_<id>."""
+    return value[len("webinar_"):] if value.startswith("webinar_") else value
+
+routes = [
     # Webinars
-    CallbackQueryHandler(show_webinars_menu, pattern="^menu_webinars$"),
-    CallbackQueryHandler(show_webinar_details, pattern="^webinar_details_"),
-    CallbackQueryHandler(show_webinar_details, pattern="^webinar_"),
+    exact("menu_webinars", show_webinars_menu),
+    prefix("webinar_details_", show_webinar_details, _webinar_id),
+    prefix("webinar_", show_webinar_details, str),
 
     # Hypno
-    CallbackQueryHandler(show_hypno_webinar, pattern="^hypno_webinar$"),
-    CallbackQueryHandler(handle_hypno_part_selection, pattern="^hypno_part:"),
-    CallbackQueryHandler(back_to_webinars, pattern="^back_to_webinars$"),
-    CallbackQueryHandler(back_to_hypno_parts, pattern="^back_to_hypno_parts$"),
+    exact("hypno_webinar", show_hypno_webinar),
+    prefix("hypno_part:", handle_hypno_part_selection, PARTS),
+    exact("back_to_webinars", back_to_webinars),
+    exact("back_to_hypno_parts", back_to_hypno_parts),
 
     # Femdom
-    CallbackQueryHandler(show_femdom_webinar, pattern="^femdom_webinar$"),
-    CallbackQueryHandler(handle_femdom_part_selection, pattern="^femdom_part:"),
-    CallbackQueryHandler(back_to_femdom_parts, pattern="^back_to_femdom_parts$"),
-]
\ No newline at end of file
+    exact("femdom_webinar", show_femdom_webinar),
+    prefix("femdom_part:", handle_femdom_part_selection, PARTS),
+    exact("back_to_femdom_parts", back_to_femdom_parts),
+]
@@ -9,6 +9,8 @@ from typing import List
 from telegram.ext import Application
 from bot.services.logging_setup import setup_logging
 from bot.services.actions import log_action
+from bot.services import webhook
+from bot.services.ptb_persistence import persistence
 
 try:
     from config import ADMIN_IDS  # type: ignore
@@ -42,8 +44,9 @@ def _register_payment_ack_handler(application: Application) -> None:
 async def _warmup(application: Application) -> None:
     log_warm = logging.getLogger("warmup")
     try:
-        from bot.services.warmup import preload_notion_caches  # type: ignore
+        from bot.services.warmup import preload_notion_caches, start_background_sync  # type: ignore
         res = await preload_notion_caches()
+        start_background_sync(application)
         if isinstance(res, dict):
             log_warm.info("Notion caches preloaded: %s", ", ".join(f"{k}={v}" for k, v in res.items()))
         else:
@@ -52,6 +55,16 @@ async def _warmup(application: Application) -> None:
         pass
 
 
+def _prerender_screens() -> None:
+    # экраны, зависящие только от языка, — собрать заранее (дальше клик = поиск в dict)
+    try:
+        from bot.utils.languages import LANGUAGES
+        from bot.utils.screens import screens
+        logging.getLogger("startup").info("screens prerendered: %s", screens.prerender(LANGUAGES))
+    except Exception as e:
+        logging.getLogger("startup").warning("screens prerender failed: %s", e)
+
+
 async def _setup_admin_controls(application: Application) -> None:
     log_admin = logging.getLogger("admin_menu")
     try:
@@ -89,6 +102,7 @@ async def _on_startup(application: Application) -> None:
         except Exception:
             pass
 
+    _prerender_screens()
     await _warmup(application)
     await _setup_admin_controls(application)
 
@@ -99,6 +113,37 @@ async def _on_shutdown(application: Application) -> None:
         log_action("shutdown")
     except Exception:
         pass
+    try:
+        # Последняя попытка реплицировать local_store и доставить outbox; недоставленное
+        # останется на диске до следующего старта
+        from bot.database.local_store import local_store
+        from bot.services.notion_outbox import outbox as notion_outbox
+        await asyncio.wait_for(local_store.replicate(), timeout=10)
+        await asyncio.wait_for(notion_outbox.flush(), timeout=10)
+    except Exception:
+        pass
+    try:
+        from bot.services.notion_gateway import aclose as close_notion_gateway
+        await close_notion_gateway()
+    except Exception:
+        pass
+
+
+async def _shutdown(application: Application, server: "webhook.WebhookServer | None" = None) -> None:
+    # корректное завершение PTB: сначала источник апдейтов, затем фоновые циклы
+    # (иначе application.stop() ждал бы их вечно), затем сам PTB
+    if server is not None:
+        await server.stop()
+    elif application.updater is not None and application.updater.running:
+        await application.updater.stop()
+    try:
+        from bot.services.warmup import stop_background_sync
+        await stop_background_sync()
+    except Exception:
+        logging.getLogger(__name__).exception("Failed to stop background tasks")
+    await application.stop()
+    await _on_shutdown(application)
+    await application.shutdown()
 
 
 def _get_token() -> str:
@@ -115,6 +160,7 @@ async def main() -> None:
         Application.builder()
         .token(_get_token())
         .concurrent_updates(True)
+        .persistence(persistence)
         .build()
     )
 
@@ -129,17 +175,23 @@ async def main() -> None:
     await application.initialize()
     await application.start()
     await _on_startup(application)
-    await application.updater.start_polling(drop_pending_updates=True)
+    if webhook.enabled():
+        server = webhook.WebhookServer(application)
+        await server.start()
+        await server.set_webhook()
+    else:
+        server = None
+        await application.updater.start_polling(
+            drop_pending_updates=True,
+            allowed_updates=webhook.ALLOWED_UPDATES,
+        )
 
     try:
         await asyncio.Event().wait()  # держим процесс
     except asyncio.CancelledError:
         pass  # ожидаемая отмена при Ctrl+C
     finally:
-        # корректное завершение PTB
-        await application.updater.stop()
-        await application.stop()
-        await application.shutdown()
+        await _shutdown(application, server)
 
 if __name__ == "__main__":
     try:
@@ -1,23 +1,34 @@
 # bot/scripts/backfill_payment_fast_fields.py
 """
-Одноразовый скрипт: заполнить/создать в Payments поля Product Name / Expires at и проставить их для оплаченных платежей.
-Запуск:  python -m bot.scripts.backfill_payment_fast_fields
+Скрипт обслуживания: создать в Payments поля Product Name / Expires at и проставить их для оплаченных платежей.
+Работает на bot.services.backfill_engine: пул воркеров, чекпоинт, dry-run, прогресс.
+
+Запуск:  python -m bot.scripts.backfill_payment_fast_fields [--dry-run] [--workers 4] [--limit N]
+                                                            [--checkpoint PATH] [--restart]
 """
 
+import argparse
+import asyncio
 import logging
 from datetime import datetime, timedelta, timezone
 
-from notion_client import Client
-from config import NOTION_TOKEN, NOTION_PRODUCTS_DB_ID, NOTION_PAYMENTS_DB_ID
-from bot.utils.product_codes import type_to_slug
+from config import NOTION_PAYMENTS_DB_ID
+from bot.database.products_index import products_index
+from bot.database.records import decode_payment
+from bot.database.schema_registry import schema_registry
+from bot.services import notion_gateway
+from bot.services.backfill_engine import BackfillJob, run_backfill
+from bot.services.notion_scheduler import Priority
 
 log = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
-client = Client(auth=NOTION_TOKEN) if NOTION_TOKEN else None
+# Массовая задача: все запросы идут с низшим приоритетом планировщика
+BULK = Priority.BULK
 
 PRODUCT_NAME_PROP = "Product Name"
 EXPIRES_AT_PROP = "Expires at"
+DEFAULT_CHECKPOINT = "backfill_payment_fast_fields.checkpoint"
 
 def _safe_id(v):
     return v and isinstance(v, str)
@@ -32,107 +43,83 @@ def _iso_to_dt(s: str):
     except Exception:
         return None
 
-def _ensure_fast_fields_exist():
+async def _ensure_fast_fields_exist():
     try:
-        db = client.databases.retrieve(NOTION_PAYMENTS_DB_ID)
-        props = db.get("properties", {}) or {}
-        need_update = {}
-        if PRODUCT_NAME_PROP not in props:
-            need_update[PRODUCT_NAME_PROP] = {"rich_text": {}}
-        if EXPIRES_AT_PROP not in props:
-            need_update[EXPIRES_AT_PROP] = {"date": {}}
-        if need_update:
-            client.databases.update(NOTION_PAYMENTS_DB_ID, properties=need_update)
-            log.info("Added missing properties to Payments DB: %s", ", ".join(need_update.keys()))
+        await schema_registry.ensure_properties(NOTION_PAYMENTS_DB_ID, {
+            PRODUCT_NAME_PROP: {"rich_text": {}},
+            EXPIRES_AT_PROP: {"date": {}},
+        }, priority=BULK)
     except Exception as e:
         log.warning("Failed to ensure fast fields exist: %s", e)
 
-def _get_product_page_by_slug(slug: str):
-    if not _safe_id(NOTION_PRODUCTS_DB_ID) or not slug or client is None:
-        return None
-    try:
-        r = client.databases.query(
-            database_id=NOTION_PRODUCTS_DB_ID,
-            filter={"property": "Slug/Code", "rich_text": {"equals": slug}}
-        )
-        if r["results"]:
-            return r["results"][0]
-    except Exception as e:
-        log.warning("Products query failed for slug %s: %s", slug, e)
-    return None
-
-def _set_payment_fast_fields(payment_page_id: str, *, product_name: str|None, expires_at_iso: str|None):
-    props = {}
-    if product_name:
-        props[PRODUCT_NAME_PROP] = {"rich_text": [{"text": {"content": product_name}}]}
-    if expires_at_iso:
-        props[EXPIRES_AT_PROP] = {"date": {"start": expires_at_iso}}
-    if not props:
-        return
-    client.pages.update(page_id=payment_page_id, properties=props)
-
-def main():
-    if not _safe_id(NOTION_PAYMENTS_DB_ID) or client is None:
-        print("Notion not configured")
-        return
-
-    _ensure_fast_fields_exist()
-
-    # Берём только paid-платежи, где Product Name пуст
-    res = client.databases.query(
+async def compute_fast_fields(row: dict) -> dict:
+    """Патч быстрых полей для одной строки Payments (пустой — нечего писать)."""
+    payment = decode_payment(row)
+
+    # product: из relation Products или по slug из Type — всё из каталога products_index
+    product = None
+    if payment.products:
+        product = await products_index.lookup_page(payment.products[0], priority=BULK)
+    if not product:
+        product = await products_index.resolve(payment_type=payment.type, priority=BULK)
+    if not product:
+        return {}
+
+    patch = {}
+    if product.name:
+        patch[PRODUCT_NAME_PROP] = {"rich_text": [{"text": {"content": product.name}}]}
+    paid_at = _iso_to_dt(payment.processed_at)
+    if paid_at and paid_at.tzinfo is None:
+        paid_at = paid_at.replace(tzinfo=timezone.utc)
+    if product.access_days and paid_at:
+        patch[EXPIRES_AT_PROP] = {"date": {"start": (paid_at + timedelta(days=int(product.access_days))).isoformat()}}
+    return patch
+
+def fast_fields_job() -> BackfillJob:
+    # Только paid-платежи, где Product Name пуст
+    return BackfillJob(
+        name="payment_fast_fields",
         database_id=NOTION_PAYMENTS_DB_ID,
+        compute=compute_fast_fields,
         filter={"and": [
             {"property": "Status", "select": {"equals": "paid"}},
             {"property": PRODUCT_NAME_PROP, "rich_text": {"is_empty": True}},
         ]},
-        page_size=100,
     )
-    print(f"Found {len(res.get('results', []))} payments to backfill")
-
-    for row in res.get("results", []):
-        props = row.get("properties", {})
-        pid = row["id"]
-
-        # product_page: из relation Products или по slug из Type
-        product_page = None
-        rel = props.get("Products", {}).get("relation", [])
-        if rel:
-            rid = rel[0].get("id")
-            if rid:
-                product_page = client.pages.retrieve(rid)
-        if not product_page:
-            type_val = None
-            t = props.get("Type")
-            if isinstance(t, dict):
-                if t.get("select"):
-                    type_val = t["select"]["name"]
-                elif t.get("rich_text"):
-                    type_val = "".join([s.get("plain_text") or s.get("text", {}).get("content", "") for s in t["rich_text"]]).strip()
-            slug = type_to_slug(type_val or "")
-            if slug:
-                product_page = _get_product_page_by_slug(slug)
-
-        product_name = None
-        expires_iso = None
-        if product_page:
-            try:
-                product_name = product_page["properties"]["Name"]["title"][0]["plain_text"]
-            except Exception:
-                pass
-            access_days = product_page["properties"].get("Access days", {}).get("number")
-            paid_at = None
-            try:
-                paid_at = props.get("Processed at", {}).get("date", {}).get("start")
-                paid_at = _iso_to_dt(paid_at)
-                if paid_at and paid_at.tzinfo is None:
-                    paid_at = paid_at.replace(tzinfo=timezone.utc)
-            except Exception:
-                paid_at = None
-            if access_days and paid_at:
-                expires_iso = (paid_at + timedelta(days=int(access_days))).isoformat()
-
-        _set_payment_fast_fields(pid, product_name=product_name, expires_at_iso=expires_iso)
-        print(f"Updated {pid}: name={product_name}, expires={expires_iso}")
+
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill Product Name / Expires at on paid Payments")
+    parser.add_argument("--dry-run", action="store_true", help="посчитать и показать патчи, ничего не записывая")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--restart", action="store_true", help="игнорировать чекпоинт и начать сначала")
+    args = parser.parse_args(argv)
+
+    if not _safe_id(NOTION_PAYMENTS_DB_ID) or not notion_gateway.is_configured():
+        print("Notion not configured")
+        return
+
+    if not args.dry_run:
+        await _ensure_fast_fields_exist()
+    # Каталог продуктов грузим один раз — дальше никаких запросов в Products
+    await products_index.load_all()
+
+    report = await run_backfill(
+        fast_fields_job(),
+        workers=args.workers,
+        dry_run=args.dry_run,
+        checkpoint_path=args.checkpoint,
+        resume=not args.restart,
+        limit=args.limit,
+    )
+    print(f"Done: {report.line()}")
+
+async def _run():
+    try:
+        await main()
+    finally:
+        await notion_gateway.aclose()
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(_run())
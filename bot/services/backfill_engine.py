@@ -0,0 +1,152 @@
+# bot/services/backfill_engine.py
+"""
+Движок массового обслуживания БД Notion (бэкфилл денормализованных полей).
+
+Job описывает что делать: какую выборку читать (database_id + filter) и как по строке
+посчитать патч свойств (compute). Движок:
+  - стримит выборку постранично (notion_gateway.iter_query) с приоритетом BULK;
+  - обрабатывает строки пулом из N воркеров; общий темп всё равно держит
+    планировщик Notion, так что интерактивные запросы бота не страдают;
+  - пишет чекпоинт (append-only файл с id обработанных строк) — повторный запуск
+    пропускает уже сделанное;
+  - dry_run: считает патчи и логирует их, ничего не записывая;
+  - периодически пишет в лог прогресс и скорость.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from bot.services import notion_gateway
+from bot.services.notion_scheduler import Priority
+
+log = logging.getLogger(__name__)
+
+Row = Dict[str, Any]
+
+
+@dataclass
+class BackfillJob:
+    name: str
+    database_id: str
+    compute: Callable[[Row], Awaitable[Optional[Dict[str, Any]]]]  # None/{} — строку пропустить
+    filter: Optional[Dict[str, Any]] = None
+    sorts: List[Dict[str, Any]] = field(
+        default_factory=lambda: [{"timestamp": "created_time", "direction": "ascending"}]
+    )
+
+
+@dataclass
+class BackfillReport:
+    seen: int = 0
+    skipped_done: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    failed: int = 0
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    @property
+    def rate(self) -> float:
+        return (self.updated + self.unchanged + self.failed) / self.elapsed if self.elapsed > 0 else 0.0
+
+    def line(self) -> str:
+        return (
+            f"seen={self.seen} updated={self.updated} unchanged={self.unchanged} failed={self.failed} "
+            f"skipped_done={self.skipped_done} elapsed={self.elapsed:.1f}s rate={self.rate:.2f} rows/s"
+        )
+
+
+class Checkpoint:
+    """id обработанных строк, по одному в строке файла. path=None — без чекпоинта."""
+
+    def __init__(self, path: Optional[str]) -> None:
+        self.path = path
+        self.done: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.done = {line.strip() for line in f if line.strip()}
+
+    def mark(self, row_id: str) -> None:
+        self.done.add(row_id)
+        if self.path:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(row_id + "\n")
+
+    def reset(self) -> None:
+        self.done.clear()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+async def run_backfill(
+    job: BackfillJob,
+    *,
+    workers: int = 4,
+    dry_run: bool = False,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = True,
+    limit: Optional[int] = None,
+    progress_every_sec: float = 5.0,
+) -> BackfillReport:
+    report = BackfillReport()
+    checkpoint = Checkpoint(None if dry_run else checkpoint_path)
+    if not resume:
+        checkpoint.reset()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, workers) * 2)
+
+    async def worker() -> None:
+        while True:
+            row = await queue.get()
+            if row is None:
+                return
+            rid = row["id"]
+            try:
+                patch = await job.compute(row)
+                if not patch:
+                    report.unchanged += 1
+                elif dry_run:
+                    report.updated += 1
+                    log.info("[dry-run] %s %s: %s", job.name, rid, patch)
+                else:
+                    await notion_gateway.update_page(page_id=rid, properties=patch, priority=Priority.BULK)
+                    report.updated += 1
+                checkpoint.mark(rid)
+            except Exception as e:
+                report.failed += 1
+                log.warning("%s: row %s failed: %s", job.name, rid, e)
+
+    async def progress() -> None:
+        while True:
+            await asyncio.sleep(progress_every_sec)
+            log.info("%s: %s", job.name, report.line())
+
+    query: Dict[str, Any] = {"sorts": job.sorts}
+    if job.filter:
+        query["filter"] = job.filter
+
+    pool = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
+    ticker = asyncio.create_task(progress())
+    try:
+        async for row in notion_gateway.iter_query(job.database_id, limit=limit, priority=Priority.BULK, **query):
+            report.seen += 1
+            if row["id"] in checkpoint.done:
+                report.skipped_done += 1
+                continue
+            await queue.put(row)
+        for _ in pool:
+            await queue.put(None)
+        await asyncio.gather(*pool)
+    finally:
+        ticker.cancel()
+        for t in pool:
+            t.cancel()
+    log.info("%s finished%s: %s", job.name, " (dry-run)" if dry_run else "", report.line())
+    return report
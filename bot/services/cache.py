@@ -1,14 +1,31 @@
 
+import asyncio
+import logging
 import time
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from bot.services.cache_registry import age_stats
+
+log = logging.getLogger(__name__)
 
 class TTLCache:
     """
     Very small in-memory TTL cache. Not thread-safe (simple use in single-process bot).
+
+    ttl_seconds — hard TTL: older entries are gone, get_or_load() waits for the loader.
+    soft_ttl_seconds — stale-while-revalidate: past it get_or_load() returns the stale
+    value immediately and starts one background refresh per key.
     """
-    def __init__(self, ttl_seconds: int = 300) -> None:
+    def __init__(self, ttl_seconds: int = 300, soft_ttl_seconds: Optional[int] = None) -> None:
         self.ttl = ttl_seconds
+        self.soft_ttl = soft_ttl_seconds if soft_ttl_seconds is not None else ttl_seconds
         self._data: Dict[str, Tuple[float, Any]] = {}
+        self._refreshing: Dict[str, asyncio.Task] = {}
+        self._stats: Dict[str, float] = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0,
+            "refreshes": 0, "refresh_errors": 0,
+            "last_refresh_ms": 0.0, "max_refresh_ms": 0.0, "total_refresh_ms": 0.0,
+        }
 
     def set(self, key: str, value: Any) -> None:
         self._data[key] = (time.time(), value)
@@ -20,20 +37,80 @@ class TTLCache:
         ts, val = item
         if time.time() - ts > self.ttl:
             self._data.pop(key, None)
+            self._stats["evictions"] += 1
             return None
         return val
 
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
     def clear(self) -> None:
         self._data.clear()
 
+    # ---------- stale-while-revalidate ----------
+    async def _refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        t0 = time.monotonic()
+        try:
+            value = await loader()
+        except Exception:
+            self._stats["refresh_errors"] += 1
+            raise
+        ms = (time.monotonic() - t0) * 1000
+        self._stats["refreshes"] += 1
+        self._stats["last_refresh_ms"] = round(ms, 1)
+        self._stats["max_refresh_ms"] = round(max(self._stats["max_refresh_ms"], ms), 1)
+        self._stats["total_refresh_ms"] += ms
+        self.set(key, value)
+        return value
+
+    def _start_refresh(self, key: str, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._refreshing.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(key, loader))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda t, k=key: self._on_refreshed(k, t))
+        return task
+
+    def _on_refreshed(self, key: str, task: asyncio.Task) -> None:
+        self._refreshing.pop(key, None)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("TTLCache: refresh of %s failed: %s", key, task.exception())
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Fresh value -> as is; soft-stale -> stale value now + one background refresh;
+        missing / hard-expired -> wait for the (single, shared) load.
+        """
+        item = self._data.get(key)
+        if item:
+            ts, val = item
+            age = time.time() - ts
+            if age <= self.soft_ttl:
+                self._stats["hits"] += 1
+                return val
+            if age <= self.ttl:
+                self._stats["stale_hits"] += 1
+                self._start_refresh(key, loader)
+                return val
+            self._data.pop(key, None)
+            self._stats["evictions"] += 1
+        self._stats["misses"] += 1
+        return await asyncio.shield(self._start_refresh(key, loader))
+
     def info(self) -> Dict[str, Any]:
-        # returns counts and age stats (lightweight)
+        # returns counts and age stats (lightweight); поля — как в cache_registry.STANDARD_FIELDS
         now = time.time()
-        ages = []
-        for ts, _ in self._data.values():
-            ages.append(now - ts)
+        refreshes = self._stats["refreshes"]
         return {
-            "keys": len(self._data),
-            "max_age_sec": max(ages) if ages else 0.0,
-            "min_age_sec": min(ages) if ages else 0.0,
+            "entries": len(self._data),
+            **age_stats(now - ts for ts, _ in self._data.values()),
+            "refreshing": len(self._refreshing),
+            **{k: v for k, v in self._stats.items() if k not in ("total_refresh_ms", "last_refresh_ms", "max_refresh_ms")},
+            "refresh_last_ms": self._stats["last_refresh_ms"],
+            "refresh_max_ms": self._stats["max_refresh_ms"],
+            "refresh_avg_ms": round(self._stats["total_refresh_ms"] / refreshes, 1) if refreshes else 0.0,
         }
+
+    def root(self) -> Dict[str, Tuple[float, Any]]:
+        """Данные кэша — для оценки памяти в cache_registry."""
+        return self._data
@@ -0,0 +1,160 @@
+# bot/services/cache_registry.py
+"""
+Единая точка наблюдения за кэшами бота.
+
+Каждый кэш регистрируется под именем: info() отдаёт его собственную статистику,
+root() (необязательно) — корневой объект данных для оценки занимаемой памяти.
+Снимок приводит всё к общим полям (STANDARD_FIELDS), которых у кэша нет — None:
+
+    entries, hits, misses, evictions, approx_bytes,
+    age_min_sec, age_p50_sec, age_max_sec, refresh_avg_ms, refresh_max_ms
+
+Снимок доступен админу (/diag_cache) и периодически пишется в лог событием
+cache_snapshot (log_action) — по этим данным подбираются TTL.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from bot.services.actions import log_action
+
+log = logging.getLogger(__name__)
+
+STANDARD_FIELDS = (
+    "entries", "hits", "misses", "evictions", "approx_bytes",
+    "age_min_sec", "age_p50_sec", "age_max_sec", "refresh_avg_ms", "refresh_max_ms",
+)
+
+SNAPSHOT_SEC = float(os.getenv("CACHE_SNAPSHOT_SEC", "900") or 900)
+
+SIZE_SAMPLE = 200
+
+
+def age_stats(ages: Iterable[float]) -> Dict[str, Optional[float]]:
+    """min / медиана / max возраста записей в секундах."""
+    vals = sorted(ages)
+    if not vals:
+        return {"age_min_sec": None, "age_p50_sec": None, "age_max_sec": None}
+    return {
+        "age_min_sec": round(vals[0], 1),
+        "age_p50_sec": round(vals[len(vals) // 2], 1),
+        "age_max_sec": round(vals[-1], 1),
+    }
+
+
+def _sizeof(obj: Any, seen: set) -> int:
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (str, bytes, int, float, bool)) or obj is None:
+        return size
+    if isinstance(obj, dict):
+        items = list(obj.items())
+        sample = items[:SIZE_SAMPLE]
+        part = sum(_sizeof(k, seen) + _sizeof(v, seen) for k, v in sample)
+        return size + (part * len(items) // len(sample) if sample else 0)
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        items = list(obj)
+        sample = items[:SIZE_SAMPLE]
+        part = sum(_sizeof(v, seen) for v in sample)
+        return size + (part * len(items) // len(sample) if sample else 0)
+    if hasattr(obj, "__dict__"):
+        size += _sizeof(vars(obj), seen)
+    for slot in getattr(type(obj), "__slots__", ()):
+        if hasattr(obj, slot):
+            size += _sizeof(getattr(obj, slot), seen)
+    return size
+
+
+def approx_size(obj: Any) -> int:
+    """
+    Грубая оценка памяти (байт): рекурсивный sys.getsizeof; у больших коллекций
+    меряются первые SIZE_SAMPLE элементов и результат экстраполируется.
+    """
+    try:
+        return _sizeof(obj, set())
+    except Exception:
+        return 0
+
+
+class CacheRegistry:
+    def __init__(self) -> None:
+        self._caches: Dict[str, Dict[str, Any]] = {}
+
+    def register(
+        self,
+        name: str,
+        info: Callable[[], Dict[str, Any]],
+        root: Optional[Callable[[], Any]] = None,
+    ) -> None:
+        self._caches[name] = {"info": info, "root": root}
+
+    def unregister(self, name: str) -> None:
+        self._caches.pop(name, None)
+
+    def names(self) -> List[str]:
+        return sorted(self._caches)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        out: Dict[str, Dict[str, Any]] = {}
+        for name in self.names():
+            entry = self._caches[name]
+            try:
+                raw = dict(entry["info"]() or {})
+            except Exception as e:
+                out[name] = {"error": str(e)}
+                continue
+            if entry["root"] is not None:
+                raw["approx_bytes"] = approx_size(entry["root"]())
+            snap = {k: raw.get(k) for k in STANDARD_FIELDS}
+            snap["extra"] = {k: v for k, v in raw.items() if k not in STANDARD_FIELDS}
+            out[name] = snap
+        return out
+
+    def format_text(self, snapshot: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+        snapshot = snapshot if snapshot is not None else self.snapshot()
+        if not snapshot:
+            return "🧠 Кэши не зарегистрированы."
+
+        def fmt(v: Any) -> str:
+            return "-" if v is None else str(v)
+
+        lines = ["🧠 Caches"]
+        for name, s in snapshot.items():
+            if "error" in s:
+                lines.append(f"• {name}: error {s['error']}")
+                continue
+            kb = s.get("approx_bytes")
+            lines.append(
+                f"• {name}: n={fmt(s.get('entries'))} ~{fmt(round(kb / 1024, 1) if kb is not None else None)}KB "
+                f"hit={fmt(s.get('hits'))} miss={fmt(s.get('misses'))} evict={fmt(s.get('evictions'))}\n"
+                f"  age {fmt(s.get('age_min_sec'))}/{fmt(s.get('age_p50_sec'))}/{fmt(s.get('age_max_sec'))}s "
+                f"refresh avg={fmt(s.get('refresh_avg_ms'))} max={fmt(s.get('refresh_max_ms'))}ms"
+            )
+        return "\n".join(lines)
+
+    def log_snapshot(self) -> Dict[str, Dict[str, Any]]:
+        snap = self.snapshot()
+        log_action("cache_snapshot", ts=int(time.time()), caches=snap)
+        return snap
+
+    async def run_snapshot_loop(self, interval_sec: Optional[float] = None) -> None:
+        """Фоновая задача: снимок всех кэшей в лог раз в CACHE_SNAPSHOT_SEC (0 — выключено)."""
+        interval = SNAPSHOT_SEC if interval_sec is None else interval_sec
+        if interval <= 0:
+            return
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.log_snapshot()
+            except Exception as e:
+                log.warning("cache snapshot failed: %s", e)
+
+
+cache_registry = CacheRegistry()
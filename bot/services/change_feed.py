@@ -0,0 +1,206 @@
+# bot/services/change_feed.py
+"""
+Единый change-feed по всем базам Notion, которые бот держит в памяти.
+
+Раз в CHANGE_FEED_INTERVAL_SEC для каждого источника выполняется один запрос
+databases.query с фильтром last_edited_time >= watermark (сортировка по возрастанию);
+каждая изменённая страница передаётся в apply() источника — индекс обновляется
+точечно, без перезагрузки целиком. Раз в full_reload_sec (и если источник ещё не
+загружен) вызывается reload() — полный перескан, чтобы подхватить удалённые/архивные
+страницы.
+
+last_edited_time в Notion округляется до минуты, поэтому watermark держится с
+перекрытием. Страница на границе (тот же id и то же время) повторно не применяется,
+только если не изменилось и её содержимое: вторая правка той же страницы в ту же
+минуту приходит с тем же last_edited_time и должна быть применена.
+
+Метрики по источнику (stats()): сколько изменений применено, lag_sec — задержка
+между правкой в Notion и её применением, staleness_sec — сколько прошло с
+последнего успешного опроса.
+
+Запуск: start(application) — через JobQueue PTB, если она установлена
+(python-telegram-bot[job-queue]), иначе фоновой задачей приложения.
+
+Настройки (env):
+  CHANGE_FEED_INTERVAL_SEC — период опроса (по умолчанию 60)
+  CHANGE_FEED_FULL_RELOAD_SEC — период полной перезагрузки (по умолчанию 3600)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from bot.services import notion_gateway
+from bot.services.notion_scheduler import Priority
+
+log = logging.getLogger(__name__)
+
+INTERVAL_SEC = float(os.getenv("CHANGE_FEED_INTERVAL_SEC", "60") or 60)
+FULL_RELOAD_SEC = float(os.getenv("CHANGE_FEED_FULL_RELOAD_SEC", "3600") or 3600)
+OVERLAP_SEC = 60.0
+
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _fingerprint(page: Dict[str, Any]) -> int:
+    return hash(json.dumps(
+        [page.get("archived"), page.get("in_trash"), page.get("properties")],
+        sort_keys=True, ensure_ascii=False, default=str,
+    ))
+
+
+def _ts(iso: str) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(iso.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+
+@dataclass
+class FeedSource:
+    name: str
+    db_id: Callable[[], Optional[str]]
+    apply: Callable[[Dict[str, Any]], Any]
+    reload: Callable[[], Awaitable[int]]
+    ready: Callable[[], bool] = lambda: True
+    full_reload_sec: float = FULL_RELOAD_SEC
+    # состояние фида
+    watermark: Optional[str] = None
+    # страницы с last_edited_time == watermark: id -> отпечаток применённого содержимого
+    boundary: Dict[str, int] = field(default_factory=dict)
+    reloaded_at: Optional[float] = None
+    stats: Dict[str, Any] = field(default_factory=lambda: {
+        "polls": 0, "changes": 0, "reloads": 0, "errors": 0,
+        "last_changes": 0, "lag_sec": None, "last_poll_at": None, "poll_ms": None,
+    })
+
+
+class ChangeFeed:
+    def __init__(self) -> None:
+        self._sources: Dict[str, FeedSource] = {}
+        self._lock = asyncio.Lock()
+
+    def register(self, source: FeedSource) -> None:
+        self._sources[source.name] = source
+
+    def prime(self, loaded_at: float) -> None:
+        """Источники уже загружены (прогрев при старте) — дельты начинаем с loaded_at."""
+        for src in self._sources.values():
+            if src.watermark is None and src.ready():
+                src.watermark = _iso(loaded_at - OVERLAP_SEC)
+                src.reloaded_at = loaded_at
+
+    def resume(self, name: str, watermark: Optional[str]) -> None:
+        """Источник поднят из локального хранилища — дельты продолжаем с его watermark."""
+        src = self._sources.get(name)
+        if src is None or not watermark:
+            return
+        src.watermark, src.boundary = watermark, {}
+        src.reloaded_at = time.time()
+
+    async def _reload(self, src: FeedSource) -> None:
+        started = time.time()
+        await src.reload()
+        src.watermark = _iso(started - OVERLAP_SEC)
+        src.boundary = {}
+        src.reloaded_at = started
+        src.stats["reloads"] += 1
+
+    async def poll_source(self, src: FeedSource) -> int:
+        db_id = src.db_id()
+        if not db_id or not notion_gateway.is_configured():
+            return 0
+        t0 = time.monotonic()
+        try:
+            if (
+                src.watermark is None
+                or not src.ready()
+                or (src.reloaded_at and time.time() - src.reloaded_at > src.full_reload_sec)
+            ):
+                await self._reload(src)
+                return 0
+            changed = 0
+            newest: Optional[str] = None
+            async for page in notion_gateway.iter_query(
+                db_id,
+                filter={"timestamp": "last_edited_time", "last_edited_time": {"on_or_after": src.watermark}},
+                sorts=[{"timestamp": "last_edited_time", "direction": "ascending"}],
+                priority=Priority.BACKGROUND,
+            ):
+                edited = page.get("last_edited_time") or ""
+                fp = _fingerprint(page)
+                if edited == src.watermark and src.boundary.get(page.get("id")) == fp:
+                    continue
+                src.apply(page)
+                changed += 1
+                if edited and (newest is None or edited > newest):
+                    newest = edited
+                if edited > (src.watermark or ""):
+                    src.watermark, src.boundary = edited, {}
+                if edited == src.watermark:
+                    src.boundary[page.get("id")] = fp
+            src.stats["changes"] += changed
+            src.stats["last_changes"] = changed
+            if newest:
+                ts = _ts(newest)
+                src.stats["lag_sec"] = round(time.time() - ts, 1) if ts else None
+            if changed:
+                log.info("change_feed: %s: applied %s changes", src.name, changed)
+            return changed
+        except Exception as e:
+            src.stats["errors"] += 1
+            log.warning("change_feed: %s: poll failed: %s", src.name, e)
+            return 0
+        finally:
+            src.stats["polls"] += 1
+            src.stats["last_poll_at"] = time.time()
+            src.stats["poll_ms"] = round((time.monotonic() - t0) * 1000, 1)
+
+    async def poll_once(self) -> int:
+        async with self._lock:
+            total = 0
+            for src in list(self._sources.values()):
+                total += await self.poll_source(src)
+            return total
+
+    async def run_forever(self, interval: float = INTERVAL_SEC) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.poll_once()
+
+    def start(self, application: Any, interval: float = INTERVAL_SEC) -> Optional[asyncio.Task]:
+        """Запустить опрос: через JobQueue, если она есть, иначе — задачей, которую
+        вызывающий отменяет сам (Application.stop() ждёт задачи application.create_task)."""
+        job_queue = getattr(application, "job_queue", None)
+        if job_queue is not None:
+            async def _job(_context) -> None:
+                await self.poll_once()
+            job_queue.run_repeating(_job, interval=interval, first=interval, name="notion_change_feed")
+            return None
+        return asyncio.create_task(self.run_forever(interval), name="notion_change_feed")
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, src in self._sources.items():
+            last = src.stats["last_poll_at"]
+            out[name] = {
+                **src.stats,
+                "watermark": src.watermark,
+                "staleness_sec": round(now - last, 1) if last else None,
+            }
+        return out
+
+    def names(self) -> List[str]:
+        return list(self._sources)
+
+
+change_feed = ChangeFeed()
@@ -0,0 +1,483 @@
+# bot/services/notion_emulator.py
+"""
+Локальный эмулятор Notion API (в памяти) для офлайн-тестов и замеров латентности.
+
+Два режима:
+  1) drop-in клиент — настоящий notion_client.AsyncClient поверх httpx-транспорта
+     эмулятора (ошибки, Retry-After и разбор ответов — как с живым Notion):
+         emu = NotionEmulator(latency_ms=200, jitter_ms=100, rate_limit_prob=0.05)
+         emu.install_bot_schema({"NOTION_USERS_DB_ID": "users", ...})
+         notion_gateway.set_client(emu.client())
+  2) локальный HTTP-сервер:
+         python -m bot.services.notion_emulator --port 8787 --latency-ms 250 --rate-limit-prob 0.05
+     и в .env бота: NOTION_BASE_URL=http://127.0.0.1:8787, NOTION_TOKEN=<любой>.
+
+Реализовано то, чем пользуется бот: databases.query (фильтры and/or, number.equals,
+select.equals, rich_text/title/email equals/contains/is_empty/is_not_empty,
+relation.contains, checkbox.equals, timestamp last_edited_time/created_time;
+sorts по свойству и timestamp; курсорная пагинация), databases.retrieve/update,
+pages.create/retrieve/update.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+Response = Tuple[int, Dict[str, str], Dict[str, Any]]
+
+# Схемы баз бота: ключ — env-переменная с ID БД, значение — имя свойства -> тип
+BOT_SCHEMAS: Dict[str, Dict[str, str]] = {
+    "NOTION_USERS_DB_ID": {
+        "Name": "title", "Telegram ID": "number", "Username": "rich_text", "Email": "email",
+        "Registration Date": "date", "Status": "select", "Language": "select", "Local ID": "rich_text",
+    },
+    "NOTION_PRODUCTS_DB_ID": {
+        "Name": "title", "Slug/Code": "rich_text", "Access mode": "select", "Access days": "number",
+        "Resource ref": "rich_text", "Active": "checkbox",
+    },
+    "NOTION_PAYMENTS_DB_ID": {
+        "Name": "title", "Telegram ID": "number", "Status": "select", "Type": "rich_text",
+        "Proof TG file_id": "rich_text", "Idempotency": "rich_text", "Amount": "rich_text",
+        "Currency": "rich_text", "Admin": "rich_text", "Processed at": "date",
+        "User": "relation", "Product": "relation", "Products": "relation", "Linked Purchase": "relation",
+        "Product Name": "rich_text", "Expires at": "date", "Local ID": "rich_text",
+    },
+    "NOTION_PURCHASES_DB_ID": {
+        "Name": "title", "Status": "select", "Paid at": "date", "Expires at": "date",
+        "User": "relation", "Product": "relation", "Payment": "relation", "Local ID": "rich_text",
+    },
+    "NOTION_DESCRIPTIONS_DB_ID": {
+        "Name": "title", "Slug/Code": "rich_text", "Language": "select", "Status": "select",
+        "Short": "rich_text", "Full": "rich_text",
+    },
+    "NOTION_PAYMENT_METHODS_DB_ID": {
+        "Name": "title", "Code": "rich_text", "Active": "checkbox", "Order": "number",
+        "Currency": "select", "Button RU": "rich_text", "Button EN": "rich_text",
+        "Details Slug": "rich_text", "Rate per 1 EUR": "number", "Round to": "number",
+    },
+}
+
+_TEXT_TYPES = ("title", "rich_text")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _norm_id(v: str) -> str:
+    return (v or "").replace("-", "").lower()
+
+
+def _rich(items) -> List[Dict[str, Any]]:
+    out = []
+    for r in items or []:
+        content = r.get("plain_text") or (r.get("text") or {}).get("content", "")
+        out.append({"type": "text", "text": {"content": content, "link": None}, "plain_text": content, "href": None})
+    return out
+
+
+def _plain(items) -> str:
+    return "".join(r.get("plain_text", "") for r in items or [])
+
+
+class _ApiError(Exception):
+    def __init__(self, status: int, code: str, message: str, headers: Optional[Dict[str, str]] = None) -> None:
+        super().__init__(message)
+        self.status, self.code, self.message, self.headers = status, code, message, headers or {}
+
+
+class NotionEmulator:
+    def __init__(
+        self,
+        *,
+        latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        rate_limit_prob: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after_sec: float = 1.0,
+        seed: Optional[int] = None,
+    ) -> None:
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_limit_prob = rate_limit_prob
+        self.rate_limit_every = rate_limit_every
+        self.retry_after_sec = retry_after_sec
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._dbs: Dict[str, Dict[str, Any]] = {}     # norm id -> database object
+        self._pages: Dict[str, Dict[str, Any]] = {}   # norm id -> page object
+        self._calls = 0
+        self.stats: Dict[str, int] = {"calls": 0, "rate_limited": 0}
+
+    # ---------- наполнение ----------
+    def add_database(self, db_id: str, schema: Dict[str, str], title: str = "") -> Dict[str, Any]:
+        db = {
+            "object": "database",
+            "id": db_id,
+            "title": [{"type": "text", "plain_text": title or db_id, "text": {"content": title or db_id}}],
+            "created_time": _now_iso(),
+            "last_edited_time": _now_iso(),
+            "properties": {name: {"id": name, "name": name, "type": kind, kind: {}} for name, kind in schema.items()},
+        }
+        with self._lock:
+            self._dbs[_norm_id(db_id)] = db
+        return db
+
+    def install_bot_schema(self, ids: Dict[str, str]) -> None:
+        """ids: env-ключ (NOTION_USERS_DB_ID, ...) -> id базы в эмуляторе."""
+        for env_key, db_id in ids.items():
+            if env_key in BOT_SCHEMAS and db_id:
+                self.add_database(db_id, BOT_SCHEMAS[env_key], title=env_key)
+
+    def seed_page(self, db_id: str, properties: Dict[str, Any], page_id: Optional[str] = None) -> Dict[str, Any]:
+        """Добавить страницу (properties — в формате запроса pages.create)."""
+        with self._lock:
+            return self._create_page({"parent": {"database_id": db_id}, "properties": properties}, page_id=page_id)
+
+    def pages(self, db_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [copy.deepcopy(p) for p in self._pages.values()
+                    if db_id is None or _norm_id(p["parent"]["database_id"]) == _norm_id(db_id)]
+
+    # ---------- свойства ----------
+    def _db(self, db_id: str) -> Dict[str, Any]:
+        db = self._dbs.get(_norm_id(db_id))
+        if db is None:
+            raise _ApiError(404, "object_not_found", f"Could not find database with ID: {db_id}.")
+        return db
+
+    def _page(self, page_id: str) -> Dict[str, Any]:
+        page = self._pages.get(_norm_id(page_id))
+        if page is None:
+            raise _ApiError(404, "object_not_found", f"Could not find page with ID: {page_id}.")
+        return page
+
+    def _to_stored(self, db: Dict[str, Any], name: str, value: Dict[str, Any]) -> Dict[str, Any]:
+        spec = db["properties"].get(name)
+        if spec is None:
+            raise _ApiError(400, "validation_error", f"{name} is not a property that exists.")
+        kind = spec["type"]
+        if kind not in value:
+            raise _ApiError(400, "validation_error", f"{name} is expected to be {kind}.")
+        raw = value[kind]
+        if kind in _TEXT_TYPES:
+            raw = _rich(raw)
+        elif kind == "relation":
+            raw = [{"id": r["id"]} for r in raw or []]
+        elif kind == "select":
+            raw = {"name": raw["name"]} if raw else None
+        elif kind == "date":
+            raw = {"start": raw.get("start"), "end": raw.get("end"), "time_zone": None} if raw else None
+        return {"id": spec["id"], "type": kind, kind: raw}
+
+    def _empty(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        kind = spec["type"]
+        empty: Any = [] if kind in _TEXT_TYPES or kind == "relation" else (False if kind == "checkbox" else None)
+        return {"id": spec["id"], "type": kind, kind: empty}
+
+    # ---------- операции ----------
+    def _create_page(self, body: Dict[str, Any], page_id: Optional[str] = None) -> Dict[str, Any]:
+        parent_id = (body.get("parent") or {}).get("database_id")
+        db = self._db(parent_id)
+        props = {name: self._empty(spec) for name, spec in db["properties"].items()}
+        for name, value in (body.get("properties") or {}).items():
+            props[name] = self._to_stored(db, name, value)
+        pid = page_id or str(uuid.uuid4())
+        now = _now_iso()
+        page = {
+            "object": "page",
+            "id": pid,
+            "created_time": now,
+            "last_edited_time": now,
+            "archived": False,
+            "parent": {"type": "database_id", "database_id": db["id"]},
+            "properties": props,
+            "url": f"https://www.notion.so/{_norm_id(pid)}",
+        }
+        self._pages[_norm_id(pid)] = page
+        return page
+
+    def _update_page(self, page_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        page = self._page(page_id)
+        db = self._db(page["parent"]["database_id"])
+        updated = {name: self._to_stored(db, name, value) for name, value in (body.get("properties") or {}).items()}
+        page["properties"].update(updated)
+        if "archived" in body:
+            page["archived"] = bool(body["archived"])
+        page["last_edited_time"] = _now_iso()
+        return page
+
+    def _update_database(self, db_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        db = self._db(db_id)
+        for name, spec in (body.get("properties") or {}).items():
+            if spec is None:
+                db["properties"].pop(name, None)
+                continue
+            kind = next(iter(spec))
+            db["properties"][name] = {"id": name, "name": name, "type": kind, kind: {}}
+            for page in self._pages.values():
+                if _norm_id(page["parent"]["database_id"]) == _norm_id(db_id):
+                    page["properties"].setdefault(name, self._empty(db["properties"][name]))
+        db["last_edited_time"] = _now_iso()
+        return db
+
+    # ---------- фильтры и сортировки ----------
+    def _match(self, page: Dict[str, Any], flt: Optional[Dict[str, Any]]) -> bool:
+        if not flt:
+            return True
+        if "and" in flt:
+            return all(self._match(page, f) for f in flt["and"])
+        if "or" in flt:
+            return any(self._match(page, f) for f in flt["or"])
+        if "timestamp" in flt:
+            ts = flt["timestamp"]
+            return self._cmp_date(page.get(ts), flt.get(ts) or {})
+        prop = page["properties"].get(flt.get("property"))
+        if prop is None:
+            raise _ApiError(400, "validation_error", f"Could not find property with name or id: {flt.get('property')}")
+        kind = prop["type"]
+        cond = None
+        for key in ("number", "select", "rich_text", "title", "email", "relation", "checkbox", "date"):
+            if key in flt:
+                cond = (key, flt[key])
+                break
+        if cond is None:
+            raise _ApiError(400, "validation_error", f"Unsupported filter: {flt}")
+        key, ops = cond
+        value = prop.get(kind)
+        if key in _TEXT_TYPES or key == "email":
+            text = value if kind == "email" else _plain(value) if kind in _TEXT_TYPES else None
+            if kind not in (_TEXT_TYPES + ("email",)):
+                raise _ApiError(400, "validation_error", f"{flt['property']} is not a text property")
+            text = text or ""
+            if "equals" in ops:
+                return text == ops["equals"]
+            if "contains" in ops:
+                return ops["contains"] in text
+            if ops.get("is_empty"):
+                return text == ""
+            if ops.get("is_not_empty"):
+                return text != ""
+        if key != kind:
+            raise _ApiError(400, "validation_error", f"{flt['property']} is a {kind} property, filter uses {key}")
+        if key == "number":
+            return "equals" in ops and value == ops["equals"]
+        if key == "select":
+            name = (value or {}).get("name")
+            if "equals" in ops:
+                return name == ops["equals"]
+            if ops.get("is_empty"):
+                return name is None
+        if key == "relation":
+            ids = {_norm_id(r["id"]) for r in value or []}
+            if "contains" in ops:
+                return _norm_id(ops["contains"]) in ids
+            if ops.get("is_empty"):
+                return not ids
+        if key == "checkbox":
+            return bool(value) == bool(ops.get("equals"))
+        if key == "date":
+            return self._cmp_date((value or {}).get("start"), ops)
+        raise _ApiError(400, "validation_error", f"Unsupported filter: {flt}")
+
+    @staticmethod
+    def _cmp_date(actual: Optional[str], ops: Dict[str, Any]) -> bool:
+        if ops.get("is_empty"):
+            return not actual
+        if not actual:
+            return False
+        for op, fn in (("on_or_after", lambda a, b: a >= b), ("after", lambda a, b: a > b),
+                       ("on_or_before", lambda a, b: a <= b), ("before", lambda a, b: a < b),
+                       ("equals", lambda a, b: a == b)):
+            if op in ops:
+                return fn(_ts(actual), _ts(ops[op]))
+        return True
+
+    @staticmethod
+    def _sort_key(page: Dict[str, Any], sort: Dict[str, Any]):
+        if "timestamp" in sort:
+            return page.get(sort["timestamp"]) or ""
+        prop = page["properties"].get(sort.get("property")) or {}
+        kind = prop.get("type")
+        v = prop.get(kind)
+        if kind in _TEXT_TYPES:
+            return _plain(v)
+        if kind == "select":
+            return (v or {}).get("name") or ""
+        if kind == "date":
+            return (v or {}).get("start") or ""
+        return v if v is not None else float("-inf")
+
+    def _query(self, db_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        db = self._db(db_id)
+        rows = [p for p in self._pages.values()
+                if _norm_id(p["parent"]["database_id"]) == _norm_id(db["id"]) and not p.get("archived")]
+        rows = [p for p in rows if self._match(p, body.get("filter"))]
+        sorts = body.get("sorts") or [{"timestamp": "created_time", "direction": "descending"}]
+        for sort in reversed(sorts):
+            rows.sort(key=lambda p, s=sort: self._sort_key(p, s), reverse=sort.get("direction") == "descending")
+        size = max(1, min(100, int(body.get("page_size") or 100)))
+        start = int(body.get("start_cursor") or 0)
+        chunk = rows[start:start + size]
+        more = start + size < len(rows)
+        return {
+            "object": "list",
+            "results": chunk,
+            "next_cursor": str(start + size) if more else None,
+            "has_more": more,
+            "type": "page_or_database",
+            "page_or_database": {},
+        }
+
+    # ---------- маршрутизация ----------
+    def _maybe_rate_limit(self) -> None:
+        self._calls += 1
+        hit = (self.rate_limit_every and self._calls % self.rate_limit_every == 0) or (
+            self.rate_limit_prob and self._rng.random() < self.rate_limit_prob
+        )
+        if hit:
+            self.stats["rate_limited"] += 1
+            raise _ApiError(429, "rate_limited", "You have been rate limited. Please try again in a few minutes.",
+                            {"Retry-After": str(self.retry_after_sec)})
+
+    def delay_sec(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0
+        return max(0.0, self.latency_ms + jitter) / 1000.0
+
+    def handle(self, method: str, path: str, body: Optional[Dict[str, Any]]) -> Response:
+        """Обработать один запрос REST API Notion. path — например /v1/pages/<id>."""
+        body = body or {}
+        with self._lock:
+            self.stats["calls"] += 1
+            try:
+                self._maybe_rate_limit()
+                parts = [p for p in path.split("?")[0].split("/") if p]
+                if parts and parts[0] == "v1":
+                    parts = parts[1:]
+                result = self._route(method.upper(), parts, body)
+                return 200, {}, copy.deepcopy(result)
+            except _ApiError as e:
+                return e.status, e.headers, {"object": "error", "status": e.status, "code": e.code, "message": e.message}
+
+    def _route(self, method: str, parts: List[str], body: Dict[str, Any]) -> Dict[str, Any]:
+        if parts[:1] == ["databases"] and len(parts) >= 2:
+            if len(parts) == 3 and parts[2] == "query" and method == "POST":
+                return self._query(parts[1], body)
+            if len(parts) == 2 and method == "GET":
+                return self._db(parts[1])
+            if len(parts) == 2 and method == "PATCH":
+                return self._update_database(parts[1], body)
+        if parts[:1] == ["pages"]:
+            if len(parts) == 1 and method == "POST":
+                return self._create_page(body)
+            if len(parts) == 2 and method == "GET":
+                return self._page(parts[1])
+            if len(parts) == 2 and method == "PATCH":
+                return self._update_page(parts[1], body)
+        raise _ApiError(400, "invalid_request_url", f"Invalid request URL: {method} /{'/'.join(parts)}")
+
+    # ---------- drop-in клиент ----------
+    def transport(self) -> httpx.AsyncBaseTransport:
+        emu = self
+
+        class _Transport(httpx.AsyncBaseTransport):
+            async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+                delay = emu.delay_sec()
+                if delay:
+                    await asyncio.sleep(delay)
+                raw = await request.aread()
+                status, headers, payload = emu.handle(request.method, request.url.path, json.loads(raw) if raw else None)
+                return httpx.Response(status, headers=headers, json=payload, request=request)
+
+        return _Transport()
+
+    def client(self):
+        """notion_client.AsyncClient, работающий с этим эмулятором."""
+        from notion_client import AsyncClient
+
+        return AsyncClient(client=httpx.AsyncClient(transport=self.transport()), auth="emulator")
+
+    # ---------- HTTP-сервер ----------
+    def serve(self, host: str = "127.0.0.1", port: int = 8787) -> ThreadingHTTPServer:
+        emu = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            def _do(self) -> None:
+                time.sleep(emu.delay_sec())
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                status, headers, payload = emu.handle(self.command, self.path, json.loads(raw) if raw else None)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PATCH = _do
+
+            def log_message(self, fmt, *args):  # тихо
+                pass
+
+        return ThreadingHTTPServer((host, port), _Handler)
+
+
+def _ts(v: str) -> datetime:
+    v = v.replace("Z", "+00:00")
+    dt = datetime.fromisoformat(v) if re.search(r"T", v) else datetime.fromisoformat(v + "T00:00:00+00:00")
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def main(argv=None) -> None:
+    import os
+
+    parser = argparse.ArgumentParser(description="Local Notion API emulator")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit-prob", type=float, default=0.0)
+    parser.add_argument("--rate-limit-every", type=int, default=0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed-file", help="JSON: {db_id: [properties, ...]} — страницы для наполнения")
+    args = parser.parse_args(argv)
+
+    emu = NotionEmulator(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_prob=args.rate_limit_prob,
+        rate_limit_every=args.rate_limit_every,
+        retry_after_sec=args.retry_after,
+    )
+    # Базы бота — по тем же env-переменным, что читает config.py
+    emu.install_bot_schema({k: os.getenv(k) or k.lower() for k in BOT_SCHEMAS})
+    if args.seed_file:
+        with open(args.seed_file, encoding="utf-8") as f:
+            for db_id, rows in json.load(f).items():
+                for props in rows:
+                    emu.seed_page(db_id, props)
+    server = emu.serve(args.host, args.port)
+    print(f"Notion emulator on http://{args.host}:{args.port} (databases: {', '.join(d['id'] for d in emu._dbs.values())})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
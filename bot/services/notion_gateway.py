@@ -0,0 +1,180 @@
+# bot/services/notion_gateway.py
+"""
+Единый асинхронный шлюз к Notion API на весь процесс.
+
+Все репозитории (bot/database/*) ходят в Notion только через функции этого модуля:
+один notion_client.AsyncClient поверх одного httpx.AsyncClient с пулом keep-alive
+соединений. Медленный запрос к Notion ждёт только свой хендлер и не блокирует
+event loop PTB для остальных чатов.
+
+Настройки (env, всё опционально):
+  NOTION_TOKEN                  — токен интеграции
+  NOTION_TIMEOUT_MS             — таймаут запроса (по умолчанию 30000)
+  NOTION_HTTP_MAX_CONNECTIONS   — максимум соединений в пуле (по умолчанию 10)
+  NOTION_HTTP_KEEPALIVE         — сколько держать keep-alive соединений (по умолчанию 5)
+  NOTION_HTTP_KEEPALIVE_EXPIRY  — сек. жизни простаивающего соединения (по умолчанию 60)
+  NOTION_RATE_PER_SEC / NOTION_BURST / NOTION_MAX_CONCURRENCY / NOTION_MAX_RETRIES
+                                — параметры планировщика (см. notion_scheduler)
+"""
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from notion_client import AsyncClient
+
+from bot.services.notion_scheduler import NotionScheduler, Priority
+from bot.services.single_flight import SingleFlight, make_key
+
+log = logging.getLogger(__name__)
+
+_client: Optional[AsyncClient] = None
+scheduler = NotionScheduler.from_env()
+reads = SingleFlight()
+
+
+def _env_clean(key: str) -> Optional[str]:
+    v = os.getenv(key)
+    if not v:
+        return None
+    v = v.strip().strip('"').strip("'")
+    if v.lower() in ("none", "null", ""):
+        return None
+    return v
+
+
+def _env_int(key: str, default: int) -> int:
+    try:
+        return int(os.getenv(key, "") or default)
+    except ValueError:
+        return default
+
+
+def _build_client() -> AsyncClient:
+    token = _env_clean("NOTION_TOKEN")
+    if not token:
+        raise RuntimeError("NOTION_TOKEN is not set")
+    http = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=_env_int("NOTION_HTTP_MAX_CONNECTIONS", 10),
+            max_keepalive_connections=_env_int("NOTION_HTTP_KEEPALIVE", 5),
+            keepalive_expiry=_env_int("NOTION_HTTP_KEEPALIVE_EXPIRY", 60),
+        ),
+    )
+    options = {"auth": token, "timeout_ms": _env_int("NOTION_TIMEOUT_MS", 30_000)}
+    # NOTION_BASE_URL — например локальный эмулятор (bot.services.notion_emulator)
+    base_url = _env_clean("NOTION_BASE_URL")
+    if base_url:
+        options["base_url"] = base_url.rstrip("/")
+    return AsyncClient(client=http, **options)
+
+
+def is_configured() -> bool:
+    """True, если есть клиент или токен, из которого его можно создать."""
+    return _client is not None or bool(_env_clean("NOTION_TOKEN"))
+
+
+def get_client() -> AsyncClient:
+    """Общий AsyncClient процесса (создаётся лениво при первом обращении)."""
+    global _client
+    if _client is None:
+        _client = _build_client()
+        log.info("Notion gateway initialised")
+    return _client
+
+
+def set_client(client: Optional[AsyncClient]) -> None:
+    """Подменить клиент (тесты, локальный эмулятор). None — сбросить к ленивому созданию."""
+    global _client
+    _client = client
+
+
+async def aclose() -> None:
+    """Закрыть пул соединений (вызывается при остановке бота)."""
+    global _client
+    client, _client = _client, None
+    if client is not None:
+        try:
+            await client.aclose()
+        except Exception as e:
+            log.warning("Notion gateway close failed: %s", e)
+
+
+# ---------- Операции ----------
+# Все вызовы идут через общий планировщик (лимит Notion ~3 req/s на интеграцию).
+# По умолчанию чтения — INTERACTIVE, записи — BACKGROUND; вызывающий может переопределить.
+# Одинаковые чтения, уже летящие в Notion, не дублируются (single-flight): ключ —
+# (база, нормализованные фильтр/сортировка/курсор) или id страницы. Результат общий —
+# вызывающие не должны его мутировать.
+async def query_database(database_id: str, *, priority: Priority = Priority.INTERACTIVE, **kwargs: Any) -> Dict[str, Any]:
+    return await reads.do(
+        make_key("query", database_id, kwargs),
+        lambda: scheduler.run(lambda: get_client().databases.query(database_id=database_id, **kwargs), priority),
+    )
+
+
+async def iter_query(
+    database_id: str,
+    *,
+    page_size: int = 100,
+    limit: Optional[int] = None,
+    priority: Priority = Priority.INTERACTIVE,
+    **kwargs: Any,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Все строки выборки постранично (start_cursor/next_cursor), по одной.
+    Следующая страница запрашивается только когда потребитель дочитал текущую;
+    limit или break в цикле прекращают запросы досрочно.
+    """
+    page_size = max(1, min(100, int(page_size)))
+    if limit is not None:
+        page_size = min(page_size, max(1, int(limit)))
+    seen = 0
+    cursor: Optional[str] = None
+    while True:
+        params = dict(kwargs, page_size=page_size)
+        if cursor:
+            params["start_cursor"] = cursor
+        resp = await query_database(database_id, priority=priority, **params)
+        for row in resp.get("results", []):
+            if limit is not None and seen >= limit:
+                return
+            seen += 1
+            yield row
+        cursor = resp.get("next_cursor")
+        if not resp.get("has_more") or not cursor or (limit is not None and seen >= limit):
+            return
+
+
+async def retrieve_database(database_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
+    return await reads.do(
+        make_key("database", database_id),
+        lambda: scheduler.run(lambda: get_client().databases.retrieve(database_id=database_id), priority),
+    )
+
+
+async def update_database(database_id: str, *, priority: Priority = Priority.BACKGROUND, **kwargs: Any) -> Dict[str, Any]:
+    return await scheduler.run(lambda: get_client().databases.update(database_id=database_id, **kwargs), priority)
+
+
+async def retrieve_page(page_id: str, *, priority: Priority = Priority.INTERACTIVE) -> Dict[str, Any]:
+    return await reads.do(
+        make_key("page", page_id),
+        lambda: scheduler.run(lambda: get_client().pages.retrieve(page_id=page_id), priority),
+    )
+
+
+async def create_page(*, priority: Priority = Priority.BACKGROUND, **kwargs: Any) -> Dict[str, Any]:
+    # pages.create не идемпотентен: неясный исход (таймаут, 5xx) не повторяется здесь —
+    # его разбирает вызывающий (журнал local_store ищет страницу по Local ID)
+    return await scheduler.run(lambda: get_client().pages.create(**kwargs), priority, idempotent=False)
+
+
+async def update_page(page_id: str, *, priority: Priority = Priority.BACKGROUND, **kwargs: Any) -> Dict[str, Any]:
+    return await scheduler.run(lambda: get_client().pages.update(page_id=page_id, **kwargs), priority)
+
+
+def stats() -> Dict[str, Any]:
+    return {**scheduler.stats(), "single_flight": reads.stats()}
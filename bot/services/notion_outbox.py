@@ -0,0 +1,196 @@
+# bot/services/notion_outbox.py
+"""
+Write-behind outbox для изменений свойств страниц Notion.
+
+- enqueue(page_id, properties) синхронно и надёжно пишет патч в локальный SQLite
+  (переживает рестарт бота) и будит фонового воркера.
+- Патчи одной страницы сливаются в одну строку: пять изменений Payment при
+  подтверждении оплаты уходят в Notion одним pages.update.
+- Доставка at-least-once: строка удаляется только после успешного ответа и только
+  если её не успели дописать во время отправки (сверяем version). pages.update с
+  одними и теми же значениями идемпотентен, поэтому повторная отправка безопасна.
+- Ошибки — экспоненциальная задержка; после OUTBOX_MAX_ATTEMPTS патч уходит в
+  таблицу dead (видно в stats()) и в лог.
+
+Создание страниц (pages.create) сюда не идёт: вызывающему сразу нужен id новой страницы.
+
+Настройки (env):
+  NOTION_OUTBOX_PATH      — файл SQLite (по умолчанию notion_outbox.sqlite3)
+  OUTBOX_MAX_ATTEMPTS     — попыток до dead letter (по умолчанию 10)
+  OUTBOX_POLL_SEC         — как часто воркер проверяет отложенные ретраи (по умолчанию 5)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Set
+
+from bot.services import notion_gateway
+from bot.services.notion_scheduler import Priority
+
+log = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10") or 10)
+POLL_SEC = float(os.getenv("OUTBOX_POLL_SEC", "5") or 5)
+MAX_BACKOFF_SEC = 300.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    page_id         TEXT PRIMARY KEY,
+    properties      TEXT NOT NULL,
+    version         INTEGER NOT NULL DEFAULT 1,
+    attempts        INTEGER NOT NULL DEFAULT 0,
+    created_at      REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    last_error      TEXT
+);
+CREATE TABLE IF NOT EXISTS dead (
+    page_id    TEXT NOT NULL,
+    properties TEXT NOT NULL,
+    attempts   INTEGER NOT NULL,
+    failed_at  REAL NOT NULL,
+    last_error TEXT
+);
+"""
+
+
+class NotionOutbox:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._sending: Set[str] = set()
+        self._stats: Dict[str, int] = {"enqueued": 0, "coalesced": 0, "delivered": 0, "failed": 0, "dead": 0}
+
+    # ---------- хранилище ----------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _notify(self) -> None:
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---------- API ----------
+    def enqueue(self, page_id: str, properties: Dict[str, Any]) -> None:
+        """Поставить патч свойств страницы; сливается с уже ожидающим патчем этой страницы."""
+        if not page_id or not properties:
+            return
+        db = self._db()
+        now = time.time()
+        with db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT properties FROM outbox WHERE page_id = ?", (page_id,)).fetchone()
+            if row is None:
+                db.execute(
+                    "INSERT INTO outbox (page_id, properties, created_at, next_attempt_at) VALUES (?, ?, ?, ?)",
+                    (page_id, json.dumps(properties, ensure_ascii=False), now, now),
+                )
+            else:
+                merged = {**json.loads(row[0]), **properties}
+                db.execute(
+                    "UPDATE outbox SET properties = ?, version = version + 1, next_attempt_at = ? WHERE page_id = ?",
+                    (json.dumps(merged, ensure_ascii=False), now, page_id),
+                )
+                self._stats["coalesced"] += 1
+        self._stats["enqueued"] += 1
+        self._notify()
+
+    def pending(self, page_id: str) -> Optional[Dict[str, Any]]:
+        row = self._db().execute("SELECT properties FROM outbox WHERE page_id = ?", (page_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    async def _deliver(self, page_id: str, raw: str, version: int, attempts: int) -> bool:
+        self._sending.add(page_id)
+        try:
+            await notion_gateway.update_page(page_id=page_id, properties=json.loads(raw), priority=Priority.BACKGROUND)
+        except Exception as e:
+            attempts += 1
+            self._stats["failed"] += 1
+            db = self._db()
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                if attempts >= MAX_ATTEMPTS:
+                    db.execute(
+                        "INSERT INTO dead (page_id, properties, attempts, failed_at, last_error) VALUES (?, ?, ?, ?, ?)",
+                        (page_id, raw, attempts, time.time(), str(e)),
+                    )
+                    db.execute("DELETE FROM outbox WHERE page_id = ? AND version = ?", (page_id, version))
+                    self._stats["dead"] += 1
+                    log.error("Outbox: giving up on %s after %s attempts: %s", page_id, attempts, e)
+                else:
+                    delay = min(MAX_BACKOFF_SEC, 2.0 ** attempts)
+                    db.execute(
+                        "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE page_id = ?",
+                        (attempts, time.time() + delay, str(e), page_id),
+                    )
+                    log.warning("Outbox: update of %s failed (%s), retry in %.0fs", page_id, e, delay)
+            return False
+        finally:
+            self._sending.discard(page_id)
+        db = self._db()
+        db.execute("DELETE FROM outbox WHERE page_id = ? AND version = ?", (page_id, version))
+        self._stats["delivered"] += 1
+        return True
+
+    async def flush(self, page_id: Optional[str] = None) -> int:
+        """Отправить готовые патчи (или сразу патч одной страницы). Возвращает число доставленных."""
+        if not notion_gateway.is_configured():
+            return 0
+        db = self._db()
+        if page_id:
+            rows = db.execute(
+                "SELECT page_id, properties, version, attempts FROM outbox WHERE page_id = ?", (page_id,)
+            ).fetchall()
+        else:
+            rows = db.execute(
+                "SELECT page_id, properties, version, attempts FROM outbox WHERE next_attempt_at <= ? ORDER BY created_at",
+                (time.time(),),
+            ).fetchall()
+        delivered = 0
+        for pid, raw, version, attempts in rows:
+            if pid in self._sending:
+                continue
+            if await self._deliver(pid, raw, version, attempts):
+                delivered += 1
+        return delivered
+
+    async def run_worker(self) -> None:
+        """Фоновый воркер: доставляет новые патчи сразу, отложенные ретраи — раз в POLL_SEC."""
+        self._wake = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=POLL_SEC)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                log.warning("Outbox flush failed: %s", e)
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._db()
+        return {
+            **self._stats,
+            "pending": db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0],
+            "dead_total": db.execute("SELECT COUNT(*) FROM dead").fetchone()[0],
+        }
+
+
+outbox = NotionOutbox(os.getenv("NOTION_OUTBOX_PATH", "notion_outbox.sqlite3"))
@@ -0,0 +1,228 @@
+# bot/services/notion_scheduler.py
+"""
+Планировщик всех запросов к Notion: token bucket + приоритеты + ретраи.
+
+- Token bucket держит средний темп (по умолчанию 3 req/s — лимит Notion на интеграцию).
+- Конкурентность адаптивная (AIMD): каждый успешный ответ понемногу поднимает лимит
+  одновременных запросов, каждый 429 делит его пополам.
+- 429 уважает Retry-After: весь поток запросов ставится на паузу, а не только упавший.
+- 5xx / conflict / таймауты повторяются с экспоненциальной задержкой и джиттером.
+  Неидемпотентные вызовы (pages.create, idempotent=False) повторяются только после 429
+  и ошибок до отправки запроса (не удалось соединиться): таймаут или 5xx могли прийти
+  уже после того, как Notion создал страницу, — такая ошибка уходит вызывающему.
+- Ожидающие запросы обслуживаются по приоритету: сначала то, что ждёт пользователь,
+  затем фоновые записи, затем массовые задачи (бэкфилл).
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import os
+import random
+import time
+from enum import IntEnum
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+
+import httpx
+from notion_client.errors import APIResponseError, HTTPResponseError, RequestTimeoutError
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0   # пользователь ждёт ответа (check_registration, list_user_products)
+    BACKGROUND = 1    # фоновые записи (create_payment_record, смена языка)
+    BULK = 2          # массовые задачи (бэкфилл)
+
+
+_RETRYABLE_STATUS = {409, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(err: HTTPResponseError) -> Optional[float]:
+    try:
+        raw = err.headers.get("Retry-After")
+        return max(0.0, float(raw)) if raw is not None else None
+    except Exception:
+        return None
+
+
+def _is_rate_limited(err: BaseException) -> bool:
+    if isinstance(err, APIResponseError) and getattr(err, "code", None) == "rate_limited":
+        return True
+    return isinstance(err, HTTPResponseError) and getattr(err, "status", None) == 429
+
+
+def _not_sent(err: BaseException) -> bool:
+    """Запрос точно не дошёл до Notion: соединение не установлено / нет свободного."""
+    return isinstance(err, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def not_applied(err: BaseException) -> bool:
+    """Вызов точно ничего не изменил в Notion: не отправлен или отклонён ответом 4xx."""
+    if _not_sent(err):
+        return True
+    return isinstance(err, HTTPResponseError) and 400 <= (getattr(err, "status", None) or 0) < 500
+
+
+def _is_retryable(err: BaseException) -> bool:
+    if isinstance(err, (RequestTimeoutError, httpx.TransportError)):
+        return True
+    return isinstance(err, HTTPResponseError) and getattr(err, "status", None) in _RETRYABLE_STATUS
+
+
+class NotionScheduler:
+    def __init__(
+        self,
+        rate_per_sec: float = 3.0,
+        burst: int = 3,
+        max_concurrency: int = 4,
+        min_concurrency: int = 1,
+        max_retries: int = 4,
+        base_backoff: float = 0.5,
+    ) -> None:
+        self.rate = float(rate_per_sec)
+        self.burst = float(burst)
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.min_concurrency = max(1, min(int(min_concurrency), self.max_concurrency))
+        self.max_retries = int(max_retries)
+        self.base_backoff = float(base_backoff)
+
+        self._tokens = self.burst
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._limit = float(self.max_concurrency)
+        self._inflight = 0
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._stats: Dict[str, int] = {"calls": 0, "retries": 0, "rate_limited": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls) -> "NotionScheduler":
+        def _num(key: str, default: float) -> float:
+            try:
+                return float(os.getenv(key, "") or default)
+            except ValueError:
+                return default
+        return cls(
+            rate_per_sec=_num("NOTION_RATE_PER_SEC", 3.0),
+            burst=int(_num("NOTION_BURST", 3)),
+            max_concurrency=int(_num("NOTION_MAX_CONCURRENCY", 4)),
+            max_retries=int(_num("NOTION_MAX_RETRIES", 4)),
+        )
+
+    # ---------- token bucket ----------
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._refilled_at
+        if elapsed > 0:
+            self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+            self._refilled_at = now
+
+    def _schedule_dispatch(self, delay: float) -> None:
+        if self._timer is not None:
+            return
+        loop = asyncio.get_running_loop()
+
+        def _fire() -> None:
+            self._timer = None
+            self._dispatch()
+
+        self._timer = loop.call_later(max(delay, 0.001), _fire)
+
+    def _dispatch(self) -> None:
+        while self._waiters:
+            _, _, fut = self._waiters[0]
+            if fut.done():  # отменён, пока ждал
+                heapq.heappop(self._waiters)
+                continue
+            if self._inflight >= int(self._limit):
+                return  # освободится слот — _release() вызовет нас снова
+            now = time.monotonic()
+            if now < self._paused_until:
+                self._schedule_dispatch(self._paused_until - now)
+                return
+            self._refill(now)
+            if self._tokens < 1.0:
+                self._schedule_dispatch((1.0 - self._tokens) / self.rate)
+                return
+            heapq.heappop(self._waiters)
+            self._tokens -= 1.0
+            self._inflight += 1
+            fut.set_result(None)
+
+    async def _acquire(self, priority: Priority) -> None:
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), fut))
+        self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self._release()  # слот уже выдан, но мы его не используем
+            raise
+
+    def _release(self) -> None:
+        self._inflight = max(0, self._inflight - 1)
+        self._dispatch()
+
+    # ---------- AIMD ----------
+    def _on_success(self) -> None:
+        if self._limit < self.max_concurrency:
+            self._limit = min(float(self.max_concurrency), self._limit + 1.0 / self._limit)
+
+    def _on_rate_limited(self, retry_after: Optional[float]) -> None:
+        self._stats["rate_limited"] += 1
+        self._limit = max(float(self.min_concurrency), self._limit / 2.0)
+        pause = retry_after if retry_after is not None else 1.0
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        self._tokens = 0.0
+
+    # ---------- API ----------
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        priority: Priority = Priority.INTERACTIVE,
+        *,
+        idempotent: bool = True,
+    ) -> T:
+        """Выполнить call() с учётом лимитов; ретраит 429/5xx/таймауты (неидемпотентный — см. выше)."""
+        attempt = 0
+        while True:
+            await self._acquire(priority)
+            self._stats["calls"] += 1
+            try:
+                result = await call()
+            except Exception as e:
+                delay: Optional[float] = None
+                if _is_rate_limited(e):
+                    retry_after = _retry_after_seconds(e)  # type: ignore[arg-type]
+                    self._on_rate_limited(retry_after)
+                    delay = retry_after if retry_after is not None else 1.0
+                elif _is_retryable(e) if idempotent else _not_sent(e):
+                    delay = self.base_backoff * (2 ** attempt) * (1 + random.random())
+                if delay is None or attempt >= self.max_retries:
+                    self._stats["errors"] += 1
+                    raise
+                attempt += 1
+                self._stats["retries"] += 1
+                log.warning("Notion call failed (%s), retry %s/%s in %.2fs", e, attempt, self.max_retries, delay)
+            else:
+                self._on_success()
+                return result
+            finally:
+                self._release()
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self._stats,
+            "inflight": self._inflight,
+            "waiting": sum(1 for _, _, f in self._waiters if not f.done()),
+            "concurrency_limit": round(self._limit, 2),
+            "paused_for_sec": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
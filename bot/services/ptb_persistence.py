@@ -0,0 +1,231 @@
+# bot/services/ptb_persistence.py
+"""
+Персистентность PTB (user_data, chat_data, bot_data, состояния ConversationHandler)
+в локальном SQLite (WAL).
+
+Без неё рестарт терял lang/registered/awaiting_screenshot, шаги регистрации и
+редактирования профиля и bot_data["pending_payments"], а каждый вернувшийся
+пользователь снова шёл в Notion за check_registration.
+
+- get_*: всё читается один раз при Application.initialize();
+- update_*/drop_*: PTB сам вызывает их пачкой раз в update_interval (PERSISTENCE_FLUSH_SEC)
+  и только для затронутых записей; здесь они лишь кладут запись в dirty, а вся пачка
+  пишется одной транзакцией в конце тика (call_soon) — без записи на каждый апдейт;
+- запись, чьё содержимое не изменилось с прошлого сохранения, на диск не пишется
+  (bot_data PTB отдаёт каждый тик целиком);
+- flush() (PTB зовёт его в stop/shutdown) дописывает всё, что осталось.
+
+Значения сериализуются pickle, как в PicklePersistence: в user_data лежат не только
+JSON-типы. Запись, которую не удалось ни сохранить, ни прочитать, пропускается с
+предупреждением в лог, а не роняет старт.
+
+callback_data не хранится: arbitrary_callback_data бот не использует.
+
+Настройки (env):
+  PERSISTENCE_PATH       — файл SQLite (по умолчанию bot_state.sqlite3)
+  PERSISTENCE_FLUSH_SEC  — период сброса изменений на диск (по умолчанию 5)
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+log = logging.getLogger(__name__)
+
+FLUSH_SEC = float(os.getenv("PERSISTENCE_FLUSH_SEC", "5") or 5)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    kind       TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    value      BLOB NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+ConversationKey = Tuple[int, ...]
+ConversationDict = Dict[ConversationKey, object]
+
+_DELETED = object()
+_BOT = ""
+
+
+def _conv_kind(name: str) -> str:
+    return f"conv:{name}"
+
+
+def _conv_key(key: ConversationKey) -> str:
+    return json.dumps(list(key))
+
+
+class SQLitePersistence(BasePersistence):
+    def __init__(self, path: str, update_interval: float = FLUSH_SEC) -> None:
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._dirty: Dict[Tuple[str, str], Any] = {}
+        self._digests: Dict[Tuple[str, str], bytes] = {}
+        self._commit_scheduled = False
+        self._stats: Dict[str, int] = {"batches": 0, "written": 0, "deleted": 0, "unchanged": 0, "errors": 0}
+
+    # ---------- хранилище ----------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _load(self, kind: str) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for key, raw in self._db().execute("SELECT key, value FROM state WHERE kind = ?", (kind,)):
+            try:
+                out[key] = pickle.loads(raw)
+            except Exception as e:
+                self._stats["errors"] += 1
+                log.warning("Persistence: skip unreadable %s/%s: %s", kind, key, e)
+                continue
+            self._digests[(kind, key)] = hashlib.blake2b(raw, digest_size=16).digest()
+        return out
+
+    def _stage(self, kind: str, key: str, value: Any) -> None:
+        self._dirty[(kind, key)] = value
+        if self._commit_scheduled:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.commit()
+            return
+        # update_* одного тика PTB запускает через gather: коммит встаёт в очередь
+        # после всех них и пишет пачку одной транзакцией
+        self._commit_scheduled = True
+        loop.call_soon(self.commit)
+
+    def commit(self) -> int:
+        """Записать накопленные изменения одной транзакцией. Возвращает число изменённых строк."""
+        self._commit_scheduled = False
+        if not self._dirty:
+            return 0
+        batch, self._dirty = self._dirty, {}
+        now = time.time()
+        upserts, deletes, digests = [], [], {}
+        for (kind, key), value in batch.items():
+            if value is _DELETED:
+                if (kind, key) in self._digests:
+                    deletes.append((kind, key))
+                continue
+            try:
+                raw = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except Exception as e:
+                self._stats["errors"] += 1
+                log.warning("Persistence: cannot pickle %s/%s: %s", kind, key, e)
+                continue
+            digest = hashlib.blake2b(raw, digest_size=16).digest()
+            if self._digests.get((kind, key)) == digest:
+                self._stats["unchanged"] += 1
+                continue
+            upserts.append((kind, key, raw, now))
+            digests[(kind, key)] = digest
+        if not upserts and not deletes:
+            return 0
+        db = self._db()
+        try:
+            with db:
+                db.execute("BEGIN IMMEDIATE")
+                db.executemany(
+                    "INSERT INTO state (kind, key, value, updated_at) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (kind, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                    upserts,
+                )
+                db.executemany("DELETE FROM state WHERE kind = ? AND key = ?", deletes)
+        except sqlite3.Error as e:
+            # вернуть пачку в dirty (не затирая более свежие изменения) — уйдёт следующим тиком
+            self._stats["errors"] += 1
+            log.warning("Persistence: commit of %s entries failed: %s", len(batch), e)
+            self._dirty = {**batch, **self._dirty}
+            return 0
+        self._digests.update(digests)
+        for k in deletes:
+            self._digests.pop(k, None)
+        self._stats["batches"] += 1
+        self._stats["written"] += len(upserts)
+        self._stats["deleted"] += len(deletes)
+        return len(upserts) + len(deletes)
+
+    # ---------- BasePersistence: чтение ----------
+    async def get_user_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(k): v for k, v in self._load("user").items()}
+
+    async def get_chat_data(self) -> Dict[int, Dict[Any, Any]]:
+        return {int(k): v for k, v in self._load("chat").items()}
+
+    async def get_bot_data(self) -> Dict[Any, Any]:
+        return self._load("bot").get(_BOT, {})
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> ConversationDict:
+        return {tuple(json.loads(k)): v for k, v in self._load(_conv_kind(name)).items()}
+
+    # ---------- BasePersistence: запись ----------
+    async def update_user_data(self, user_id: int, data: Dict[Any, Any]) -> None:
+        self._stage("user", str(user_id), data)
+
+    async def update_chat_data(self, chat_id: int, data: Dict[Any, Any]) -> None:
+        self._stage("chat", str(chat_id), data)
+
+    async def update_bot_data(self, data: Dict[Any, Any]) -> None:
+        self._stage("bot", _BOT, data)
+
+    async def update_callback_data(self, data: Any) -> None:
+        return None
+
+    async def update_conversation(self, name: str, key: ConversationKey, new_state: Optional[object]) -> None:
+        self._stage(_conv_kind(name), _conv_key(key), _DELETED if new_state is None else new_state)
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage("user", str(user_id), _DELETED)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage("chat", str(chat_id), _DELETED)
+
+    # данные живут только в этом процессе — подтягивать извне нечего
+    async def refresh_user_data(self, user_id: int, user_data: Dict[Any, Any]) -> None:
+        return None
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: Dict[Any, Any]) -> None:
+        return None
+
+    async def refresh_bot_data(self, bot_data: Dict[Any, Any]) -> None:
+        return None
+
+    async def flush(self) -> None:
+        self.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._db().execute("SELECT kind, COUNT(*) FROM state GROUP BY kind").fetchall()
+        return {**self._stats, "dirty": len(self._dirty), "stored": dict(rows)}
+
+
+persistence = SQLitePersistence(os.getenv("PERSISTENCE_PATH", "bot_state.sqlite3"))
@@ -0,0 +1,254 @@
+# bot/services/saga.py
+"""
+Многошаговые операции (саги) с журналом выполненных шагов.
+
+- Сага описывается один раз: register(kind, steps). Шаг — async fn(ctx) -> dict|None;
+  возвращённый dict вливается в состояние саги. Элемент steps — либо (name, fn),
+  либо список таких пар: шаги группы выполняются параллельно.
+- После каждого шага состояние и список выполненных шагов пишутся в SQLite, поэтому
+  после падения/рестарта сага продолжается с первого невыполненного шага
+  (resume_pending / run_resume_loop), а повторный run() уже завершённой саги
+  просто возвращает её состояние — двойное нажатие кнопки ничего не делает дважды.
+- Число запусков саги хранится в журнале (attempts). Фон дожимает упавшую сагу с
+  растущей паузой, а после SAGA_MAX_ATTEMPTS запусков переводит её в status='failed'
+  и больше не трогает; явный run() даёт ей ещё одну попытку.
+- На один ключ (kind, key) в процессе одновременно выполняется не больше одной саги.
+- ctx.resumed == True, если шаг уже начинался раньше, но не был записан как
+  выполненный: шаг, создающий страницу, должен сначала поискать созданное.
+  ctx.checkpoint(**values) пишет values в журнал сразу — например, id страницы
+  до её создания, чтобы продолженный шаг нашёл её по id.
+
+Настройки (env):
+  SAGA_JOURNAL_PATH  — файл SQLite (по умолчанию saga_journal.sqlite3)
+  SAGA_RESUME_SEC    — как часто дожимать незавершённые саги (по умолчанию 60)
+  SAGA_MAX_ATTEMPTS  — сколько раз запускать сагу, прежде чем считать её failed (по умолчанию 8)
+  SAGA_MAX_BACKOFF_SEC — потолок паузы между попытками (по умолчанию 3600)
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple, Union
+
+log = logging.getLogger(__name__)
+
+RESUME_SEC = float(os.getenv("SAGA_RESUME_SEC", "60") or 60)
+MAX_ATTEMPTS = int(os.getenv("SAGA_MAX_ATTEMPTS", "8") or 8)
+MAX_BACKOFF_SEC = float(os.getenv("SAGA_MAX_BACKOFF_SEC", "3600") or 3600)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS saga (
+    kind       TEXT NOT NULL,
+    key        TEXT NOT NULL,
+    state      TEXT NOT NULL,
+    done       TEXT NOT NULL DEFAULT '[]',
+    started    TEXT NOT NULL DEFAULT '[]',
+    status     TEXT NOT NULL DEFAULT 'running',
+    attempts   INTEGER NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    last_error TEXT,
+    PRIMARY KEY (kind, key)
+);
+"""
+
+
+@dataclass
+class StepContext:
+    kind: str
+    key: str
+    state: Dict[str, Any]
+    resumed: bool = False
+    save: Optional[Callable[[], None]] = field(default=None, repr=False)
+
+    def checkpoint(self, **values: Any) -> None:
+        """Влить values в состояние и сразу записать журнал — до побочного эффекта шага."""
+        self.state.update(values)
+        if self.save is not None:
+            self.save()
+
+
+Step = Callable[[StepContext], Awaitable[Optional[Dict[str, Any]]]]
+StepSpec = Union[Tuple[str, Step], Sequence[Tuple[str, Step]]]
+
+
+@dataclass
+class _Row:
+    state: Dict[str, Any]
+    done: Set[str] = field(default_factory=set)
+    started: Set[str] = field(default_factory=set)
+    status: str = "running"
+    attempts: int = 0
+
+
+class SagaRunner:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._kinds: Dict[str, List[List[Tuple[str, Step]]]] = {}
+        self._locks: Dict[Tuple[str, str], Tuple[asyncio.Lock, int]] = {}
+        self._stats: Dict[str, int] = {
+            "started": 0, "completed": 0, "replayed": 0, "resumed": 0, "failed": 0, "dead": 0,
+        }
+
+    # ---------- журнал ----------
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            d = os.path.dirname(self.path)
+            if d:
+                os.makedirs(d, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _load(self, kind: str, key: str) -> Optional[_Row]:
+        row = self._db().execute(
+            "SELECT state, done, started, status, attempts FROM saga WHERE kind = ? AND key = ?", (kind, key)
+        ).fetchone()
+        if row is None:
+            return None
+        return _Row(json.loads(row[0]), set(json.loads(row[1])), set(json.loads(row[2])), row[3], row[4])
+
+    def _save(self, kind: str, key: str, row: _Row, error: Optional[str] = None) -> None:
+        self._db().execute(
+            "INSERT OR REPLACE INTO saga (kind, key, state, done, started, status, attempts, updated_at, last_error) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                kind, key, json.dumps(row.state, ensure_ascii=False, default=str),
+                json.dumps(sorted(row.done)), json.dumps(sorted(row.started)),
+                row.status, row.attempts, time.time(), error,
+            ),
+        )
+
+    def state(self, kind: str, key: str) -> Optional[Dict[str, Any]]:
+        row = self._load(kind, key)
+        return row.state if row else None
+
+    # ---------- API ----------
+    def register(self, kind: str, steps: Sequence[StepSpec]) -> None:
+        groups: List[List[Tuple[str, Step]]] = []
+        for spec in steps:
+            if isinstance(spec, tuple) and len(spec) == 2 and isinstance(spec[0], str):
+                groups.append([spec])  # type: ignore[list-item]
+            else:
+                groups.append(list(spec))  # type: ignore[arg-type]
+        self._kinds[kind] = groups
+
+    async def run(self, kind: str, key: str, state: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Выполнить (или продолжить) сагу kind/key. Исходное состояние учитывается только
+        при первом запуске. Ошибка шага записывается в журнал и пробрасывается.
+        """
+        groups = self._kinds[kind]
+        lock, users = self._locks.get((kind, key)) or (asyncio.Lock(), 0)
+        self._locks[(kind, key)] = (lock, users + 1)
+        try:
+            async with lock:
+                return await self._run_locked(kind, key, groups, state)
+        finally:
+            lock, users = self._locks[(kind, key)]
+            if users <= 1:
+                del self._locks[(kind, key)]
+            else:
+                self._locks[(kind, key)] = (lock, users - 1)
+
+    async def _run_locked(
+        self, kind: str, key: str, groups: List[List[Tuple[str, Step]]], state: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        row = self._load(kind, key)
+        if row is None:
+            row = _Row(dict(state or {}))
+            self._stats["started"] += 1
+        elif row.status == "done":
+            self._stats["replayed"] += 1
+            return row.state
+        row.attempts += 1
+
+        for group in groups:
+            todo = [(name, fn) for name, fn in group if name not in row.done]
+            if not todo:
+                continue
+            # отметка "начат" — до побочных эффектов
+            resumed = {name for name, _ in todo if name in row.started}
+            row.started.update(name for name, _ in todo)
+            self._save(kind, key, row)
+
+            def save() -> None:
+                self._save(kind, key, row)
+
+            results = await asyncio.gather(
+                *(fn(StepContext(kind, key, row.state, name in resumed, save)) for name, fn in todo),
+                return_exceptions=True,
+            )
+            error: Optional[BaseException] = None
+            for (name, _), res in zip(todo, results):
+                if isinstance(res, BaseException):
+                    error = error or res
+                    log.warning("Saga %s/%s: step %s failed: %s", kind, key, name, res)
+                    continue
+                if res:
+                    row.state.update(res)
+                row.done.add(name)
+            if error is not None:
+                self._stats["failed"] += 1
+                if row.attempts >= MAX_ATTEMPTS:
+                    row.status = "failed"
+                    self._stats["dead"] += 1
+                    log.error("Saga %s/%s: giving up after %s attempts: %s", kind, key, row.attempts, error)
+                self._save(kind, key, row, error=str(error))
+                raise error
+            self._save(kind, key, row)
+
+        row.status = "done"
+        self._save(kind, key, row)
+        self._stats["completed"] += 1
+        return row.state
+
+    async def resume_pending(self) -> int:
+        """Продолжить незавершённые саги зарегистрированных типов, у которых истекла пауза."""
+        rows = self._db().execute(
+            "SELECT kind, key, attempts, updated_at FROM saga WHERE status = 'running'"
+        ).fetchall()
+        now = time.time()
+        resumed = 0
+        for kind, key, attempts, updated_at in rows:
+            if kind not in self._kinds or (kind, key) in self._locks:
+                continue
+            if attempts > 1 and now < updated_at + min(MAX_BACKOFF_SEC, RESUME_SEC * 2 ** (attempts - 2)):
+                continue
+            try:
+                await self.run(kind, key)
+                resumed += 1
+                self._stats["resumed"] += 1
+            except Exception as e:
+                log.warning("Saga %s/%s still failing: %s", kind, key, e)
+        return resumed
+
+    async def run_resume_loop(self, interval: float = RESUME_SEC) -> None:
+        while True:
+            try:
+                await self.resume_pending()
+            except Exception as e:
+                log.warning("Saga resume failed: %s", e)
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict[str, Any]:
+        db = self._db()
+        return {
+            **self._stats,
+            "running": db.execute("SELECT COUNT(*) FROM saga WHERE status = 'running'").fetchone()[0],
+            "failed_sagas": db.execute("SELECT COUNT(*) FROM saga WHERE status = 'failed'").fetchone()[0],
+        }
+
+
+sagas = SagaRunner(os.getenv("SAGA_JOURNAL_PATH", "saga_journal.sqlite3"))
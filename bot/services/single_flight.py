@@ -0,0 +1,46 @@
+# bot/services/single_flight.py
+"""
+Single-flight: одинаковые одновременные запросы выполняются один раз.
+
+Первый вызов с ключом запускает корутину отдельной задачей; все, кто пришёл с тем
+же ключом, пока она в полёте, ждут тот же результат (или ту же ошибку). Отмена
+одного из ожидающих не отменяет общий запрос для остальных.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+def make_key(*parts: Any) -> str:
+    """Стабильный ключ из аргументов запроса (порядок ключей в dict не важен)."""
+    return json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+
+
+class SingleFlight:
+    def __init__(self) -> None:
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._stats: Dict[str, int] = {"calls": 0, "deduplicated": 0}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        self._stats["calls"] += 1
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(call())
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda f, k=key: self._forget(k, f))
+        else:
+            self._stats["deduplicated"] += 1
+        return await asyncio.shield(fut)
+
+    def _forget(self, key: Hashable, fut: asyncio.Future) -> None:
+        if self._inflight.get(key) is fut:
+            del self._inflight[key]
+        if not fut.cancelled():
+            fut.exception()  # помечаем ошибку как полученную, даже если все ожидающие отменились
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "inflight": len(self._inflight)}
@@ -0,0 +1,190 @@
+# bot/services/warmup.py
+"""
+Прогрев локальных индексов Notion при старте и запуск их фоновой синхронизации
+(один change-feed на все базы, см. bot.services.change_feed).
+
+Users, Products, Purchases и Payments зеркалируются в local_store (SQLite): полные
+сканы и дельты фида сначала пишутся туда, индексы строятся из хранилища. Если база
+уже была зеркалирована, после рестарта индекс поднимается с диска, а фид продолжает
+с watermark хранилища — без полного скана Notion.
+Вызывается из bot.main._warmup; любой сбой здесь не должен мешать запуску бота.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Callable, Coroutine, Dict, List, Optional
+
+from bot.database import notion_descriptions, notion_payment_methods
+from bot.database.local_store import local_store, norm_db
+from bot.database.notion_user_products import entitlements
+from bot.database.products_index import products_index
+from bot.database.purchases_index import purchases_index
+from bot.database.records import decode_payment
+from bot.database.schema_registry import schema_registry
+from bot.database.users_index import users_index
+from bot.services.cache_registry import cache_registry
+from bot.services.change_feed import FeedSource, change_feed
+from bot.services.notion_outbox import outbox as notion_outbox
+from bot.services.saga import sagas
+
+log = logging.getLogger(__name__)
+
+
+def _env_db(key: str):
+    def get() -> Optional[str]:
+        v = (os.getenv(key) or "").strip().strip('"').strip("'")
+        return v if v and v.lower() not in ("none", "null") else None
+    return get
+
+
+def _mirrored(apply: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Any]:
+    # дельта фида — сначала в local_store (поверх ложатся ещё не доставленные правки), потом в индекс
+    def wrapped(page: Dict[str, Any]) -> Any:
+        return apply(local_store.put_page(page))
+    return wrapped
+
+
+def _store_reload(env_key: str, index: Any = None):
+    async def reload() -> int:
+        db_id = _env_db(env_key)()
+        if not db_id:
+            return 0
+        n = await local_store.pull_all(db_id)
+        if index is not None:
+            index.load_pages(local_store.pages(db_id))
+        return n
+    return reload
+
+
+# (имя источника, env базы, индекс) — базы, для которых local_store система записи
+_STORED = (
+    ("users", "NOTION_USERS_DB_ID", users_index),
+    ("products", "NOTION_PRODUCTS_DB_ID", products_index),
+    ("purchases", "NOTION_PURCHASES_DB_ID", purchases_index),
+    ("payments", "NOTION_PAYMENTS_DB_ID", None),
+)
+
+
+change_feed.register(FeedSource(
+    "users", _env_db("NOTION_USERS_DB_ID"), _mirrored(users_index.upsert_page),
+    _store_reload("NOTION_USERS_DB_ID", users_index), ready=lambda: users_index.ready,
+))
+change_feed.register(FeedSource(
+    "products", _env_db("NOTION_PRODUCTS_DB_ID"), _mirrored(products_index.apply_page),
+    _store_reload("NOTION_PRODUCTS_DB_ID", products_index), ready=lambda: products_index.ready,
+))
+def _apply_purchase(page: Dict[str, Any]) -> None:
+    rec = purchases_index.upsert_page(page)
+    user = users_index.get_by_page(rec.user_page_id) if rec and rec.user_page_id else None
+    if user is not None and user.telegram_id is not None:
+        entitlements.invalidate(user.telegram_id)
+
+
+def _apply_payment(page: Dict[str, Any]) -> None:
+    # Payments в памяти не зеркалируются — только пересборка вида entitlements владельца
+    rec = decode_payment(page)
+    if rec.telegram_id is not None:
+        entitlements.invalidate(rec.telegram_id)
+
+
+change_feed.register(FeedSource(
+    "purchases", _env_db("NOTION_PURCHASES_DB_ID"), _mirrored(_apply_purchase),
+    _store_reload("NOTION_PURCHASES_DB_ID", purchases_index), ready=lambda: purchases_index.ready,
+))
+change_feed.register(FeedSource(
+    "payments", _env_db("NOTION_PAYMENTS_DB_ID"), _mirrored(_apply_payment),
+    _store_reload("NOTION_PAYMENTS_DB_ID"), ready=lambda: local_store.synced(_env_db("NOTION_PAYMENTS_DB_ID")() or ""),
+))
+change_feed.register(FeedSource(
+    "descriptions", _env_db("NOTION_DESCRIPTIONS_DB_ID"), notion_descriptions.apply_page, notion_descriptions.preload_all,
+    ready=notion_descriptions.is_loaded,
+))
+change_feed.register(FeedSource(
+    "payment_methods", _env_db("NOTION_PAYMENT_METHODS_DB_ID"), notion_payment_methods.apply_page,
+    notion_payment_methods.preload_all, ready=notion_payment_methods.is_loaded,
+))
+
+
+async def preload_notion_caches() -> Dict[str, int]:
+    res: Dict[str, int] = {}
+    started = time.time()
+    try:
+        res["schemas"] = await schema_registry.load_all()
+    except Exception as e:
+        log.warning("Schema registry preload failed: %s", e)
+    for name, env_key, index in _STORED:
+        db_id = _env_db(env_key)()
+        if not db_id:
+            continue
+        try:
+            if local_store.synced(db_id):
+                # уже зеркалирована: с диска, Notion догонит фид с watermark хранилища
+                pages = local_store.pages(db_id)
+                if index is not None:
+                    index.load_pages(pages)
+                change_feed.resume(name, local_store.watermark(db_id))
+                res[name] = len(pages)
+            else:
+                res[name] = await _store_reload(env_key, index)()
+        except Exception as e:
+            log.warning("%s preload failed: %s", name, e)
+    for name, module in (("descriptions", notion_descriptions), ("payment_methods", notion_payment_methods)):
+        if not _env_db(f"NOTION_{name.upper()}_DB_ID")():
+            continue
+        try:
+            res[name] = await module.preload_all()
+        except Exception as e:
+            log.warning("%s preload failed: %s", name, e)
+    # дельты change-feed начинаются с момента прогрева
+    change_feed.prime(started)
+    return res
+
+
+def _on_remap(db_key: str, local_id: str, page: Dict[str, Any]) -> None:
+    # страница, созданная локально, появилась в Notion — индекс переключается на настоящий id
+    for _, env_key, index in _STORED:
+        db_id = _env_db(env_key)()
+        if index is not None and db_id and norm_db(db_id) == db_key:
+            index.discard(local_id)
+            index.upsert_page(page)
+
+
+local_store.add_listener(_on_remap)
+
+
+# Бесконечные фоновые циклы. Запускаются через asyncio.create_task, а не
+# application.create_task: Application.stop() ждёт все свои задачи и с вечными
+# циклами не вернулся бы. Останавливаются stop_background_sync() до application.stop().
+_background: List[asyncio.Task] = []
+
+
+def spawn(coro: Coroutine[Any, Any, Any], name: str) -> asyncio.Task:
+    task = asyncio.create_task(coro, name=name)
+    _background.append(task)
+    return task
+
+
+def start_background_sync(application: Any) -> None:
+    task = change_feed.start(application)
+    if task is not None:
+        _background.append(task)
+    spawn(local_store.run_worker(), "local_store_replication")
+    spawn(entitlements.run_expiry_loop(), "entitlements_expiry")
+    spawn(notion_outbox.run_worker(), "notion_outbox")
+    # регистрирует сагу подтверждения оплаты до первого resume_pending()
+    from bot.database import notion_payments  # noqa: F401
+    spawn(sagas.run_resume_loop(), "saga_resume")
+    spawn(cache_registry.run_snapshot_loop(), "cache_snapshots")
+
+
+async def stop_background_sync() -> None:
+    tasks = list(_background)
+    _background.clear()
+    for t in tasks:
+        t.cancel()
+    for t, res in zip(tasks, await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(res, Exception):
+            log.warning("Background task %s failed: %s", t.get_name(), res)
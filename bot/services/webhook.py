@@ -0,0 +1,295 @@
+# bot/services/webhook.py
+"""
+Приём апдейтов через webhook (вместо long polling) с ограниченной очередью.
+
+Режим включается UPDATES_MODE=webhook, по умолчанию остаётся polling.
+
+- Локальный HTTP-листенер на asyncio (за TLS-прокси: Telegram ходит только по HTTPS)
+  принимает POST на WEBHOOK_PATH, проверяет X-Telegram-Bot-Api-Secret-Token и кладёт
+  апдейт в очередь на WEBHOOK_QUEUE_MAX элементов;
+- WEBHOOK_WORKERS воркеров разбирают очередь через application.process_update —
+  это и есть предел одновременно обрабатываемых апдейтов;
+- backpressure: если очередь полна, запрос ждёт место до WEBHOOK_ENQUEUE_WAIT_SEC, а
+  потом получает 503 — апдейт остаётся у Telegram, и тот пришлёт его повторно. Число
+  параллельных соединений Telegram ограничено WEBHOOK_MAX_CONNECTIONS;
+- повторная доставка уже принятого апдейта (ответ не дошёл до Telegram) отсекается
+  по update_id;
+- webhook при остановке не удаляется: пока бот лежит, апдейты копятся у Telegram и
+  приходят после старта (в polling они сбрасываются drop_pending_updates).
+
+Глубина очереди, задержка от приёма до начала обработки (lag) и время обработки —
+в cache_registry под именем webhook (/diag_cache, периодический снимок в лог).
+
+Настройки (env):
+  UPDATES_MODE               — polling (по умолчанию) | webhook
+  WEBHOOK_URL                — публичный https-адрес, который получит Telegram
+  WEBHOOK_SECRET             — секрет для заголовка (по умолчанию случайный на каждый старт)
+  WEBHOOK_LISTEN / _PORT     — где слушать локально (127.0.0.1:8080)
+  WEBHOOK_PATH               — путь запроса (по умолчанию путь из WEBHOOK_URL)
+  WEBHOOK_QUEUE_MAX          — ёмкость очереди (по умолчанию 500)
+  WEBHOOK_WORKERS            — воркеров обработки (по умолчанию 32)
+  WEBHOOK_ENQUEUE_WAIT_SEC   — сколько запрос ждёт места в полной очереди (по умолчанию 1)
+  WEBHOOK_MAX_CONNECTIONS    — max_connections для setWebhook (по умолчанию 40)
+"""
+from __future__ import annotations
+
+import asyncio
+import hmac
+import json
+import logging
+import os
+import secrets
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from telegram import Update
+
+from bot.services.cache_registry import cache_registry
+
+log = logging.getLogger(__name__)
+
+MODE = (os.getenv("UPDATES_MODE", "polling") or "polling").strip().lower()
+URL = os.getenv("WEBHOOK_URL", "")
+LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1") or "127.0.0.1"
+PORT = int(os.getenv("WEBHOOK_PORT", "8080") or 8080)
+PATH = os.getenv("WEBHOOK_PATH", "") or urlsplit(URL).path or "/"
+QUEUE_MAX = int(os.getenv("WEBHOOK_QUEUE_MAX", "500") or 500)
+WORKERS = int(os.getenv("WEBHOOK_WORKERS", "32") or 32)
+ENQUEUE_WAIT_SEC = float(os.getenv("WEBHOOK_ENQUEUE_WAIT_SEC", "1") or 1)
+MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40") or 40)
+
+# Бот обрабатывает только сообщения (команды, текст, документы) и нажатия кнопок;
+# остальное (edited_message, chat_member, …) Telegram даже не присылает
+ALLOWED_UPDATES = [Update.MESSAGE, Update.CALLBACK_QUERY]
+
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+MAX_BODY = 1 << 20
+IDLE_SEC = 75.0
+SEEN_MAX = 2048
+WINDOW = 1024
+
+_REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found",
+            405: "Method Not Allowed", 413: "Payload Too Large", 503: "Service Unavailable"}
+
+
+def enabled() -> bool:
+    return MODE == "webhook"
+
+
+def _pct(values: Deque[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    vals = sorted(values)
+    return round(vals[min(len(vals) - 1, int(len(vals) * q))] * 1000, 1)
+
+
+class WebhookServer:
+    def __init__(
+        self,
+        application: Any,
+        *,
+        path: str = PATH,
+        secret: Optional[str] = None,
+        listen: str = LISTEN,
+        port: int = PORT,
+        queue_max: int = QUEUE_MAX,
+        workers: int = WORKERS,
+        enqueue_wait: float = ENQUEUE_WAIT_SEC,
+    ) -> None:
+        self.application = application
+        self.path = path
+        self.secret = secret or os.getenv("WEBHOOK_SECRET") or secrets.token_urlsafe(32)
+        self.listen = listen
+        self.port = port
+        self.workers = workers
+        self.enqueue_wait = enqueue_wait
+        self._queue: "asyncio.Queue[Tuple[float, Update]]" = asyncio.Queue(maxsize=queue_max)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._tasks: List[asyncio.Task] = []
+        self._conns: Set[asyncio.StreamWriter] = set()
+        self._seen: Set[int] = set()
+        self._seen_order: Deque[int] = deque()
+        self._lags: Deque[float] = deque(maxlen=WINDOW)
+        self._handle_times: Deque[float] = deque(maxlen=WINDOW)
+        self._busy = 0
+        self._shedding = False
+        self._stats: Dict[str, int] = {
+            "received": 0, "accepted": 0, "waited": 0, "shed": 0, "duplicates": 0,
+            "forbidden": 0, "bad_requests": 0, "processed": 0, "errors": 0, "max_depth": 0,
+        }
+
+    # ---------- жизненный цикл ----------
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, self.listen, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._tasks = [asyncio.create_task(self._worker(), name=f"webhook-worker-{i}") for i in range(self.workers)]
+        cache_registry.register("webhook", self.info)
+        log.info("Webhook listener on %s:%s%s (queue %s, workers %s)",
+                 self.listen, self.port, self.path, self._queue.maxsize, self.workers)
+
+    async def set_webhook(self, url: str = URL, max_connections: int = MAX_CONNECTIONS) -> None:
+        if not url:
+            raise RuntimeError("UPDATES_MODE=webhook, но не задан WEBHOOK_URL.")
+        # drop_pending_updates=False: накопленное, пока бот лежал, придёт сейчас
+        await self.application.bot.set_webhook(
+            url=url,
+            secret_token=self.secret,
+            allowed_updates=ALLOWED_UPDATES,
+            max_connections=max_connections,
+            drop_pending_updates=False,
+        )
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Перестать принимать запросы, дообработать очередь (не дольше drain_timeout)."""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._conns):       # простаивающие keep-alive соединения
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("Webhook: %s updates left unprocessed on shutdown", self._queue.qsize())
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        cache_registry.unregister("webhook")
+
+    # ---------- приём ----------
+    async def handle(self, method: str, target: str, headers: Dict[str, str], body: bytes) -> int:
+        """Разобрать один запрос Telegram; возвращает HTTP-статус ответа."""
+        if target.split("?", 1)[0] != self.path:
+            return 404
+        if method != "POST":
+            return 405
+        self._stats["received"] += 1
+        token = headers.get(SECRET_HEADER, "").encode("latin-1")
+        if not hmac.compare_digest(token, self.secret.encode("latin-1")):
+            self._stats["forbidden"] += 1
+            return 403
+        try:
+            update = Update.de_json(json.loads(body), self.application.bot)
+        except Exception as e:
+            self._stats["bad_requests"] += 1
+            log.warning("Webhook: bad update payload: %s", e)
+            return 400
+        if update.update_id in self._seen:
+            self._stats["duplicates"] += 1
+            return 200
+
+        item = (time.monotonic(), update)
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._stats["waited"] += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), timeout=self.enqueue_wait)
+            except asyncio.TimeoutError:
+                self._stats["shed"] += 1
+                if not self._shedding:
+                    self._shedding = True
+                    log.warning("Webhook: queue full (%s), answering 503 until workers catch up",
+                                self._queue.maxsize)
+                return 503
+        if self._shedding:
+            self._shedding = False
+            log.info("Webhook: queue accepts updates again (depth %s)", self._queue.qsize())
+
+        self._remember(update.update_id)
+        self._stats["accepted"] += 1
+        self._stats["max_depth"] = max(self._stats["max_depth"], self._queue.qsize())
+        return 200
+
+    def _remember(self, update_id: int) -> None:
+        self._seen.add(update_id)
+        self._seen_order.append(update_id)
+        if len(self._seen_order) > SEEN_MAX:
+            self._seen.discard(self._seen_order.popleft())
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Минимальный HTTP/1.1: Content-Length, keep-alive (Telegram держит соединения)."""
+        self._conns.add(writer)
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=IDLE_SEC)
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+                    return
+                request_line, *lines = head.decode("latin-1").split("\r\n")
+                parts = request_line.split(" ")
+                if len(parts) != 3:
+                    await self._respond(writer, 400, keep_alive=False)
+                    return
+                method, target, version = parts
+                headers: Dict[str, str] = {}
+                for line in lines:
+                    name, sep, value = line.partition(":")
+                    if sep:
+                        headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", "0"))
+                except ValueError:
+                    length = -1
+                if length < 0 or length > MAX_BODY or "transfer-encoding" in headers:
+                    await self._respond(writer, 413 if length > MAX_BODY else 400, keep_alive=False)
+                    return
+                try:
+                    body = await asyncio.wait_for(reader.readexactly(length), timeout=IDLE_SEC) if length else b""
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    return
+                status = await self.handle(method, target, headers, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self._respond(writer, status, keep_alive=keep_alive)
+                if not keep_alive:
+                    return
+        except ConnectionError:
+            pass
+        finally:
+            self._conns.discard(writer)
+            writer.close()
+
+    @staticmethod
+    async def _respond(writer: asyncio.StreamWriter, status: int, *, keep_alive: bool) -> None:
+        extra = "Retry-After: 1\r\n" if status == 503 else ""
+        writer.write(
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+            f"Content-Length: 0\r\n{extra}"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+    # ---------- обработка ----------
+    async def _worker(self) -> None:
+        while True:
+            received_at, update = await self._queue.get()
+            started = time.monotonic()
+            self._lags.append(started - received_at)
+            self._busy += 1
+            try:
+                await self.application.process_update(update)
+                self._stats["processed"] += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                log.warning("Webhook: update %s failed: %s", update.update_id, e)
+            finally:
+                self._busy -= 1
+                self._handle_times.append(time.monotonic() - started)
+                self._queue.task_done()
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "entries": self._queue.qsize(),
+            "queue_max": self._queue.maxsize,
+            "busy": self._busy,
+            "workers": len(self._tasks),
+            **self._stats,
+            "lag_p50_ms": _pct(self._lags, 0.5),
+            "lag_p95_ms": _pct(self._lags, 0.95),
+            "lag_max_ms": _pct(self._lags, 1.0),
+            "handle_p50_ms": _pct(self._handle_times, 0.5),
+            "handle_p95_ms": _pct(self._handle_times, 0.95),
+        }
@@ -0,0 +1,239 @@
+# bot/utils/callback_router.py
+"""
+Единый роутер callback-кнопок вместо цепочки CallbackQueryHandler с regex.
+
+Маршруты:
+    exact("main_menu", handler)                       — точное совпадение (dict)
+    prefix("pay_rub_", handler, str)                  — самый длинный префикс (trie)
+    prefix("consultation_pay:", handler, one_of("rub", "crypto", "eur"), str)
+
+Остаток после префикса режется по ":" ровно на столько частей, сколько задано
+конвертеров, и каждая часть приводится своим конвертером; хендлер вызывается как
+handler(update, context, *args). Без конвертеров — handler(update, context).
+Если остаток не разобрался (не то число частей, конвертер бросил ValueError),
+маршрут считается несовпавшим: апдейт уходит следующим хендлерам (как при
+несработавшем regex), например в ConversationHandler.
+
+keyboard_callbacks() статически собирает все callback_data из модулей клавиатур
+(keyboards.py, user_keyboards.py, admin_keyboards.py), unrouted() проверяет, что
+у каждого есть маршрут — вызывается на старте.
+"""
+from __future__ import annotations
+
+import ast
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from telegram import Update
+from telegram.ext import BaseHandler, CallbackQueryHandler, ConversationHandler
+
+log = logging.getLogger(__name__)
+
+_HERE = os.path.dirname(__file__)
+KEYBOARD_MODULES = tuple(
+    os.path.join(_HERE, name) for name in ("keyboards.py", "user_keyboards.py", "admin_keyboards.py")
+)
+
+Converter = Callable[[str], Any]
+
+
+class Route:
+    __slots__ = ("key", "handler", "converters", "is_prefix")
+
+    def __init__(self, key: str, handler: Callable, converters: Sequence[Converter] = (), is_prefix: bool = False):
+        self.key = key
+        self.handler = handler
+        self.converters = tuple(converters)
+        self.is_prefix = is_prefix
+
+    def parse(self, rest: str) -> Optional[Tuple[Any, ...]]:
+        if not self.converters:
+            return ()
+        parts = rest.split(":", len(self.converters) - 1)
+        if len(parts) != len(self.converters) or not all(parts):
+            return None
+        try:
+            return tuple(conv(part) for conv, part in zip(self.converters, parts))
+        except (TypeError, ValueError):
+            return None
+
+    def __repr__(self) -> str:
+        name = getattr(self.handler, "__name__", repr(self.handler))
+        return f"Route({self.key!r}{'*' if self.is_prefix else ''} -> {name})"
+
+
+def exact(key: str, handler: Callable) -> Route:
+    return Route(key, handler, (), is_prefix=False)
+
+
+def prefix(key: str, handler: Callable, *converters: Converter) -> Route:
+    return Route(key, handler, converters, is_prefix=True)
+
+
+def one_of(*choices: str) -> Converter:
+    """Конвертер-перечисление: пропускает только заданные значения."""
+    allowed = frozenset(choices)
+
+    def conv(value: str) -> str:
+        if value not in allowed:
+            raise ValueError(value)
+        return value
+
+    conv.__name__ = "one_of(" + "|".join(choices) + ")"
+    return conv
+
+
+class CallbackRouter(BaseHandler[Update, Any, Any]):
+    """
+    Один PTB-хендлер на все callback-кнопки: O(1) для точных ключей и O(len(data))
+    для префиксных — независимо от числа маршрутов.
+    """
+
+    def __init__(self, routes: Iterable[Route] = (), block: bool = True):
+        super().__init__(self._dispatch, block=block)
+        self._exact: Dict[str, Route] = {}
+        self._trie: Dict[str, Any] = {}
+        self._stats: Dict[str, int] = {"routed": 0, "unrouted": 0, "bad_args": 0}
+        for r in routes:
+            self.add(r)
+
+    # ---------- регистрация ----------
+    def add(self, route: Route) -> None:
+        if route.is_prefix:
+            node = self._trie
+            for ch in route.key:
+                node = node.setdefault(ch, {})
+            if None in node:
+                raise ValueError(f"duplicate callback prefix route: {route.key!r}")
+            node[None] = route
+        else:
+            if route.key in self._exact:
+                raise ValueError(f"duplicate callback route: {route.key!r}")
+            self._exact[route.key] = route
+
+    def routes(self) -> List[Route]:
+        out = list(self._exact.values())
+        stack = [self._trie]
+        while stack:
+            node = stack.pop()
+            for ch, child in node.items():
+                if ch is None:
+                    out.append(child)
+                else:
+                    stack.append(child)
+        return out
+
+    # ---------- поиск ----------
+    def _prefixes(self, data: str) -> List[Tuple[Route, str]]:
+        """Все префиксные маршруты для data — от самого длинного к короткому."""
+        found: List[Tuple[Route, str]] = []
+        node = self._trie
+        for i, ch in enumerate(data):
+            if None in node:
+                found.append((node[None], data[i:]))
+            node = node.get(ch)
+            if node is None:
+                break
+        else:
+            if None in node:
+                found.append((node[None], ""))
+        found.reverse()
+        return found
+
+    def resolve(self, data: str) -> Optional[Tuple[Route, Tuple[Any, ...]]]:
+        route = self._exact.get(data)
+        if route is not None:
+            return route, ()
+        for route, rest in self._prefixes(data):
+            args = route.parse(rest)
+            if args is not None:
+                return route, args
+            self._stats["bad_args"] += 1
+        return None
+
+    def covers_prefix(self, head: str) -> bool:
+        """Есть ли префиксный маршрут, ключ которого — префикс head (для f-строк клавиатур)."""
+        return bool(head) and bool(self._prefixes(head))
+
+    def stats(self) -> Dict[str, int]:
+        return {"routes": len(self.routes()), **self._stats}
+
+    # ---------- PTB ----------
+    def check_update(self, update: object) -> Optional[Tuple[Route, Tuple[Any, ...]]]:
+        if not (isinstance(update, Update) and update.callback_query):
+            return None
+        data = update.callback_query.data
+        if not isinstance(data, str):
+            return None
+        hit = self.resolve(data)
+        self._stats["routed" if hit else "unrouted"] += 1
+        return hit
+
+    async def handle_update(self, update, application, check_result, context):
+        route, args = check_result
+        return await route.handler(update, context, *args)
+
+    async def _dispatch(self, update, context):
+        # PTB зовёт handle_update с уже разобранным check_result; это — для прямого вызова
+        hit = self.check_update(update)
+        if hit:
+            route, args = hit
+            return await route.handler(update, context, *args)
+
+
+# ---------- статическая проверка клавиатур ----------
+def keyboard_callbacks(path: str) -> List[Tuple[str, bool, int]]:
+    """
+    Все callback_data из модуля клавиатур: (значение, is_prefix, lineno).
+    Литерал — точное значение; f-строка — её постоянное начало (is_prefix=True);
+    переменные (back_pattern и т.п.) не проверяются.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    out: List[Tuple[str, bool, int]] = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.keyword) or node.arg != "callback_data":
+            continue
+        value = node.value
+        if isinstance(value, ast.Constant) and isinstance(value.value, str):
+            out.append((value.value, False, value.lineno))
+        elif isinstance(value, ast.JoinedStr):
+            head = ""
+            for part in value.values:
+                if not (isinstance(part, ast.Constant) and isinstance(part.value, str)):
+                    break
+                head += part.value
+            out.append((head, True, value.lineno))
+    return out
+
+
+def _patterns(handlers: Iterable[Any]) -> List[str]:
+    """regex-паттерны CallbackQueryHandler вне роутера (в т.ч. entry_points диалогов)."""
+    out: List[str] = []
+    for h in handlers:
+        if isinstance(h, ConversationHandler):
+            out.extend(_patterns(h.entry_points))
+        elif isinstance(h, CallbackQueryHandler) and isinstance(h.pattern, (str, re.Pattern)):
+            out.append(getattr(h.pattern, "pattern", h.pattern))
+    return out
+
+
+def unrouted(
+    router: CallbackRouter,
+    handlers: Iterable[Any] = (),
+    paths: Sequence[str] = KEYBOARD_MODULES,
+) -> List[str]:
+    """callback_data из клавиатур, которые никто не обработает."""
+    patterns = _patterns(handlers)
+    missing: List[str] = []
+    for path in paths:
+        for value, is_prefix, lineno in keyboard_callbacks(path):
+            if is_prefix:
+                ok = router.covers_prefix(value)
+            else:
+                ok = router.resolve(value) is not None or any(re.match(p, value) for p in patterns)
+            if not ok:
+                missing.append(f"{value}{'*' if is_prefix else ''} ({os.path.basename(path)}:{lineno})")
+    return missing
@@ -5,40 +5,69 @@ import base64
 import threading
 from typing import Dict, Tuple, Any, Optional
 
+from bot.services.cache_registry import age_stats, cache_registry
+
 class CbStore:
     def __init__(self, ttl_seconds: int = 60 * 60 * 48, max_items: int = 5000):
         self.ttl = ttl_seconds
         self.max_items = max_items
-        self._data: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._data: Dict[str, Tuple[Dict[str, Any], float, float]] = {}   # key -> (payload, exp, created)
         self._lock = threading.Lock()
+        # evictions — все удаления (истёкшие + вытеснение по max_items), expired — только истёкшие
+        self._stats: Dict[str, int] = {"puts": 0, "hits": 0, "misses": 0, "evictions": 0, "expired": 0}
 
     def _cleanup(self):
         now = time.time()
-        dead = [k for k, (_, exp) in self._data.items() if exp < now]
+        dead = [k for k, (_, exp, _) in self._data.items() if exp < now]
         for k in dead:
             self._data.pop(k, None)
+        self._stats["expired"] += len(dead)
+        self._stats["evictions"] += len(dead)
         if len(self._data) > self.max_items:
-            for k, _ in sorted(self._data.items(), key=lambda kv: kv[1][1])[:len(self._data) - self.max_items]:
+            over = sorted(self._data.items(), key=lambda kv: kv[1][1])[:len(self._data) - self.max_items]
+            for k, _ in over:
                 self._data.pop(k, None)
+            self._stats["evictions"] += len(over)
 
     def put(self, payload: Dict[str, Any], ttl: Optional[int] = None, key: Optional[str] = None) -> str:
         with self._lock:
             self._cleanup()
             if key is None:
                 key = base64.urlsafe_b64encode(secrets.token_bytes(8)).decode().rstrip("=").lower()
-            exp = time.time() + (ttl if ttl is not None else self.ttl)
-            self._data[key] = (payload, exp)
+            now = time.time()
+            exp = now + (ttl if ttl is not None else self.ttl)
+            self._data[key] = (payload, exp, now)
+            self._stats["puts"] += 1
             return key
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         with self._lock:
             item = self._data.get(key)
             if not item:
+                self._stats["misses"] += 1
                 return None
-            payload, exp = item
+            payload, exp, _ = item
             if exp < time.time():
                 self._data.pop(key, None)
+                self._stats["expired"] += 1
+                self._stats["evictions"] += 1
+                self._stats["misses"] += 1
                 return None
+            self._stats["hits"] += 1
             return payload
 
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.time()
+            return {
+                "entries": len(self._data),
+                **age_stats(now - created for _, _, created in self._data.values()),
+                **self._stats,
+                "max_items": self.max_items,
+            }
+
+    def root(self) -> Dict[str, Tuple[Dict[str, Any], float, float]]:
+        return self._data
+
 cb_store = CbStore()
+cache_registry.register("cb_store", cb_store.info, root=cb_store.root)
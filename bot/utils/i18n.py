@@ -0,0 +1,94 @@
+# bot/utils/i18n.py
+"""
+Проверка и fallback для текстов (LANGUAGES, DESCRIPTIONS, WEBINAR_DESCRIPTIONS).
+
+Тексты остаются словарями {lang: {key: text}} в своих модулях; namespace() оборачивает
+их в dict-подклассы, которые добавляют только __missing__:
+
+- ключ, которого нет в языке, берётся из языка по умолчанию (DEFAULT_LANG); ключ,
+  которого нет нигде, возвращается как есть (и пишется в лог один раз) — вместо
+  KeyError, роняющего хендлер;
+- NS[lang] для неизвестного языка отдаёт тексты языка по умолчанию.
+
+Найденный ключ ищется обычным поиском dict; get(), итерация и `in` — как у dict.
+При создании namespace проверяет покрытие ключей и {плейсхолдеров} между языками
+(validate) и пишет расхождения в лог.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import string
+from typing import Any, Dict, List, Mapping, Optional
+
+log = logging.getLogger(__name__)
+
+DEFAULT_LANG = os.getenv("DEFAULT_LANG", "ru") or "ru"
+
+
+def _fields(text: Any) -> frozenset:
+    if not isinstance(text, str) or "{" not in text:   # у большинства текстов полей нет
+        return frozenset()
+    try:
+        return frozenset(f for _, f, _, _ in string.Formatter().parse(text) if f)
+    except ValueError:
+        return frozenset()
+
+
+def validate(source: Mapping[str, Mapping[str, Any]], default: str = DEFAULT_LANG) -> List[str]:
+    """Расхождения между языками: нет ключа, лишний ключ, разные {плейсхолдеры}."""
+    problems: List[str] = []
+    base = source.get(default) or {}
+    for lang, table in source.items():
+        if lang == default:
+            continue
+        missing = sorted(set(base) - set(table))
+        extra = sorted(set(table) - set(base))
+        if missing:
+            problems.append(f"{lang}: missing {', '.join(missing)}")
+        if extra:
+            problems.append(f"{lang}: not in {default}: {', '.join(extra)}")
+        for key in sorted(set(base) & set(table)):
+            if _fields(base[key]) != _fields(table[key]):
+                problems.append(f"{lang}: placeholders differ in {key}")
+    return problems
+
+
+class Table(dict):
+    """Тексты одного языка; неизвестный ключ не роняет хендлер."""
+
+    def __init__(self, name: str, lang: str, texts: Mapping[str, Any], fallback: Optional[Dict[str, Any]]) -> None:
+        super().__init__(texts)
+        self.name = name
+        self.lang = lang
+        self.fallback = fallback
+
+    def __missing__(self, key: str) -> Any:
+        if self.fallback is not None and key in self.fallback:
+            return self.fallback[key]
+        if (self.name, self.lang, key) not in _missed:
+            _missed.add((self.name, self.lang, key))
+            log.warning("i18n %s: no key %r for %s", self.name, key, self.lang)
+        return key
+
+
+class Namespace(dict):
+    """{lang: Table}; неизвестный язык — язык по умолчанию."""
+
+    def __init__(self, tables: Dict[str, Table], default: str) -> None:
+        super().__init__(tables)
+        self.default = default
+
+    def __missing__(self, lang: str) -> Table:
+        return dict.__getitem__(self, self.default)
+
+
+_missed: set = set()
+
+
+def namespace(name: str, source: Dict[str, Dict[str, Any]], default: str = DEFAULT_LANG) -> Namespace:
+    for problem in validate(source, default):
+        log.warning("i18n %s: %s", name, problem)
+    base = Table(name, default, source.get(default) or {}, None)
+    tables = {lang: base if lang == default else Table(name, lang, texts, base) for lang, texts in source.items()}
+    return Namespace(tables, default)
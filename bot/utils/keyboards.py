@@ -1,7 +1,9 @@
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from bot.utils.languages import LANGUAGES
+from bot.utils.screens import screen
 
 
+@screen
 def get_language_keyboard():
     """Клавиатура выбора языка"""
     return InlineKeyboardMarkup([
@@ -9,12 +11,14 @@ def get_language_keyboard():
         [InlineKeyboardButton(LANGUAGES["en"]["language_name"], callback_data="set_lang_en")]
     ])
 
+@screen
 def get_welcome_keyboard(lang):
     """Клавиатура приветствия после выбора языка"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["register"], callback_data="start_register")]
     ])
 
+@screen
 def get_main_menu_keyboard(lang):
     """Клавиатура главного меню с прямой ссылкой"""
     return InlineKeyboardMarkup([
@@ -27,6 +31,7 @@ def get_main_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["personal_account"], callback_data="menu_personal_account")]
     ])
 
+@screen
 def get_products_menu_keyboard(lang):
     """Клавиатура меню продуктов"""
     return InlineKeyboardMarkup([
@@ -38,6 +43,7 @@ def get_products_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_webinars_menu_keyboard(lang):
     """Клавиатура меню вебинаров"""
     return InlineKeyboardMarkup([
@@ -51,6 +57,7 @@ def get_webinars_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_products")]
     ])
 
+@screen
 def get_webinar_details_keyboard(lang, webinar_id):
     """Клавиатура деталей вебинара"""
     return InlineKeyboardMarkup([
@@ -58,6 +65,7 @@ def get_webinar_details_keyboard(lang, webinar_id):
         [InlineKeyboardButton(LANGUAGES[lang]['back'], callback_data="menu_webinars")]
     ])
 
+@screen
 def get_payment_methods_keyboard(lang, webinar_id):
     """Клавиатура выбора способа оплаты"""
     return InlineKeyboardMarkup([
@@ -67,6 +75,7 @@ def get_payment_methods_keyboard(lang, webinar_id):
         [InlineKeyboardButton(LANGUAGES[lang]['back'], callback_data=f"webinar_details_{webinar_id}")]
     ])
 
+@screen
 def get_back_to_payment_methods_keyboard(webinar_id, lang):
     """Клавиатура с кнопкой возврата к выбору валюты"""
     return InlineKeyboardMarkup([
@@ -74,12 +83,14 @@ def get_back_to_payment_methods_keyboard(webinar_id, lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data=f"payment_methods_{webinar_id}")]
     ])
 
+@screen
 def get_private_channel_menu_keyboard(lang):
     """Клавиатура меню приватного канала"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_products")]
     ])
 
+@screen
 def get_already_registered_keyboard(lang):
     """Клавиатура для уже зарегистрированных пользователей"""
     return InlineKeyboardMarkup([
@@ -88,6 +99,7 @@ def get_already_registered_keyboard(lang):
 
 # ЗДЕСЬ УНИКАЛЬНЫЕ КНОПКИ ДЛЯ ВЕБА С ГИПНОЗОМ
 
+@screen
 def get_hypno_webinar_keyboard(lang):
     """Клавиатура выбора частей вебинара"""
     return InlineKeyboardMarkup([
@@ -97,6 +109,7 @@ def get_hypno_webinar_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="back_to_webinars")]
     ])
 
+@screen
 def get_hypno_payment_keyboard(lang, part):
     """Клавиатура выбора валюты для конкретной части"""
     return InlineKeyboardMarkup([
@@ -106,6 +119,7 @@ def get_hypno_payment_keyboard(lang, part):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="back_to_hypno_parts")]
     ])
 
+@screen
 def get_back_to_hypno_payment_keyboard(lang, part):
     """Клавиатура с кнопкой возврата к выбору валюты"""
     return InlineKeyboardMarkup([
@@ -115,6 +129,7 @@ def get_back_to_hypno_payment_keyboard(lang, part):
 
 # ЗДЕСЬ УНИКАЛЬНЫЕ КНОПКИ ДЛЯ ВЕБА ПО ФЕМДОМУ
 
+@screen
 def get_femdom_webinar_keyboard(lang):
     """Клавиатура выбора частей вебинара для Femdom"""
     return InlineKeyboardMarkup([
@@ -124,6 +139,7 @@ def get_femdom_webinar_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="back_to_webinars")]
     ])
 
+@screen
 def get_femdom_payment_keyboard(lang, part):
     """Клавиатура выбора валюты для конкретной части Femdom"""
     return InlineKeyboardMarkup([
@@ -133,6 +149,7 @@ def get_femdom_payment_keyboard(lang, part):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="back_to_femdom_parts")]
     ])
 
+@screen
 def get_back_to_femdom_payment_keyboard(lang, part):
     """Клавиатура с кнопкой возврата к выбору валюты для Femdom"""
     return InlineKeyboardMarkup([
@@ -140,6 +157,7 @@ def get_back_to_femdom_payment_keyboard(lang, part):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data=f"femdom_back_to_payment_{part}")]
     ])
 
+@screen
 def get_cooperation_keyboard(lang):
     """Клавиатура для раздела сотрудничества"""
     return InlineKeyboardMarkup([
@@ -148,12 +166,14 @@ def get_cooperation_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"],callback_data="main_menu")]
     ])
 
+@screen
 def get_back_to_menu_keyboard(lang):
     """Универсальная клавиатура с кнопкой 'Назад в меню'"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="online_session")]
     ])
 
+@screen
 def get_consultations_menu_keyboard(lang: str):
     """Клавиатура меню консультаций"""
     return InlineKeyboardMarkup([
@@ -162,6 +182,7 @@ def get_consultations_menu_keyboard(lang: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_products")]
     ])
 
+@screen
 def get_personal_consultation_keyboard(lang: str):
     """Клавиатура подменю 'Для себя'"""
     return InlineKeyboardMarkup([
@@ -170,6 +191,7 @@ def get_personal_consultation_keyboard(lang: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_consultations")]
     ])
 
+@screen
 def get_company_consultation_keyboard(lang: str):
     """Клавиатура подменю 'Для компании'"""
     return InlineKeyboardMarkup([
@@ -178,6 +200,7 @@ def get_company_consultation_keyboard(lang: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_consultations")]
     ])
 
+@screen
 def get_consultation_payment_keyboard(lang: str, consultation_type: str):
     """Клавиатура выбора валюты для консультации"""
     return InlineKeyboardMarkup([
@@ -188,6 +211,7 @@ def get_consultation_payment_keyboard(lang: str, consultation_type: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data=f"consultation_back:{consultation_type}")]
     ])
 
+@screen
 def get_back_to_consultation_type_keyboard(lang: str, consultation_type: str):
     """Клавиатура с кнопкой возврата к выбору типа консультации"""
     return InlineKeyboardMarkup([
@@ -197,6 +221,7 @@ def get_back_to_consultation_type_keyboard(lang: str, consultation_type: str):
         )]
     ])
 
+@screen
 def get_back_to_consultation_payment_keyboard(lang: str, consultation_type: str):
     """Клавиатура возврата к выбору валюты"""
     return InlineKeyboardMarkup([
@@ -206,6 +231,7 @@ def get_back_to_consultation_payment_keyboard(lang: str, consultation_type: str)
         )]
     ])
 
+@screen
 def get_mentoring_menu_keyboard(lang):
     """Клавиатура меню менторинга"""
     return InlineKeyboardMarkup([
@@ -214,6 +240,7 @@ def get_mentoring_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_products")]
     ])
 
+@screen
 def get_mentoring_keyboard(lang: str, mentoring_type: str):
     """Клавиатура для раздела менторинга"""
     return InlineKeyboardMarkup([
@@ -222,12 +249,14 @@ def get_mentoring_keyboard(lang: str, mentoring_type: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_mentoring")]
     ])
 
+@screen
 def get_mentoring_thanks_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура после отправки заявки на менторинг"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_mentoring")]
     ])
 
+@screen
 def get_audit_keyboard(lang: str, audit_type: str):
     """Клавиатура для раздела аудита"""
     return InlineKeyboardMarkup([
@@ -236,6 +265,7 @@ def get_audit_keyboard(lang: str, audit_type: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_page_audit")]
     ])
 
+@screen
 def get_page_audit_menu_keyboard(lang):
     """Клавиатура меню аудита страниц"""
     return InlineKeyboardMarkup([
@@ -244,12 +274,14 @@ def get_page_audit_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_products")]
     ])
 
+@screen
 def get_audit_thanks_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура после отправки заявки на аудит"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_page_audit")]
     ])
 
+@screen
 def get_buy_ads_keyboard(lang: str):
     """Клавиатура для раздела покупки рекламы"""
     return InlineKeyboardMarkup([
@@ -258,12 +290,14 @@ def get_buy_ads_keyboard(lang: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_buy_ads_thanks_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура после отправки заявки на покупку рекламы"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_ask_question_keyboard(lang: str):
     """Клавиатура для раздела 'Задать вопрос'"""
     return InlineKeyboardMarkup([
@@ -271,6 +305,7 @@ def get_ask_question_keyboard(lang: str):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_session_menu_keyboard(lang):
     """Клавиатура меню сессий"""
     return InlineKeyboardMarkup([
@@ -279,6 +314,7 @@ def get_session_menu_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_offline_session_keyboard(lang):
     """Клавиатура для офлайн сессии"""
     return InlineKeyboardMarkup([
@@ -287,6 +323,7 @@ def get_offline_session_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_book_session")]
     ])
 
+@screen
 def get_online_session_payment_keyboard(lang):
     """Клавиатура выбора валюты для онлайн сессии"""
     return InlineKeyboardMarkup([
@@ -296,12 +333,14 @@ def get_online_session_payment_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="online_session")]
     ])
 
+@screen
 def get_offline_session_thanks_keyboard(lang):
     """Клавиатура после отправки заявки на офлайн сессию"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_book_session")]
     ])
 
+@screen
 def get_online_session_keyboard(lang):
     """Клавиатура для онлайн сессии"""
     return InlineKeyboardMarkup([
@@ -309,6 +348,7 @@ def get_online_session_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_book_session")]
     ])
 
+@screen
 def get_back_to_currency_selection_keyboard(lang):
     """Клавиатура для возврата к выбору валюты"""
     return InlineKeyboardMarkup([
@@ -316,18 +356,21 @@ def get_back_to_currency_selection_keyboard(lang):
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="online_session_payment")]
     ])
 
+@screen
 def get_upload_instructions_keyboard(lang: str, back_pattern: str) -> InlineKeyboardMarkup:
     """Клавиатура для экрана загрузки скриншота"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data=back_pattern)]
     ])
 
+@screen
 def get_success_upload_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура после успешной загрузки скриншота"""
     return InlineKeyboardMarkup([
         [InlineKeyboardButton(LANGUAGES[lang]["back_to_menu"], callback_data="main_menu")]
     ])
 
+@screen
 def get_invalid_file_keyboard(lang: str, back_pattern: str = 'main_menu') -> InlineKeyboardMarkup:
     """Клавиатура для сообщения о неверном формате файла"""
     return InlineKeyboardMarkup([
@@ -336,6 +379,7 @@ def get_invalid_file_keyboard(lang: str, back_pattern: str = 'main_menu') -> Inl
 
 
 
+@screen
 def get_donate_currency_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура выбора валюты для доната (идентична разделам оплаты)"""
     return InlineKeyboardMarkup([
@@ -344,6 +388,7 @@ def get_donate_currency_keyboard(lang: str) -> InlineKeyboardMarkup:
         [InlineKeyboardButton(LANGUAGES[lang]["payment_eur"], callback_data="donate_eur")],
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="menu_personal_account")]
     ])
+@screen
 def get_personal_account_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура личного кабинета"""
     return InlineKeyboardMarkup([
@@ -354,6 +399,7 @@ def get_personal_account_keyboard(lang: str) -> InlineKeyboardMarkup:
         [InlineKeyboardButton(LANGUAGES[lang]["back"], callback_data="main_menu")]
     ])
 
+@screen
 def get_back_to_donate_currency_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Кнопка 'Назад' к выбору валюты доната"""
     return InlineKeyboardMarkup([
@@ -361,6 +407,7 @@ def get_back_to_donate_currency_keyboard(lang: str) -> InlineKeyboardMarkup:
     ])
 
 
+@screen
 def get_donate_details_keyboard(lang: str, currency_key: str) -> InlineKeyboardMarkup:
     """
     Клавиатура на экране реквизитов доната:
@@ -374,6 +421,7 @@ def get_donate_details_keyboard(lang: str, currency_key: str) -> InlineKeyboardM
     ])
 
 
+@screen
 def get_edit_profile_menu_keyboard(lang: str) -> InlineKeyboardMarkup:
     """Клавиатура меню 'Изменить личные данные'"""
     return InlineKeyboardMarkup([
@@ -1,4 +1,6 @@
-LANGUAGES = {
+from bot.utils.i18n import namespace
+
+LANGUAGES = namespace("languages", {
     "ru": {
         "menu_edit_failed": "⚠️ Не удалось обновить меню",
         "menu_update_error": "⚠️ Ошибка при обновлении меню",
@@ -307,4 +309,4 @@ LANGUAGES = {
         "not_specified": "not set",
 
     }
-}
\ No newline at end of file
+})
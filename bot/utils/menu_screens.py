@@ -0,0 +1,120 @@
+# bot/utils/menu_screens.py
+"""
+Готовые экраны (текст + клавиатура) для меню, которые хендлеры раньше собирали
+на каждый клик. Всё мемоизировано через bot.utils.screens.
+"""
+from bot.data.descriptions import DESCRIPTIONS
+from bot.data.webinar_descriptions import WEBINAR_DESCRIPTIONS
+from bot.utils import keyboards as kb
+from bot.utils.languages import LANGUAGES
+from bot.utils.screens import Screen, screen
+
+
+# ---------- главное меню и разделы ----------
+@screen
+def main_menu(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["main_menu"], kb.get_main_menu_keyboard(lang))
+
+
+@screen
+def registration_required(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["registration_required"], kb.get_welcome_keyboard(lang))
+
+
+@screen
+def products_menu(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["products"], kb.get_products_menu_keyboard(lang))
+
+
+@screen
+def consultations_menu(lang: str) -> Screen:
+    return Screen(DESCRIPTIONS[lang]["consultations"], kb.get_consultations_menu_keyboard(lang))
+
+
+@screen
+def mentoring_menu(lang: str) -> Screen:
+    return Screen(DESCRIPTIONS[lang]["mentoring"], kb.get_mentoring_menu_keyboard(lang))
+
+
+@screen
+def page_audit_menu(lang: str) -> Screen:
+    return Screen(DESCRIPTIONS[lang]["page_audit"], kb.get_page_audit_menu_keyboard(lang))
+
+
+@screen
+def private_channel_menu(lang: str) -> Screen:
+    return Screen(DESCRIPTIONS[lang]["private_channel"], kb.get_private_channel_menu_keyboard(lang))
+
+
+@screen
+def session_menu(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["book_session"], kb.get_session_menu_keyboard(lang))
+
+
+@screen
+def personal_account(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["personal_account"], kb.get_personal_account_keyboard(lang))
+
+
+@screen
+def donate_menu(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["donate"], kb.get_donate_currency_keyboard(lang))
+
+
+@screen
+def webinars_menu(lang: str) -> Screen:
+    return Screen(LANGUAGES[lang]["webinars_title"], kb.get_webinars_menu_keyboard(lang))
+
+
+# ---------- экраны с собранным текстом ----------
+@screen
+def personal_audit(lang: str) -> Screen:
+    text = "🔍 <b>{}</b>\n\n{}\n\n{}".format(
+        LANGUAGES[lang]["audit_personal"],
+        LANGUAGES[lang]["audit_personal_desc"],
+        "После заполнения формы мы свяжемся с вами для уточнения деталей." if lang == "ru" else
+        "After submitting the form, we'll contact you to discuss details."
+    )
+    return Screen(text, kb.get_audit_keyboard(lang, "personal"))
+
+
+@screen
+def buy_ads(lang: str) -> Screen:
+    text = (
+        f"{LANGUAGES[lang]['buy_ads_title']}\n\n"
+        f"{LANGUAGES[lang]['buy_ads_desc']}\n\n"
+        "После заполнения формы мы свяжемся с вами для уточнения деталей."
+        if lang == "ru" else
+        f"{LANGUAGES[lang]['buy_ads_title']}\n\n"
+        f"{LANGUAGES[lang]['buy_ads_desc']}\n\n"
+        "After submitting the form, we'll contact you to discuss details."
+    )
+    return Screen(text, kb.get_buy_ads_keyboard(lang))
+
+
+@screen
+def consultation_type(lang: str, consultation_type: str) -> Screen:
+    description = DESCRIPTIONS[lang].get(
+        f"consultation_{consultation_type}_desc",
+        LANGUAGES[lang].get("default_description", "")
+    )
+    return Screen(
+        f"{description}\n\n{LANGUAGES[lang]['choose_payment']}",
+        kb.get_consultation_payment_keyboard(lang, consultation_type),
+    )
+
+
+@screen
+def webinar_part_payment(lang: str, webinar: str, part: str) -> Screen:
+    """Выбор способа оплаты части вебинара (hypno / femdom)."""
+    description = WEBINAR_DESCRIPTIONS.get(lang, {}).get(
+        f"webinar_{webinar}_part_{part}",
+        f"Описание части {part} не найдено"
+    )
+    text = (
+        f"💰 <b>Оплата {LANGUAGES[lang][f'part_{part}']}</b>\n\n"
+        f"{description}\n\n"
+        "Выберите способ оплаты:"
+    )
+    keyboard = kb.get_hypno_payment_keyboard if webinar == "hypno" else kb.get_femdom_payment_keyboard
+    return Screen(text, keyboard(lang, part))
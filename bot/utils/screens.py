@@ -0,0 +1,122 @@
+# bot/utils/screens.py
+"""
+Реестр экранов: клавиатуры и пары (текст, клавиатура) строятся один раз
+на (экран, аргументы) и дальше отдаются из кэша.
+
+    @screen
+    def get_products_menu_keyboard(lang): ...
+
+Результаты неизменяемы (InlineKeyboardMarkup в PTB заморожен, Screen — NamedTuple),
+поэтому один объект безопасно отдаётся всем пользователям. Кэш общий, LRU на
+SCREEN_CACHE_MAX записей: аргументы вроде webinar_id приходят из callback_data,
+и их множество не должно расти без ограничений.
+
+prerender() строит на старте все экраны, зависящие только от языка; invalidate()
+сбрасывает кэш, когда перезагружаются источники текстов.
+"""
+from __future__ import annotations
+
+import functools
+import inspect
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Iterable, NamedTuple, Tuple
+
+from telegram import InlineKeyboardMarkup
+
+from bot.services.cache_registry import age_stats, cache_registry
+
+log = logging.getLogger(__name__)
+
+CACHE_MAX = int(os.getenv("SCREEN_CACHE_MAX", "2048") or 2048)
+
+
+class Screen(NamedTuple):
+    text: str
+    reply_markup: InlineKeyboardMarkup
+
+
+class ScreenRegistry:
+    def __init__(self, max_items: int = CACHE_MAX) -> None:
+        self.max_items = max_items
+        self._builders: Dict[str, Callable[..., Any]] = {}
+        self._cache: "OrderedDict[Tuple[Hashable, ...], Tuple[Any, float]]" = OrderedDict()
+        self._stats: Dict[str, int] = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0, "uncacheable": 0}
+
+    def memo(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        name = fn.__name__
+        self._builders[name] = fn
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = (name, args, tuple(sorted(kwargs.items()))) if kwargs else (name, args)
+            try:
+                item = self._cache.get(key)
+            except TypeError:                       # нехэшируемые аргументы — без кэша
+                self._stats["uncacheable"] += 1
+                return fn(*args, **kwargs)
+            if item is not None:
+                self._cache.move_to_end(key)
+                self._stats["hits"] += 1
+                return item[0]
+            self._stats["misses"] += 1
+            value = fn(*args, **kwargs)
+            self._cache[key] = (value, time.time())
+            if len(self._cache) > self.max_items:
+                self._cache.popitem(last=False)
+                self._stats["evictions"] += 1
+            return value
+
+        wrapper.uncached = fn  # type: ignore[attr-defined]
+        return wrapper
+
+    def invalidate(self, reason: str = "") -> None:
+        if self._cache:
+            log.info("screens invalidated (%s): %s entries", reason or "-", len(self._cache))
+        self._cache.clear()
+        self._stats["invalidations"] += 1
+
+    def prerender(self, langs: Iterable[str]) -> int:
+        """Построить экраны, у которых из параметров только язык (или вовсе нет параметров)."""
+        langs = list(langs)
+        built = 0
+        for name, fn in list(self._builders.items()):
+            params = [
+                p for p in inspect.signature(fn).parameters.values()
+                if p.default is inspect.Parameter.empty
+            ]
+            if not params:
+                calls = [()]
+            elif len(params) == 1 and params[0].name == "lang":
+                calls = [(lang,) for lang in langs]
+            else:
+                continue
+            for args in calls:
+                try:
+                    key = (name, args)
+                    if key not in self._cache:
+                        self._cache[key] = (fn(*args), time.time())
+                        built += 1
+                except Exception as e:
+                    log.warning("screen %s%r prerender failed: %s", name, args, e)
+        return built
+
+    def info(self) -> Dict[str, Any]:
+        now = time.time()
+        return {
+            "entries": len(self._cache),
+            **age_stats(now - built_at for _, built_at in self._cache.values()),
+            **self._stats,
+            "screens": len(self._builders),
+            "max_items": self.max_items,
+        }
+
+    def root(self) -> Dict[Tuple[Hashable, ...], Tuple[Any, float]]:
+        return self._cache
+
+
+screens = ScreenRegistry()
+screen = screens.memo
+cache_registry.register("screens", screens.info, root=screens.root)
@@ -0,0 +1,65 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from bot.database.entitlements import Entitlement, EntitlementsStore
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def test_view_is_built_once_and_expired_items_are_dropped():
+    calls = []
+
+    async def loader(tg):
+        calls.append(tg)
+        return [
+            Entitlement("a", "Zeta", None),
+            Entitlement("b", "alpha", _now() + timedelta(days=1)),
+            Entitlement("c", "Old", _now() - timedelta(seconds=1)),
+        ]
+
+    store = EntitlementsStore(loader)
+    first = asyncio.run(store.get(7))
+    assert [i["name"] for i in first] == ["alpha", "Zeta"]
+    assert store.peek(7) == first and calls == [7]
+
+    store.expire_due(_now() + timedelta(days=2))
+    assert [i["name"] for i in store.peek(7)] == ["Zeta"]
+    assert store.info()["expired"] == 1
+
+
+def test_grant_is_visible_immediately_and_invalidate_rebuilds_in_background():
+    rows = [Entitlement("a", "Course", None)]
+
+    async def loader(tg):
+        return list(rows)
+
+    store = EntitlementsStore(loader)
+
+    async def run():
+        await store.build(7)
+        store.grant(7, Entitlement("pay1", "Webinar", _now() + timedelta(days=30)))
+        granted = [i["name"] for i in store.peek(7)]
+        rows.append(Entitlement("pay1", "Webinar", _now() + timedelta(days=30)))
+        store.invalidate(7)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return granted
+
+    assert asyncio.run(run()) == ["Course", "Webinar"]
+    assert [i["name"] for i in store.peek(7)] == ["Course", "Webinar"]
+    assert store.info()["builds"] == 2
+
+
+def test_extended_item_is_not_dropped_by_stale_heap_entry():
+    async def loader(tg):
+        return []
+
+    store = EntitlementsStore(loader)
+    asyncio.run(store.build(7))
+    soon = _now() + timedelta(seconds=10)
+    store.grant(7, Entitlement("p", "Course", soon))
+    store.grant(7, Entitlement("p", "Course", soon + timedelta(days=30)))
+    store.expire_due(soon + timedelta(seconds=1))
+    assert [i["name"] for i in store.peek(7)] == ["Course"]
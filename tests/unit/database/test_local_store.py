@@ -0,0 +1,176 @@
+import asyncio
+
+import httpx
+
+from bot.database import local_store as store_mod
+from bot.database.local_store import LocalStore
+from bot.database.records import decode_payment, decode_user
+from bot.database.schema_registry import SchemaRegistry
+from bot.services import notion_gateway
+from bot.services.notion_emulator import BOT_SCHEMAS, NotionEmulator
+from bot.services.notion_outbox import NotionOutbox
+from bot.services.notion_scheduler import NotionScheduler
+
+
+def _setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    outbox = NotionOutbox(str(tmp_path / "outbox.sqlite3"))
+    monkeypatch.setattr(store_mod, "notion_outbox", outbox)
+    monkeypatch.setattr(store_mod, "schema_registry", SchemaRegistry())
+    emu = NotionEmulator()
+    emu.add_database("users", BOT_SCHEMAS["NOTION_USERS_DB_ID"])
+    emu.add_database("payments", BOT_SCHEMAS["NOTION_PAYMENTS_DB_ID"])
+    return LocalStore(str(tmp_path / "store.sqlite3")), outbox, emu
+
+
+def test_local_writes_are_visible_at_once_and_replicated_in_order(tmp_path, monkeypatch):
+    store, outbox, emu = _setup(tmp_path, monkeypatch)
+    remapped = []
+    store.add_listener(lambda db, local_id, page: remapped.append((db, local_id, page["id"])))
+
+    user = store.create_page("users", {"Telegram ID": {"number": 7}})
+    pay = store.create_page("payments", {
+        "Telegram ID": {"number": 7},
+        "Status": {"select": {"name": "submitted"}},
+        "User": {"relation": [{"id": user["id"]}]},
+    })
+    store.update_page(pay["id"], {"Status": {"select": {"name": "paid"}}})
+    # без Notion: всё уже читается локально
+    assert decode_payment(store.get_page(pay["id"])).status == "paid"
+    assert store.is_pending(user["id"]) and store.stats()["queued"] == 3
+    assert [r["id"] for r in store.find("payments", "User", user["id"])] == [pay["id"]]
+
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            done = await store.replicate()
+            await outbox.flush()
+            return done
+
+        assert asyncio.run(run()) == 3
+    finally:
+        notion_gateway.set_client(None)
+
+    [u] = emu.pages("users")
+    [p] = emu.pages("payments")
+    assert decode_user(u).telegram_id == 7
+    assert decode_payment(p).user_page_id == u["id"]          # relation переведена на настоящий id
+    assert decode_payment(p).status == "paid"                  # патч ушёл после создания
+    assert store.resolve_id(pay["id"]) == p["id"] and not store.is_pending(pay["id"])
+    assert decode_payment(store.get_page(pay["id"])).status == "paid"
+    assert [r[1] for r in remapped] == [user["id"], pay["id"]]
+    # индекс page_keys переехал на настоящие id вместе со страницами
+    assert [r["id"] for r in store.pages_where("payments", "Telegram ID", 7)] == [p["id"]]
+    assert [r["id"] for r in store.find("payments", "User", user["id"])] == [p["id"]]
+    assert [r["id"] for r in store.find("payments", "User", u["id"])] == [p["id"]]
+    assert store.pages_where("payments", "Telegram ID", 8) == []
+    store.close()
+
+
+def test_failed_create_blocks_only_its_own_page(tmp_path, monkeypatch):
+    store, outbox, emu = _setup(tmp_path, monkeypatch)
+    bad = store.create_page("missing-db", {"Name": {"title": [{"text": {"content": "x"}}]}})
+    good = store.create_page("users", {"Telegram ID": {"number": 8}})
+    store.update_page(bad["id"], {"Name": {"title": [{"text": {"content": "y"}}]}})
+
+    notion_gateway.set_client(emu.client())
+    try:
+        assert asyncio.run(store.replicate()) == 1
+    finally:
+        notion_gateway.set_client(None)
+
+    assert store.is_pending(bad["id"]) and not store.is_pending(good["id"])
+    assert store.stats()["queued"] == 2 and store.stats()["failed"] == 1
+    store.close()
+
+
+class _LostResponse:
+    """Клиент, у которого первый pages.create доходит до Notion, а ответ теряется."""
+
+    def __init__(self, client):
+        self._client = client
+        self.databases = client.databases
+        self.pages = self
+        self.lost = 1
+
+    async def create(self, **kwargs):
+        page = await self._client.pages.create(**kwargs)
+        if self.lost:
+            self.lost -= 1
+            raise RuntimeError("connection reset")
+        return page
+
+    async def update(self, **kwargs):
+        return await self._client.pages.update(**kwargs)
+
+
+def test_create_is_not_repeated_after_lost_response_or_concurrent_runs(tmp_path, monkeypatch):
+    store, outbox, emu = _setup(tmp_path, monkeypatch)
+    user = store.create_page("users", {"Telegram ID": {"number": 9}})
+    notion_gateway.set_client(_LostResponse(emu.client()))
+    try:
+        assert asyncio.run(store.replicate()) == 0             # страница в Notion есть, id_map — нет
+        assert len(emu.pages("users")) == 1 and store.is_pending(user["id"])
+        store._db().execute("UPDATE queue SET next_attempt_at = 0")
+
+        async def twice():
+            return await asyncio.gather(store.replicate(), store.replicate())   # воркер + shutdown
+
+        assert sorted(asyncio.run(twice())) == [0, 1]
+    finally:
+        notion_gateway.set_client(None)
+
+    [page] = emu.pages("users")                                  # нашлась по Local ID, без дубля
+    assert store.resolve_id(user["id"]) == page["id"] and store.stats()["queued"] == 0
+    store.close()
+
+
+class _Unreachable(_LostResponse):
+    """Клиент, у которого первый pages.create не может соединиться с Notion."""
+
+    async def create(self, **kwargs):
+        if self.lost:
+            self.lost -= 1
+            raise httpx.ConnectError("connection refused")
+        return await self._client.pages.create(**kwargs)
+
+
+def test_create_that_was_never_sent_is_retried_without_local_id(tmp_path, monkeypatch):
+    store, outbox, emu = _setup(tmp_path, monkeypatch)
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100, max_retries=0))
+    schema = {k: v for k, v in BOT_SCHEMAS["NOTION_USERS_DB_ID"].items() if k != "Local ID"}
+    emu.add_database("plain", schema)
+    page = store.create_page("plain", {"Telegram ID": {"number": 5}})
+    notion_gateway.set_client(_Unreachable(emu.client()))
+    try:
+        assert asyncio.run(store.replicate()) == 0
+        store._db().execute("UPDATE queue SET next_attempt_at = 0")
+        assert asyncio.run(store.replicate()) == 1             # не dead letter: запрос не уходил
+    finally:
+        notion_gateway.set_client(None)
+
+    assert store.stats()["dead"] == 0 and len(emu.pages("plain")) == 1
+    assert not store.is_pending(page["id"])
+    store.close()
+
+
+def test_pull_all_mirrors_notion_and_keeps_local_pages(tmp_path, monkeypatch):
+    store, outbox, emu = _setup(tmp_path, monkeypatch)
+    emu.seed_page("users", {"Telegram ID": {"number": 1}}, page_id="u1")
+    emu.seed_page("users", {"Telegram ID": {"number": 2}}, page_id="u2")
+    local = store.create_page("users", {"Telegram ID": {"number": 3}})
+    outbox.enqueue("u2", {"Language": {"select": {"name": "en"}}})   # ещё не доставлено
+
+    notion_gateway.set_client(emu.client())
+    try:
+        assert asyncio.run(store.pull_all("users")) == 2
+        emu.handle("PATCH", "/v1/pages/u1", {"archived": True})
+        asyncio.run(store.pull_all("users"))
+    finally:
+        notion_gateway.set_client(None)
+
+    ids = {p["id"] for p in store.pages("users")}
+    assert ids == {"u2", local["id"]}
+    assert decode_user(store.get_page("u2")).language == "en"  # локальная правка не затёрта
+    assert store.synced("users") and store.watermark("users")
+    store.close()
@@ -0,0 +1,50 @@
+import asyncio
+
+from bot.database import notion_descriptions as desc
+from bot.services import notion_gateway
+from bot.services.cache import TTLCache
+from bot.services.notion_emulator import BOT_SCHEMAS, NotionEmulator
+from bot.services.notion_scheduler import NotionScheduler
+
+
+def _text(value):
+    return {"rich_text": [{"type": "text", "text": {"content": value}, "plain_text": value}]}
+
+
+def test_unknown_slugs_do_not_reload_the_index(monkeypatch):
+    monkeypatch.setenv("NOTION_DESCRIPTIONS_DB_ID", "desc")
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    monkeypatch.setattr(desc, "_cache", TTLCache(ttl_seconds=3600, soft_ttl_seconds=3600))
+    monkeypatch.setattr(desc, "_negative", TTLCache(ttl_seconds=60))
+    monkeypatch.setattr(desc, "_known", None)
+    monkeypatch.setattr(desc, "_miss_stats", {"filtered": 0, "negative_hits": 0, "negative_stored": 0})
+    emu = NotionEmulator()
+    emu.add_database("desc", BOT_SCHEMAS["NOTION_DESCRIPTIONS_DB_ID"])
+    emu.seed_page("desc", {
+        "Slug/Code": _text("about"), "Language": {"select": {"name": "ru"}},
+        "Status": {"select": {"name": "Active"}}, "Full": _text("О нас"),
+    }, page_id="d1")
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            assert await desc.preload_all() == 1
+            queries = emu.stats["calls"]
+            texts = [await desc.get_text("about", "ru")]
+            for _ in range(5):
+                texts.append(await desc.get_text("typo", "ru"))
+            desc._cache.clear()                           # индекс истёк — фильтр остаётся
+            texts.append(await desc.get_text("typo", "en"))
+            return texts, emu.stats["calls"] - queries
+
+        texts, extra_requests = asyncio.run(run())
+    finally:
+        notion_gateway.set_client(None)
+
+    assert texts == ["О нас"] + [None] * 6
+    assert extra_requests == 0
+    assert desc.cache_info()["filtered"] == 6
+
+    desc.apply_page(emu.pages("desc")[0] | {"id": "d2", "properties": {
+        **emu.pages("desc")[0]["properties"], "Slug/Code": _text("typo"),
+    }})
+    assert "typo::ru" in desc._known
@@ -0,0 +1,99 @@
+import asyncio
+
+from bot.database import local_store as store_mod, notion_payments as np, users_index as users_mod
+from bot.database.local_store import LocalStore
+from bot.database.products_index import ProductsIndex
+from bot.database.purchases_index import PurchasesIndex
+from bot.database.records import decode_payment
+from bot.database.schema_registry import SchemaRegistry
+from bot.database.users_index import UsersIndex
+from bot.services import notion_gateway
+from bot.services.notion_emulator import BOT_SCHEMAS, NotionEmulator
+from bot.services.notion_outbox import NotionOutbox
+from bot.services.notion_scheduler import NotionScheduler
+from bot.services.saga import sagas
+
+
+class _Entitlements:
+    def __init__(self):
+        self.grants = []
+
+    def grant(self, telegram_id, ent):
+        self.grants.append((telegram_id, ent.name))
+
+    def invalidate(self, telegram_id):
+        pass
+
+
+def test_resumed_approval_creates_one_purchase_and_one_grant(tmp_path, monkeypatch):
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    monkeypatch.setenv("NOTION_PRODUCTS_DB_ID", np.NOTION_PRODUCTS_DB_ID)
+    monkeypatch.setenv("NOTION_USERS_DB_ID", np.NOTION_USERS_DB_ID)
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    registry = SchemaRegistry()
+    ents = _Entitlements()
+    monkeypatch.setattr(store_mod, "notion_outbox", NotionOutbox(str(tmp_path / "outbox.sqlite3")))
+    monkeypatch.setattr(store_mod, "schema_registry", registry)
+    monkeypatch.setattr(np, "local_store", store)
+    monkeypatch.setattr(np, "schema_registry", registry)
+    monkeypatch.setattr(np, "products_index", ProductsIndex())
+    monkeypatch.setattr(np, "purchases_index", PurchasesIndex())
+    monkeypatch.setattr(np, "entitlements", ents)
+    monkeypatch.setattr(users_mod, "users_index", UsersIndex())
+    sagas.close()
+    monkeypatch.setattr(sagas, "path", str(tmp_path / "saga.sqlite3"))
+
+    emu = NotionEmulator()
+    emu.add_database(np.NOTION_USERS_DB_ID, BOT_SCHEMAS["NOTION_USERS_DB_ID"])
+    emu.add_database(np.NOTION_PRODUCTS_DB_ID, BOT_SCHEMAS["NOTION_PRODUCTS_DB_ID"])
+    emu.add_database(np.NOTION_PAYMENTS_DB_ID, BOT_SCHEMAS["NOTION_PAYMENTS_DB_ID"])
+    # без relation Payment: найти созданную Purchase поиском нельзя
+    purchases = {k: v for k, v in BOT_SCHEMAS["NOTION_PURCHASES_DB_ID"].items() if k != "Payment"}
+    emu.add_database(np.NOTION_PURCHASES_DB_ID, purchases)
+    emu.seed_page(np.NOTION_PRODUCTS_DB_ID, {
+        "Name": {"title": [{"text": {"content": "JOI"}}]},
+        "Slug/Code": {"rich_text": [{"text": {"content": "joi"}}]},
+        "Access days": {"number": 30},
+    })
+
+    # Purchase записывается локально, а "процесс падает" до записи шага в журнал
+    create_page = store.create_page
+    crashes = [True]
+
+    def crashing_create(db_id, properties, page_id=None):
+        page = create_page(db_id, properties, page_id=page_id)
+        if db_id == np.NOTION_PURCHASES_DB_ID and crashes and crashes.pop():
+            raise RuntimeError("crash")
+        return page
+
+    monkeypatch.setattr(store, "create_page", crashing_create)
+
+    pay = store.create_page(np.NOTION_PAYMENTS_DB_ID, {
+        "Telegram ID": {"number": 7}, "Status": {"select": {"name": "submitted"}},
+    })
+
+    async def approve():
+        return await np.approve_payment_and_issue_access(
+            user_telegram_id=7, notion_payment_id=pay["id"], product_code="joi",
+        )
+
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            first = await approve()                     # падение после создания Purchase
+            second = await approve()                    # продолжение из журнала
+            third = await approve()                     # повтор завершённой саги
+            await store.replicate()
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+    finally:
+        notion_gateway.set_client(None)
+        sagas.close()
+        store.close()
+
+    assert first is None and second == third and second["purchase_id"]
+    assert len(store.pages(np.NOTION_PURCHASES_DB_ID)) == 1
+    assert len(emu.pages(np.NOTION_PURCHASES_DB_ID)) == 1
+    assert ents.grants == [(7, "JOI")]
+    assert decode_payment(store.get_page(pay["id"])).status == "paid"
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from bot.database import local_store as store_mod, payment_view, products_index as products_mod, users_index as users_mod
+from bot.database.local_store import LocalStore
+from bot.database.products_index import ProductsIndex
+from bot.database.records import decode_payment
+from bot.database.users_index import UsersIndex
+from bot.services import notion_gateway
+from bot.services.notion_outbox import NotionOutbox
+from bot.services.notion_scheduler import NotionScheduler
+
+
+@pytest.fixture(autouse=True)
+def _store(tmp_path, monkeypatch):
+    monkeypatch.setattr(store_mod, "notion_outbox", NotionOutbox(str(tmp_path / "outbox.sqlite3")))
+    store = LocalStore(str(tmp_path / "store.sqlite3"))
+    for mod in (payment_view, products_mod, users_mod):
+        monkeypatch.setattr(mod, "local_store", store)
+    yield store
+    store.close()
+
+
+def _payment():
+    return decode_payment({
+        "id": "pay1",
+        "properties": {
+            "Status": {"select": {"name": "pending"}},
+            "User": {"relation": [{"id": "u1"}]},
+            "Product": {"relation": [{"id": "p1"}]},
+            "Products": {"relation": [{"id": "p1"}, {"id": "p2"}]},
+        },
+    })
+
+
+class _Pages:
+    def __init__(self, pages):
+        self.pages = pages
+        self.inflight = 0
+        self.peak = 0
+        self.calls = []
+
+    async def retrieve(self, page_id):
+        self.calls.append(page_id)
+        self.inflight += 1
+        self.peak = max(self.peak, self.inflight)
+        await asyncio.sleep(0.05)
+        self.inflight -= 1
+        return self.pages[page_id]
+
+
+def test_relations_are_resolved_concurrently_and_cached_products_skip_notion(monkeypatch):
+    products = ProductsIndex()
+    products.upsert_page({"id": "p2", "properties": {"Slug/Code": {"rich_text": [{"plain_text": "joi"}]}}})
+    monkeypatch.setattr(payment_view, "products_index", products)
+    monkeypatch.setattr(payment_view, "users_index", UsersIndex())
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    pages = _Pages({
+        "u1": {"id": "u1", "properties": {"Telegram ID": {"number": 42}, "Username": {"rich_text": [{"plain_text": "bob"}]}}},
+        "p1": {"id": "p1", "properties": {"Slug/Code": {"rich_text": [{"plain_text": "course"}]}, "Name": {"title": [{"plain_text": "Course"}]}}},
+    })
+    notion_gateway.set_client(SimpleNamespace(pages=pages))
+    try:
+        view = asyncio.run(payment_view.resolve_relations(_payment()))
+    finally:
+        notion_gateway.set_client(None)
+
+    assert sorted(pages.calls) == ["p1", "u1"]   # p2 — из каталога
+    assert pages.peak == 2
+    assert [p.slug for p in view.products] == ["course", "joi"]
+    d = view.as_dict()
+    assert d["user"] == {"page_id": "u1", "telegram_id": 42, "username": "bob"}
+    assert d["product"]["slug"] == "course" and d["product"]["name"] == "Course"
+
+
+def test_failed_relation_does_not_break_view(monkeypatch):
+    monkeypatch.setattr(payment_view, "products_index", ProductsIndex())
+    monkeypatch.setattr(payment_view, "users_index", UsersIndex())
+
+    async def boom(page_id):
+        raise RuntimeError("down")
+
+    notion_gateway.set_client(SimpleNamespace(pages=SimpleNamespace(retrieve=boom)))
+    try:
+        view = asyncio.run(payment_view.resolve_relations(_payment()))
+    finally:
+        notion_gateway.set_client(None)
+    assert view.as_dict()["user"] == {"page_id": "u1", "telegram_id": None, "username": ""}
+    assert view.product is None and view.products == ()
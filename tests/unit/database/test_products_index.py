@@ -0,0 +1,44 @@
+import asyncio
+
+from bot.database.products_index import ProductsIndex
+
+
+def _page(page_id, slug, name="JOI", days=30, mode="Bot"):
+    return {
+        "id": page_id,
+        "properties": {
+            "Slug/Code": {"rich_text": [{"plain_text": slug}]},
+            "Name": {"title": [{"plain_text": name}]},
+            "Access days": {"number": days},
+            "Access mode": {"select": {"name": mode}},
+        },
+    }
+
+
+def test_indexes_by_slug_page_and_payment_type():
+    idx = ProductsIndex()
+    idx.upsert_page(_page("p1", "joi"))
+    idx.upsert_page(_page("p2", "femdom_part_both", name="Femdom"))
+    assert idx.get("joi").page_id == "p1"
+    assert idx.get_by_page("p2").name == "Femdom"
+    assert idx.get_by_type("webinar_webinar_joi").page_id == "p1"
+    assert idx.get_by_type("webinar_femdom").page_id == "p2"
+    rec = idx.get("joi")
+    assert rec.access_mode == "bot" and rec.access_days == 30 and rec.active is True
+
+
+def test_slug_change_drops_old_key():
+    idx = ProductsIndex()
+    idx.upsert_page(_page("p1", "joi"))
+    idx.upsert_page(_page("p1", "joi_v2"))
+    assert idx.get("joi") is None
+    assert idx.get("joi_v2").page_id == "p1"
+    assert len(idx) == 1
+
+
+def test_resolve_prefers_product_code():
+    idx = ProductsIndex()
+    idx.upsert_page(_page("p1", "joi"))
+    idx.upsert_page(_page("p2", "other"))
+    rec = asyncio.run(idx.resolve(product_code="other", payment_type="webinar_joi"))
+    assert rec.page_id == "p2"
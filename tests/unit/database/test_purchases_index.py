@@ -0,0 +1,42 @@
+import asyncio
+
+from bot.database.purchases_index import PurchasesIndex
+
+
+def _page(page_id, user="u1", product="p1", status="paid", expires=None, edited="2025-01-01T00:00:00.000Z"):
+    props = {
+        "User": {"relation": [{"id": user}]},
+        "Product": {"relation": [{"id": product}]},
+        "Status": {"select": {"name": status}},
+    }
+    if expires:
+        props["Expires at"] = {"date": {"start": expires}}
+    return {"id": page_id, "last_edited_time": edited, "properties": props}
+
+
+def test_paid_purchase_is_found_by_user_and_product():
+    idx = PurchasesIndex()
+    idx.upsert_page(_page("b1"))
+    idx.upsert_page(_page("b2", product="p2", status="pending"))
+    assert idx.get_paid("u1", "p1").page_id == "b1"
+    assert idx.get_paid("u1", "p2") is None
+    assert sorted(r.page_id for r in idx.for_user("u1")) == ["b1", "b2"]
+
+
+def test_status_change_moves_key_and_patch_is_write_through():
+    idx = PurchasesIndex()
+    idx.upsert_page(_page("b1"))
+    idx.upsert_page(_page("b1", status="refunded", edited="2025-01-02T00:00:00.000Z"))
+    assert idx.get_paid("u1", "p1") is None
+    assert idx.info()["watermark"] == "2025-01-02T00:00:00.000Z"
+
+    idx.patch("b1", status="paid", expires_at="2025-03-01")
+    rec = idx.get_paid("u1", "p1")
+    assert rec.page_id == "b1" and rec.expires_at == "2025-03-01"
+    assert len(idx) == 1
+
+
+def test_lookup_paid_is_local_once_loaded():
+    idx = PurchasesIndex()
+    idx._loaded_at = 1.0   # загружен: промах не уходит в Notion
+    assert asyncio.run(idx.lookup_paid("u1", "p1")) is None
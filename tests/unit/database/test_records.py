@@ -0,0 +1,45 @@
+from bot.database.records import decode_payment, decode_payment_method, decode_purchase, decode_user
+
+
+def _rt(text):
+    return {"rich_text": [{"plain_text": text}]}
+
+
+def test_payment_decoder_reads_all_fields_in_one_pass():
+    page = {
+        "id": "pay1",
+        "last_edited_time": "2024-05-01T00:00:00.000Z",
+        "properties": {
+            "Name": {"title": [{"plain_text": "Payment 1"}]},
+            "Telegram ID": {"number": 42.0},
+            "Status": {"select": {"name": "paid"}},
+            "Type": _rt("webinar_joi"),
+            "Products": {"relation": [{"id": "prod1"}, {"id": "prod2"}]},
+            "User": {"relation": []},
+            "Product Name": _rt(""),
+            "Expires at": {"date": None},
+        },
+    }
+    rec = decode_payment(page)
+    assert rec.page_id == "pay1" and rec.title == "Payment 1"
+    assert rec.telegram_id == 42 and isinstance(rec.telegram_id, int)
+    assert rec.status == "paid" and rec.type == "webinar_joi"
+    assert rec.products == ("prod1", "prod2")
+    assert rec.user_page_id is None and rec.product_name is None and rec.expires_at is None
+    assert not hasattr(rec, "__dict__")
+
+
+def test_user_email_accepts_email_or_rich_text():
+    a = decode_user({"id": "u1", "properties": {"Email": {"email": " A@B.c "}}})
+    b = decode_user({"id": "u2", "properties": {"Email": _rt("X@Y.z")}})
+    assert (a.email, b.email) == ("a@b.c", "x@y.z")
+
+
+def test_purchase_rollup_and_method_defaults():
+    p = decode_purchase({"id": "p", "properties": {
+        "Product Name": {"rollup": {"array": [{"type": "title", "title": [{"plain_text": "JOI"}]}]}},
+    }})
+    assert p.product_name == "JOI"
+    m = decode_payment_method({"id": "m", "properties": {"Code": _rt("card"), "Rate per 1 EUR": {"number": 2}}})
+    d = m.as_dict()
+    assert d["code"] == "card" and d["rate_per_eur"] == 2.0 and d["active"] is False and d["order"] == 0
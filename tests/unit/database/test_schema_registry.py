@@ -0,0 +1,42 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.database.schema_registry import SchemaRegistry
+from bot.services import notion_gateway
+
+
+class _FakeDatabases:
+    def __init__(self):
+        self.props = {"Type": {"type": "select"}}
+        self.retrieves = 0
+        self.updates = []
+
+    async def retrieve(self, database_id):
+        self.retrieves += 1
+        return {"properties": dict(self.props)}
+
+    async def update(self, database_id, properties):
+        self.updates.append(properties)
+        self.props.update({k: {"type": next(iter(v))} for k, v in properties.items()})
+        return {}
+
+
+def test_schema_is_cached_and_migrated_once():
+    dbs = _FakeDatabases()
+    notion_gateway.set_client(SimpleNamespace(databases=dbs))
+    try:
+        reg = SchemaRegistry()
+
+        async def scenario():
+            assert await reg.prop_type("db", "Type") == "select"
+            for _ in range(3):
+                await reg.ensure_properties("db", {"Expires at": {"date": {}}})
+            assert await reg.prop_type("db", "Expires at") == "date"
+            reg.invalidate("db")
+            await reg.get("db")
+
+        asyncio.run(scenario())
+        assert dbs.retrieves == 2
+        assert dbs.updates == [{"Expires at": {"date": {}}}]
+    finally:
+        notion_gateway.set_client(None)
@@ -0,0 +1,36 @@
+from bot.database.users_index import UsersIndex
+
+
+def _page(page_id, tg, email, name="Ann", edited="2024-01-01T00:00:00.000Z"):
+    return {
+        "id": page_id,
+        "last_edited_time": edited,
+        "properties": {
+            "Telegram ID": {"number": tg},
+            "Name": {"title": [{"plain_text": name}]},
+            "Email": {"email": email},
+            "Language": {"select": {"name": "ru"}},
+        },
+    }
+
+
+def test_upsert_builds_all_indexes():
+    idx = UsersIndex()
+    idx.upsert_page(_page("p1", 42, " Ann@Example.com "))
+    rec = idx.get(42)
+    assert rec is not None and rec.page_id == "p1"
+    assert idx.get_by_page("p1") is rec
+    assert idx.get_by_email("ann@example.com") is rec
+    assert rec.as_user_data()["language"] == "ru"
+
+
+def test_patch_moves_email_index_and_advances_watermark():
+    idx = UsersIndex()
+    idx.upsert_page(_page("p1", 42, "old@example.com"))
+    idx.upsert_page(_page("p2", 43, "b@example.com", edited="2024-02-01T00:00:00.000Z"))
+    idx.patch("p1", email="New@Example.com", name="Bob")
+    assert idx.get_by_email("old@example.com") is None
+    assert idx.get_by_email("new@example.com").name == "Bob"
+    assert idx.get(42).email == "new@example.com"
+    assert idx.info()["watermark"] == "2024-02-01T00:00:00.000Z"
+    assert idx.patch("missing", name="x") is None
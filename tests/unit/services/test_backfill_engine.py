@@ -0,0 +1,44 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.services import notion_gateway
+from bot.services.backfill_engine import BackfillJob, run_backfill
+
+
+class _FakeNotion:
+    def __init__(self, rows):
+        self.rows = rows
+        self.updates = []
+        self.databases = SimpleNamespace(query=self._query)
+        self.pages = SimpleNamespace(update=self._update)
+
+    async def _query(self, database_id, **kwargs):
+        return {"results": self.rows, "has_more": False, "next_cursor": None}
+
+    async def _update(self, page_id, properties):
+        self.updates.append(page_id)
+        return {}
+
+
+async def _compute(row):
+    return {"N": {"number": row["n"]}} if row["n"] % 2 == 0 else None
+
+
+def test_backfill_updates_skips_and_resumes(tmp_path):
+    fake = _FakeNotion([{"id": f"p{i}", "n": i} for i in range(6)])
+    notion_gateway.set_client(fake)
+    ckpt = str(tmp_path / "job.checkpoint")
+    job = BackfillJob(name="t", database_id="db", compute=_compute)
+    try:
+        dry = asyncio.run(run_backfill(job, workers=2, dry_run=True, checkpoint_path=ckpt))
+        assert dry.updated == 3 and fake.updates == []
+
+        first = asyncio.run(run_backfill(job, workers=3, checkpoint_path=ckpt))
+        assert (first.updated, first.unchanged, first.failed) == (3, 3, 0)
+        assert sorted(fake.updates) == ["p0", "p2", "p4"]
+
+        again = asyncio.run(run_backfill(job, workers=3, checkpoint_path=ckpt))
+        assert again.skipped_done == 6 and again.updated == 0
+        assert len(fake.updates) == 3
+    finally:
+        notion_gateway.set_client(None)
@@ -0,0 +1,80 @@
+import asyncio
+
+from bot.services import cache as cache_mod
+from bot.services.cache import TTLCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+
+def test_soft_stale_returns_old_value_and_refreshes_once(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_mod, "time", clock)
+    cache = TTLCache(ttl_seconds=100, soft_ttl_seconds=10)
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def run():
+        first = await cache.get_or_load("k", loader)    # пусто — ждём загрузку
+        clock.now += 20                                 # soft-stale
+        stale = await asyncio.gather(*(cache.get_or_load("k", loader) for _ in range(5)))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        fresh = await cache.get_or_load("k", loader)
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(run())
+    assert first == 1 and stale == [1] * 5 and fresh == 2
+    assert calls == [1, 1]
+    info = cache.info()
+    assert info["stale_hits"] == 5 and info["misses"] == 1 and info["refreshes"] == 2
+
+
+def test_hard_expired_waits_for_loader(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_mod, "time", clock)
+    cache = TTLCache(ttl_seconds=100, soft_ttl_seconds=10)
+    values = iter(["old", "new"])
+
+    async def loader():
+        return next(values)
+
+    async def run():
+        await cache.get_or_load("k", loader)
+        clock.now += 101
+        return await cache.get_or_load("k", loader)
+
+    assert asyncio.run(run()) == "new"
+    assert cache.info()["misses"] == 2
+
+
+def test_failed_refresh_keeps_stale_value(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(cache_mod, "time", clock)
+    cache = TTLCache(ttl_seconds=100, soft_ttl_seconds=10)
+    cache.set("k", "old")
+
+    async def loader():
+        raise RuntimeError("notion down")
+
+    async def run():
+        clock.now += 20
+        val = await cache.get_or_load("k", loader)
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return val
+
+    assert asyncio.run(run()) == "old"
+    assert cache.get("k") == "old" and cache.info()["refresh_errors"] == 1
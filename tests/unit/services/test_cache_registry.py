@@ -0,0 +1,35 @@
+from bot.services.cache import TTLCache
+from bot.services.cache_registry import STANDARD_FIELDS, CacheRegistry, approx_size
+from bot.utils.cb_store import CbStore
+
+
+def test_snapshot_normalizes_fields_and_isolates_failures():
+    reg = CacheRegistry()
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("a", "x" * 1000)
+    store = CbStore(max_items=1)
+    store.put({"p": 1}, key="k1")
+    store.put({"p": 2}, key="k2")                     # k1 вытеснен при следующей очистке
+    store.put({"p": 3}, key="k3")
+    assert store.get("k3") == {"p": 3} and store.get("nope") is None
+
+    def broken():
+        raise RuntimeError("boom")
+
+    reg.register("ttl", cache.info, root=cache.root)
+    reg.register("cb", store.info, root=store.root)
+    reg.register("broken", broken)
+    snap = reg.snapshot()
+
+    assert set(STANDARD_FIELDS) <= set(snap["ttl"])
+    assert snap["ttl"]["entries"] == 1 and snap["ttl"]["approx_bytes"] >= 1000
+    assert snap["cb"]["hits"] == 1 and snap["cb"]["misses"] == 1 and snap["cb"]["evictions"] == 1
+    assert snap["cb"]["extra"]["puts"] == 3
+    assert snap["broken"] == {"error": "boom"}
+    assert "broken: error boom" in reg.format_text(snap)
+
+
+def test_approx_size_extrapolates_large_collections():
+    small = {i: "v" * 100 for i in range(10)}
+    big = {i: "v" * 100 for i in range(1000)}
+    assert 50 * approx_size(small) < approx_size(big) < 200 * approx_size(small)
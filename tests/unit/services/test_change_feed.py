@@ -0,0 +1,85 @@
+import asyncio
+import time
+
+from bot.database.users_index import UsersIndex
+from bot.services import notion_gateway
+from bot.services.change_feed import ChangeFeed, FeedSource
+from bot.services.notion_emulator import BOT_SCHEMAS, NotionEmulator
+from bot.services.notion_scheduler import NotionScheduler
+
+
+def test_feed_applies_deltas_and_skips_boundary_pages(monkeypatch):
+    monkeypatch.setenv("NOTION_USERS_DB_ID", "users")
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    emu = NotionEmulator()
+    emu.add_database("users", BOT_SCHEMAS["NOTION_USERS_DB_ID"])
+    emu.seed_page("users", {"Telegram ID": {"number": 1}, "Language": {"select": {"name": "ru"}}}, page_id="u1")
+    emu.seed_page("users", {"Telegram ID": {"number": 2}}, page_id="u2")
+
+    idx = UsersIndex()
+    reloads = []
+
+    async def reload():
+        reloads.append(1)
+        return idx.load_pages(emu.pages("users"))
+
+    feed = ChangeFeed()
+    feed.register(FeedSource("users", lambda: "users", idx.upsert_page, reload, ready=lambda: idx.ready))
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            await feed.poll_once()                      # не загружен — полная загрузка
+            assert len(idx) == 2 and idx.get(1).language == "ru"
+            time.sleep(0.01)
+            emu.handle("PATCH", "/v1/pages/u1", {"properties": {"Language": {"select": {"name": "en"}}}})
+            first = await feed.poll_once()
+            second = await feed.poll_once()
+            return first, second
+
+        first, second = asyncio.run(run())
+    finally:
+        notion_gateway.set_client(None)
+
+    assert reloads == [1]
+    assert first >= 1 and idx.get(1).language == "en"
+    assert second == 0                                  # граничная страница повторно не применяется
+    stats = feed.stats()["users"]
+    assert stats["reloads"] == 1 and stats["polls"] == 3 and stats["lag_sec"] is not None
+
+
+def test_second_edit_in_the_same_minute_is_applied(monkeypatch):
+    # Notion округляет last_edited_time до минуты
+    from datetime import datetime, timezone
+    from bot.services import notion_emulator
+    monkeypatch.setattr(notion_emulator, "_now_iso", lambda: datetime.now(timezone.utc).replace(
+        second=0, microsecond=0).isoformat(timespec="milliseconds").replace("+00:00", "Z"))
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    emu = NotionEmulator()
+    emu.add_database("users", BOT_SCHEMAS["NOTION_USERS_DB_ID"])
+    emu.seed_page("users", {"Telegram ID": {"number": 1}}, page_id="u1")
+
+    idx = UsersIndex()
+
+    async def reload():
+        idx.load_pages(emu.pages("users"))
+        return 1
+
+    feed = ChangeFeed()
+    feed.register(FeedSource("users", lambda: "users", idx.upsert_page, reload, ready=lambda: idx.ready))
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            await feed.poll_once()
+            counts = []
+            for lang in ("en", "de"):
+                emu.handle("PATCH", "/v1/pages/u1", {"properties": {"Language": {"select": {"name": lang}}}})
+                counts.append(await feed.poll_once())
+                assert idx.get(1).language == lang
+            counts.append(await feed.poll_once())
+            return counts
+
+        counts = asyncio.run(run())
+    finally:
+        notion_gateway.set_client(None)
+
+    assert counts[1] == 1 and counts[2] == 0            # та же минута, новое содержимое — применено
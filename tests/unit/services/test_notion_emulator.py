@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from notion_client import APIResponseError
+
+from bot.services import notion_gateway
+from bot.services.notion_emulator import BOT_SCHEMAS, NotionEmulator
+from bot.services.notion_scheduler import NotionScheduler
+
+
+def _emu(**kwargs):
+    emu = NotionEmulator(**kwargs)
+    emu.add_database("payments", BOT_SCHEMAS["NOTION_PAYMENTS_DB_ID"])
+    for i in range(7):
+        emu.seed_page("payments", {
+            "Name": {"title": [{"text": {"content": f"p{i}"}}]},
+            "Telegram ID": {"number": 100 + i % 2},
+            "Status": {"select": {"name": "paid" if i % 3 == 0 else "pending"}},
+            "User": {"relation": [{"id": "user-a" if i < 4 else "user-b"}]},
+        })
+    return emu
+
+
+def test_query_filters_sorts_and_cursor():
+    emu = _emu()
+    flt = {"and": [
+        {"property": "Telegram ID", "number": {"equals": 100}},
+        {"or": [
+            {"property": "Status", "select": {"equals": "paid"}},
+            {"property": "User", "relation": {"contains": "user-b"}},
+        ]},
+    ]}
+    sorts = [{"property": "Name", "direction": "descending"}]
+    status, _, first = emu.handle("POST", "/v1/databases/payments/query", {"filter": flt, "sorts": sorts, "page_size": 2})
+    assert status == 200 and first["has_more"]
+    _, _, second = emu.handle("POST", "/v1/databases/payments/query",
+                              {"filter": flt, "sorts": sorts, "page_size": 2, "start_cursor": first["next_cursor"]})
+    names = [p["properties"]["Name"]["title"][0]["plain_text"] for p in first["results"] + second["results"]]
+    # i чётные -> Telegram ID 100; из них paid: 0, 6; user-b: 4, 6
+    assert names == ["p6", "p4", "p0"]
+    assert second["has_more"] is False and second["next_cursor"] is None
+
+    _, _, empty = emu.handle("POST", "/v1/databases/payments/query",
+                             {"filter": {"property": "Product Name", "rich_text": {"is_empty": True}}})
+    assert len(empty["results"]) == 7
+
+
+def test_unknown_property_is_validation_error():
+    emu = _emu()
+    status, _, body = emu.handle("PATCH", f"/v1/pages/{emu.pages('payments')[0]['id']}",
+                                 {"properties": {"Nope": {"rich_text": []}}})
+    assert status == 400 and body["code"] == "validation_error"
+
+
+def test_drop_in_client_survives_injected_429(monkeypatch):
+    # свой планировщик: паузы от 429 не должны влиять на общий
+    monkeypatch.setattr(notion_gateway, "scheduler", NotionScheduler(rate_per_sec=1000, burst=100))
+    emu = _emu(rate_limit_every=2, retry_after_sec=0.01)
+    notion_gateway.set_client(emu.client())
+    try:
+        async def run():
+            rows = [r async for r in notion_gateway.iter_query("payments", page_size=3)]
+            page = await notion_gateway.update_page(rows[0]["id"], properties={
+                "Product Name": {"rich_text": [{"text": {"content": "Course"}}]},
+            })
+            with pytest.raises(APIResponseError):
+                await notion_gateway.retrieve_page("missing")
+            return rows, page
+
+        rows, page = asyncio.run(run())
+        assert len(rows) == 7
+        assert page["properties"]["Product Name"]["rich_text"][0]["plain_text"] == "Course"
+        assert emu.stats["rate_limited"] >= 1
+    finally:
+        notion_gateway.set_client(None)
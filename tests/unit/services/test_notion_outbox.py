@@ -0,0 +1,58 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.services import notion_gateway
+from bot.services.notion_outbox import NotionOutbox
+
+
+class _FakePages:
+    def __init__(self, fail_times=0):
+        self.calls = []
+        self.fail_times = fail_times
+
+    async def update(self, page_id, properties):
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError("boom")
+        self.calls.append((page_id, properties))
+        return {}
+
+
+def _with_pages(pages):
+    notion_gateway.set_client(SimpleNamespace(pages=pages))
+
+
+def test_patches_to_same_page_are_coalesced(tmp_path):
+    pages = _FakePages()
+    _with_pages(pages)
+    try:
+        box = NotionOutbox(str(tmp_path / "outbox.sqlite3"))
+        box.enqueue("p1", {"Status": {"select": {"name": "paid"}}})
+        box.enqueue("p1", {"Products": {"relation": [{"id": "x"}]}})
+        box.enqueue("p1", {"Status": {"select": {"name": "refunded"}}})
+        box.enqueue("p2", {"Language": {"select": {"name": "en"}}})
+        assert asyncio.run(box.flush()) == 2
+        sent = dict(pages.calls)
+        assert sent["p1"] == {"Status": {"select": {"name": "refunded"}}, "Products": {"relation": [{"id": "x"}]}}
+        assert box.stats()["pending"] == 0
+    finally:
+        notion_gateway.set_client(None)
+
+
+def test_failed_patch_survives_restart(tmp_path):
+    path = str(tmp_path / "outbox.sqlite3")
+    pages = _FakePages(fail_times=1)
+    _with_pages(pages)
+    try:
+        box = NotionOutbox(path)
+        box.enqueue("p1", {"Language": {"select": {"name": "en"}}})
+        assert asyncio.run(box.flush("p1")) == 0
+        box.close()
+
+        reopened = NotionOutbox(path)
+        assert reopened.pending("p1") == {"Language": {"select": {"name": "en"}}}
+        assert asyncio.run(reopened.flush("p1")) == 1
+        assert pages.calls == [("p1", {"Language": {"select": {"name": "en"}}})]
+        assert reopened.pending("p1") is None
+    finally:
+        notion_gateway.set_client(None)
@@ -0,0 +1,49 @@
+import asyncio
+from types import SimpleNamespace
+
+from bot.services import notion_gateway
+
+
+class _FakeDatabases:
+    def __init__(self, rows, page):
+        self.rows = rows
+        self.page = page
+        self.calls = []
+
+    async def query(self, database_id, **kwargs):
+        self.calls.append(kwargs)
+        start = int(kwargs.get("start_cursor") or 0)
+        size = min(kwargs.get("page_size", 100), self.page)
+        chunk = self.rows[start:start + size]
+        nxt = start + len(chunk)
+        more = nxt < len(self.rows)
+        return {"results": chunk, "has_more": more, "next_cursor": str(nxt) if more else None}
+
+
+def _collect(**kwargs):
+    async def run():
+        return [r async for r in notion_gateway.iter_query("db", **kwargs)]
+    return asyncio.run(run())
+
+
+def test_iter_query_follows_cursor_through_all_pages():
+    dbs = _FakeDatabases([{"id": i} for i in range(250)], page=100)
+    notion_gateway.set_client(SimpleNamespace(databases=dbs))
+    try:
+        rows = _collect(filter={"x": 1})
+        assert [r["id"] for r in rows] == list(range(250))
+        assert [c.get("start_cursor") for c in dbs.calls] == [None, "100", "200"]
+        assert all(c["filter"] == {"x": 1} for c in dbs.calls)
+    finally:
+        notion_gateway.set_client(None)
+
+
+def test_iter_query_limit_stops_early():
+    dbs = _FakeDatabases([{"id": i} for i in range(250)], page=100)
+    notion_gateway.set_client(SimpleNamespace(databases=dbs))
+    try:
+        rows = _collect(limit=3, page_size=50)
+        assert len(rows) == 3
+        assert len(dbs.calls) == 1 and dbs.calls[0]["page_size"] == 3
+    finally:
+        notion_gateway.set_client(None)
@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from notion_client.errors import APIResponseError
+
+from bot.services.notion_scheduler import NotionScheduler, Priority
+
+
+def _rate_limited(retry_after: str = "0.05") -> APIResponseError:
+    resp = httpx.Response(429, headers={"Retry-After": retry_after}, request=httpx.Request("POST", "https://x"))
+    return APIResponseError(resp, "slow down", "rate_limited")
+
+
+def test_interactive_calls_jump_the_queue():
+    async def scenario():
+        sched = NotionScheduler(rate_per_sec=1000, burst=1, max_concurrency=1)
+        order = []
+        gate = asyncio.Event()
+
+        async def blocker():
+            await gate.wait()
+
+        async def record(tag):
+            order.append(tag)
+
+        first = asyncio.create_task(sched.run(blocker, Priority.BULK))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(sched.run(lambda: record("bulk"), Priority.BULK)),
+            asyncio.create_task(sched.run(lambda: record("background"), Priority.BACKGROUND)),
+            asyncio.create_task(sched.run(lambda: record("interactive"), Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, *tasks)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "background", "bulk"]
+
+
+def test_rate_limit_is_retried_after_retry_after_and_halves_concurrency():
+    async def scenario():
+        sched = NotionScheduler(rate_per_sec=1000, burst=10, max_concurrency=4)
+        calls = []
+
+        async def flaky():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                raise _rate_limited("0.05")
+            return "ok"
+
+        result = await sched.run(flaky)
+        return result, calls, sched.stats()
+
+    result, calls, stats = asyncio.run(scenario())
+    assert result == "ok"
+    assert calls[1] - calls[0] >= 0.05
+    assert stats["rate_limited"] == 1
+    assert stats["concurrency_limit"] < 4
+
+
+def test_token_bucket_paces_calls():
+    async def scenario():
+        sched = NotionScheduler(rate_per_sec=20, burst=1, max_concurrency=4)
+
+        async def noop():
+            return None
+
+        started = time.monotonic()
+        await asyncio.gather(*(sched.run(noop) for _ in range(5)))
+        return time.monotonic() - started
+
+    # 1 токен сразу + 4 по 50 мс
+    assert asyncio.run(scenario()) >= 0.18
+
+
+def test_non_retryable_errors_propagate():
+    async def scenario():
+        sched = NotionScheduler()
+
+        async def broken():
+            raise ValueError("boom")
+
+        await sched.run(broken)
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+
+
+def test_non_idempotent_calls_retry_only_when_nothing_was_sent():
+    async def scenario():
+        sched = NotionScheduler(rate_per_sec=1000, burst=100, base_backoff=0.001)
+        calls = []
+
+        async def create(err):
+            calls.append(err)
+            if len(calls) == 1:
+                raise err
+            return {"id": "p1"}
+
+        assert await sched.run(lambda: create(httpx.ConnectError("refused")), idempotent=False) == {"id": "p1"}
+        calls.clear()
+        with pytest.raises(httpx.ReadTimeout):             # мог создать страницу — не повторяем
+            await sched.run(lambda: create(httpx.ReadTimeout("slow")), idempotent=False)
+        assert len(calls) == 1
+        calls.clear()
+        assert await sched.run(lambda: create(httpx.ReadTimeout("slow"))) == {"id": "p1"}
+
+    asyncio.run(scenario())
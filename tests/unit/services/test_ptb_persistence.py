@@ -0,0 +1,35 @@
+import asyncio
+
+from bot.services.ptb_persistence import SQLitePersistence
+
+
+def test_dirty_entries_are_written_in_one_batch_and_survive_restart(tmp_path):
+    path = str(tmp_path / "state.sqlite3")
+    p = SQLitePersistence(path)
+
+    async def tick():
+        await asyncio.gather(
+            p.update_user_data(1, {"lang": "en", "registered": True}),
+            p.update_user_data(2, {"lang": "ru"}),
+            p.update_bot_data({"pending_payments": {"abc": {"user_id": 1}}}),
+            p.update_conversation("registration", (10, 1), 1),
+        )
+        assert p.stats()["batches"] == 1                   # весь тик — одна транзакция
+        await asyncio.gather(
+            p.update_bot_data({"pending_payments": {"abc": {"user_id": 1}}}),
+            p.update_conversation("registration", (10, 1), None),
+            p.drop_user_data(2),
+        )
+        await p.flush()
+
+    asyncio.run(tick())
+    stats = p.stats()
+    assert stats["batches"] == 2 and stats["written"] == 4 and stats["deleted"] == 2
+    assert stats["unchanged"] == 1                          # bot_data не изменился — не переписан
+    p.close()
+
+    p = SQLitePersistence(path)
+    assert asyncio.run(p.get_user_data()) == {1: {"lang": "en", "registered": True}}
+    assert asyncio.run(p.get_bot_data()) == {"pending_payments": {"abc": {"user_id": 1}}}
+    assert asyncio.run(p.get_conversations("registration")) == {}
+    p.close()
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from bot.services.saga import SagaRunner
+
+
+def _runner(tmp_path, log, fail=None):
+    runner = SagaRunner(str(tmp_path / "saga.sqlite3"))
+
+    async def resolve(ctx):
+        log.append(("resolve", ctx.resumed))
+        await asyncio.sleep(0.01)
+        return {"product": "p1"}
+
+    async def create(ctx):
+        log.append(("create", ctx.resumed))
+        if fail and fail.pop():
+            raise RuntimeError("crash")
+        return {"purchase": f"buy-{ctx.state['product']}"}
+
+    async def patch(ctx):
+        log.append(("patch", ctx.state["purchase"]))
+
+    async def invalidate(ctx):
+        log.append(("invalidate", None))
+
+    runner.register("approve", [
+        ("resolve", resolve),
+        ("create", create),
+        [("patch", patch), ("invalidate", invalidate)],
+    ])
+    return runner
+
+
+def test_double_run_executes_steps_once(tmp_path):
+    log = []
+    runner = _runner(tmp_path, log)
+
+    async def run():
+        return await asyncio.gather(runner.run("approve", "pay1", {"x": 1}), runner.run("approve", "pay1", {"x": 1}))
+
+    first, second = asyncio.run(run())
+    assert first == second == {"x": 1, "product": "p1", "purchase": "buy-p1"}
+    assert [e[0] for e in log].count("create") == 1
+    assert runner.stats()["replayed"] == 1 and runner.stats()["running"] == 0
+
+
+def test_failed_step_resumes_from_journal_after_restart(tmp_path):
+    log = []
+    runner = _runner(tmp_path, log, fail=[True])
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner.run("approve", "pay1", {}))
+    runner.close()
+
+    # "рестарт": новый раннер на том же журнале
+    restarted = _runner(tmp_path, log)
+    assert asyncio.run(restarted.resume_pending()) == 1
+    assert log == [
+        ("resolve", False), ("create", False),
+        ("create", True),  # resolve не повторяется, create знает, что уже начинался
+        ("patch", "buy-p1"), ("invalidate", None),
+    ]
+    assert restarted.state("approve", "pay1")["purchase"] == "buy-p1"
+
+
+def test_always_failing_saga_is_given_up_after_max_attempts(tmp_path, monkeypatch):
+    from bot.services import saga as saga_mod
+    monkeypatch.setattr(saga_mod, "MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(saga_mod, "RESUME_SEC", 0)
+    log = []
+    runner = _runner(tmp_path, log, fail=[True] * 10)
+    with pytest.raises(RuntimeError):
+        asyncio.run(runner.run("approve", "pay1", {}))
+
+    assert [asyncio.run(runner.resume_pending()) for _ in range(4)] == [0, 0, 0, 0]
+    assert [e[0] for e in log].count("create") == 3          # дальше сага не запускается
+    stats = runner.stats()
+    assert stats["running"] == 0 and stats["failed_sagas"] == 1 and stats["dead"] == 1
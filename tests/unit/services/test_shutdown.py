@@ -0,0 +1,30 @@
+import asyncio
+
+from telegram import User
+from telegram.ext import Application, ExtBot
+
+
+class _Bot(ExtBot):
+    async def get_me(self, *args, **kwargs):
+        self._bot_user = User(id=1, first_name="bot", is_bot=True, username="bot")
+        return self._bot_user
+
+
+def test_shutdown_finishes_with_background_loops_running(tmp_path, monkeypatch):
+    monkeypatch.setenv("ADMIN_CHAT_ID", "1")            # config.py читает их при импорте
+    monkeypatch.setenv("ADMIN_IDS", "1")
+    monkeypatch.chdir(tmp_path)                         # sqlite-файлы синглтонов — во временный каталог
+    from bot import main
+    from bot.services import warmup
+
+    async def run():
+        app = Application.builder().bot(_Bot("1:x")).updater(None).build()
+        await app.initialize()
+        await app.start()
+        warmup.start_background_sync(app)
+        forever = warmup.spawn(asyncio.Event().wait(), "forever")
+        await asyncio.sleep(0)
+        await asyncio.wait_for(main._shutdown(app), timeout=30)
+        assert forever.cancelled() and not app.running and warmup._background == []
+
+    asyncio.run(run())
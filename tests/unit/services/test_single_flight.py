@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+
+from bot.services.single_flight import SingleFlight, make_key
+
+
+def test_concurrent_identical_calls_share_one_request():
+    async def scenario():
+        sf = SingleFlight()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"ok": True}
+
+        key = make_key("query", "db", {"filter": {"a": 1, "b": 2}})
+        same = make_key("query", "db", {"filter": {"b": 2, "a": 1}})
+        results = await asyncio.gather(*(sf.do(k, fetch) for k in (key, same, key)))
+        assert calls == 1
+        assert all(r == {"ok": True} for r in results)
+        assert sf.stats() == {"calls": 3, "deduplicated": 2, "inflight": 0}
+
+        await sf.do(key, fetch)  # запрос завершён — следующий идёт заново
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_error_is_shared_and_cancelled_waiter_does_not_cancel_others():
+    async def scenario():
+        sf = SingleFlight()
+        gate = asyncio.Event()
+
+        async def failing():
+            await gate.wait()
+            raise ValueError("nope")
+
+        first = asyncio.create_task(sf.do("k", failing))
+        second = asyncio.create_task(sf.do("k", failing))
+        await asyncio.sleep(0)
+        first.cancel()
+        gate.set()
+        with pytest.raises(ValueError):
+            await second
+
+    asyncio.run(scenario())
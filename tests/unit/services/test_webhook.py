@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+from bot.services.webhook import SECRET_HEADER, WebhookServer
+
+
+class _App:
+    bot = None
+
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.processed = []
+
+    async def process_update(self, update):
+        await self.release.wait()
+        self.processed.append(update.update_id)
+
+
+def _body(update_id):
+    return json.dumps({"update_id": update_id}).encode()
+
+
+def test_full_queue_sheds_with_503_and_drains_on_stop():
+    async def run():
+        app = _App()
+        server = WebhookServer(app, path="/tg", secret="s3cret", port=0, queue_max=1, workers=1, enqueue_wait=0.05)
+        await server.start()
+        ok = {SECRET_HEADER: "s3cret"}
+        try:
+            assert await server.handle("POST", "/tg", {SECRET_HEADER: "nope"}, _body(1)) == 403
+            assert await server.handle("POST", "/other", ok, _body(1)) == 404
+            assert await server.handle("POST", "/tg", ok, b"{") == 400
+
+            assert await server.handle("POST", "/tg", ok, _body(1)) == 200
+            await asyncio.sleep(0)                              # воркер забрал 1 и ждёт
+            assert await server.handle("POST", "/tg", ok, _body(2)) == 200
+            assert await server.handle("POST", "/tg", ok, _body(3)) == 503  # очередь полна -> Telegram повторит
+            assert await server.handle("POST", "/tg", ok, _body(2)) == 200  # повтор принятого не дублируется
+            info = server.info()
+            assert info["entries"] == 1 and info["busy"] == 1
+            assert info["shed"] == 1 and info["duplicates"] == 1 and info["forbidden"] == 1
+        finally:
+            app.release.set()
+            await server.stop()
+        assert app.processed == [1, 2]
+        assert server.info()["processed"] == 2 and server.info()["lag_max_ms"] is not None
+
+    asyncio.run(run())
+
+
+def test_http_listener_keeps_connection_alive():
+    async def run():
+        app = _App()
+        app.release.set()
+        server = WebhookServer(app, path="/tg", secret="s3cret", port=0, queue_max=4, workers=1)
+        await server.start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            for update_id, secret in ((10, "s3cret"), (11, "bad")):
+                body = _body(update_id)
+                writer.write(
+                    f"POST /tg HTTP/1.1\r\nHost: x\r\nContent-Type: application/json\r\n"
+                    f"X-Telegram-Bot-Api-Secret-Token: {secret}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+                )
+                await writer.drain()
+                status = await reader.readuntil(b"\r\n\r\n")
+                assert status.startswith(b"HTTP/1.1 200" if secret == "s3cret" else b"HTTP/1.1 403")
+            writer.close()
+        finally:
+            await server.stop()
+        assert app.processed == [10]
+
+    asyncio.run(run())
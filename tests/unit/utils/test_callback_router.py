@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+from telegram import CallbackQuery, Update, User
+from telegram.ext import CallbackQueryHandler, ConversationHandler
+
+from bot.utils.callback_router import CallbackRouter, exact, one_of, prefix, unrouted
+
+
+def _update(data):
+    user = User(id=1, first_name="u", is_bot=False)
+    return Update(update_id=1, callback_query=CallbackQuery(id="q", from_user=user, chat_instance="c", data=data))
+
+
+def test_routes_by_exact_key_then_longest_prefix_with_typed_args():
+    calls = []
+
+    def handler(name):
+        async def run(update, context, *args):
+            calls.append((name, args))
+        return run
+
+    router = CallbackRouter([
+        exact("donate_rub_info", handler("info")),
+        prefix("donate_", handler("currency"), one_of("rub", "eur")),
+        prefix("donate_upload:", handler("upload"), one_of("rub", "eur"), int),
+        prefix("personal_", handler("personal")),
+    ])
+
+    async def dispatch(data):
+        update = _update(data)
+        hit = router.check_update(update)
+        if hit:
+            await router.handle_update(update, None, hit, None)
+        return hit is not None
+
+    async def run():
+        return [await dispatch(d) for d in (
+            "donate_rub_info", "donate_eur", "donate_upload:rub:42",
+            "donate_usd", "donate_upload:rub:x", "personal_anything", "other",
+        )]
+
+    assert asyncio.run(run()) == [True, True, True, False, False, True, False]
+    assert calls == [
+        ("info", ()),
+        ("currency", ("eur",)),
+        ("upload", ("rub", 42)),
+        ("personal", ()),
+    ]
+    assert router.stats()["unrouted"] == 3
+
+
+def test_duplicate_routes_are_rejected():
+    async def h(update, context):
+        pass
+
+    router = CallbackRouter([exact("a", h), prefix("a", h)])
+    with pytest.raises(ValueError):
+        router.add(exact("a", h))
+    with pytest.raises(ValueError):
+        router.add(prefix("a", h))
+
+
+def test_unrouted_reports_keyboard_callbacks_without_a_route(tmp_path):
+    kb = tmp_path / "kb.py"
+    kb.write_text(
+        "def k(x, back):\n"
+        "    return [\n"
+        "        B('a', callback_data='menu_main'),\n"
+        "        B('b', callback_data=f'pay_rub_{x}'),\n"
+        "        B('c', callback_data=f'pay_eur_{x}'),\n"
+        "        B('d', callback_data='start_register'),\n"
+        "        B('e', callback_data='menu_lost'),\n"
+        "        B('f', callback_data=back),\n"
+        "    ]\n",
+        encoding="utf-8",
+    )
+
+    async def h(update, context, *args):
+        pass
+
+    router = CallbackRouter([exact("menu_main", h), prefix("pay_rub_", h, str)])
+    conv = ConversationHandler(
+        entry_points=[CallbackQueryHandler(h, pattern="^start_register$")], states={}, fallbacks=[],
+    )
+    assert unrouted(router, [conv], paths=[str(kb)]) == ["pay_eur_* (kb.py:5)", "menu_lost (kb.py:7)"]
+
+
+def test_webinar_back_button_resolves_to_the_webinar_id(monkeypatch):
+    monkeypatch.setenv("ADMIN_CHAT_ID", "1")
+    monkeypatch.setenv("ADMIN_IDS", "1")
+    from bot.handlers import webinars
+
+    router = CallbackRouter(webinars.routes)
+    for data in ("webinar_details_webinar_joi", "webinar_details_joi", "webinar_joi"):
+        route, args = router.resolve(data)
+        assert route.handler is webinars.show_webinar_details and args == ("joi",), data
@@ -0,0 +1,30 @@
+from bot.utils.i18n import namespace, validate
+
+
+def _namespace():
+    return namespace("ui", {
+        "ru": {"hello": "Привет, {name}", "menu": "Меню", "only_ru": "Только ru"},
+        "en": {"hello": "Hello, {name}", "menu": "Menu"},
+    }, default="ru")
+
+
+def test_lookups_fall_back_instead_of_raising():
+    ns = _namespace()
+    assert ns["en"]["menu"] == "Menu"
+    assert ns["en"]["only_ru"] == "Только ru"         # нет в en -> язык по умолчанию
+    assert ns["en"]["part_3"] == "part_3"             # нет нигде -> сам ключ, без KeyError
+    assert ns["de"]["menu"] == "Меню"                 # неизвестный язык -> язык по умолчанию
+    assert ns.get("en", {}).get("menu") == "Menu"
+    assert ns.get("de", {}) == {} and ns.get("de") is None   # get — обычный dict.get
+    assert list(ns) == ["ru", "en"] and "en" in ns and "de" not in ns
+
+
+def test_validate_reports_key_coverage_and_placeholders():
+    assert validate({
+        "ru": {"hello": "Привет, {name}", "menu": "Меню", "only_ru": "Только ru"},
+        "en": {"hello": "Hello, {name}", "menu": "Menu"},
+    }, default="ru") == ["en: missing only_ru"]
+    assert validate({
+        "ru": {"a": "{x} и {y}"},
+        "en": {"a": "{x}", "b": "extra"},
+    }, default="ru") == ["en: not in ru: b", "en: placeholders differ in a"]
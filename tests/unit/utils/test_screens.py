@@ -0,0 +1,34 @@
+from bot.utils import keyboards
+from bot.utils.screens import Screen, ScreenRegistry
+
+
+def test_screens_are_built_once_per_args_and_rebuilt_after_invalidate():
+    reg = ScreenRegistry(max_items=3)
+    built = []
+
+    @reg.memo
+    def menu(lang):
+        built.append(lang)
+        return Screen(f"menu:{lang}", keyboards.get_main_menu_keyboard.uncached(lang))
+
+    @reg.memo
+    def details(lang, item_id):
+        built.append((lang, item_id))
+        return Screen(item_id, keyboards.get_back_to_menu_keyboard.uncached(lang))
+
+    assert reg.prerender(["ru", "en"]) == 2            # details зависит не только от языка
+    first = menu("ru")
+    assert menu("ru") is first and built == ["ru", "en"]
+
+    for i in range(3):                                  # LRU: кэш не растёт от аргументов из callback_data
+        details("ru", str(i))
+    assert reg.info()["entries"] == 3 and reg.info()["evictions"] == 2
+
+    reg.invalidate("test")
+    assert menu("ru") is not first and menu("ru").text == "menu:ru"
+    assert reg.info()["hits"] == 3 and reg.info()["invalidations"] == 1
+
+
+def test_keyboard_builders_are_memoized():
+    assert keyboards.get_products_menu_keyboard("ru") is keyboards.get_products_menu_keyboard("ru")
+    assert keyboards.get_products_menu_keyboard("ru") is not keyboards.get_products_menu_keyboard("en")